@@ -3,18 +3,27 @@ Aplicación Flask principal para el sistema de Saldo Insoluto
 """
 from flask import Flask, send_from_directory
 from flask_cors import CORS 
-from flask_session import Session
+import logging
 import os
 from config import Config
-from utils.database import test_connection, create_firmas_beneficiarios_table
+from utils.database import test_connection, init_app as init_db
+from utils.migrations import run_migrations
+from utils.sesiones import init_app as init_sesiones
+from utils.logs import init_app as init_logs
+from utils.metricas_sql import init_app as init_metricas_sql
 
 # Aplicar parche de compatibilidad para Flask-Session y Werkzeug 3.x
 from utils.werkzeug_patch import apply_patch
 apply_patch()
 
+logger = logging.getLogger(__name__)
+
 # Crear aplicación Flask
 app = Flask(__name__)
 
+# Logging en cola (JSON por defecto) con request_id por petición
+init_logs(app)
+
 # Configurar CORS
 CORS(app, supports_credentials=True, origins=[
     'http://localhost:3001',
@@ -25,9 +34,7 @@ CORS(app, supports_credentials=True, origins=[
     'http://127.0.0.1:8080'
 ])
 
-# Configuración de sesiones
-app.config['SECRET_KEY'] = 'tu_clave_secreta_muy_segura_aqui'
-app.config['SESSION_TYPE'] = 'filesystem'
+# Configuración de sesiones (el backend se elige con SESSION_BACKEND)
 app.config['SESSION_PERMANENT'] = False
 app.config['SESSION_USE_SIGNER'] = True
 app.config['SESSION_KEY_PREFIX'] = 'saldo_insoluto:'
@@ -37,8 +44,14 @@ app.config['SESSION_COOKIE_SECURE'] = False  # Para desarrollo local
 # Configuración de la aplicación
 app.config.from_object(Config)
 
-# Inicializar Flask-Session
-Session(app)
+# Sesiones: tabla en PostgreSQL (por defecto), cookie firmada o Flask-Session en disco
+backend_sesiones = init_sesiones(app)
+
+# Devolver conexiones al pool al terminar cada petición
+init_db(app)
+
+# Sentencias y tiempo de SQL por petición (Server-Timing y /api/health/sql)
+init_metricas_sql(app)
 
 # Registrar todas las rutas
 def register_all_routes():
@@ -67,48 +80,40 @@ def register_all_routes():
             module = __import__(module_path, fromlist=['register_routes'])
             register_function = getattr(module, 'register_routes')
             register_function(app)
-            print(f'✅ Rutas de {route_name} registradas')
+            logger.debug('Rutas de %s registradas', route_name)
         except ImportError as e:
-            print(f'⚠️ Error importando módulo {module_path}: {e}')
+            logger.warning('Error importando módulo %s: %s', module_path, e)
         except AttributeError as e:
-            print(f'⚠️ Error: {module_path} no tiene función register_routes: {e}')
+            logger.warning('Error: %s no tiene función register_routes: %s', module_path, e)
         except Exception as e:
-            print(f'⚠️ Error registrando rutas de {route_name}: {e}')
+            logger.exception('Error registrando rutas de %s: %s', route_name, e)
 
 # Registrar todas las rutas
 register_all_routes()
 
 if __name__ == '__main__':
     if test_connection():
-        # Crear tabla de firmas de beneficiarios si no existe
-        create_firmas_beneficiarios_table()
+        # Aplicar migraciones pendientes del esquema (no hace nada si ya está al día)
+        if not run_migrations():
+            logger.error('No se pudieron aplicar las migraciones del esquema')
         
-        # Crear tablas de cálculo de saldo insoluto si no existen
-        from utils.database import create_calculo_saldo_insoluto_tables, create_aprobacion_items_table
-        create_calculo_saldo_insoluto_tables()
-        
-        # Crear tabla de aprobación de items si no existe
-        create_aprobacion_items_table()
-        
-        # Agregar columnas de firma de funcionario a solicitudes
-        from utils.database import add_firma_funcionario_columns
-        add_firma_funcionario_columns()
+        config = Config()
         
-        # Aumentar tamaño de columnas de RUT
-        from utils.database import fix_rut_columns
-        fix_rut_columns()
+        # Cargar Excel en segundo plano y recargarlos si cambian en disco
+        from utils.excel_service import iniciar_carga_en_segundo_plano, iniciar_vigilancia
+        iniciar_carga_en_segundo_plano()
+        iniciar_vigilancia(config.EXCEL_WATCH_INTERVAL)
         
-        # Eliminar columnas innecesarias de firma
-        from utils.database import remove_unused_firma_columns
-        remove_unused_firma_columns()
+        # Descartar periódicamente las subidas por partes abandonadas
+        from utils.subidas import iniciar_limpieza_periodica
+        iniciar_limpieza_periodica(config.UPLOAD_GC_INTERVAL)
         
-        # Cargar Excel al iniciar
-        from utils.excel_service import cargar_excel
-        cargar_excel()
+        # Borrar por lotes las sesiones vencidas guardadas en PostgreSQL
+        if backend_sesiones == 'postgres':
+            from utils.sesiones import iniciar_limpieza_periodica as iniciar_limpieza_sesiones
+            iniciar_limpieza_sesiones(config.SESSION_GC_INTERVAL)
         
-        config = Config()
-        print(f'✅ Servidor Flask ejecutándose en puerto {config.PORT}')
-        print(f'🔗 URL: http://localhost:{config.PORT}')
+        logger.info('Servidor Flask ejecutándose en puerto %s (http://localhost:%s)', config.PORT, config.PORT)
         app.run(host=config.HOST, port=config.PORT, debug=config.DEBUG)
     else:
-        print('❌ No se pudo conectar a la base de datos')
+        logger.error('No se pudo conectar a la base de datos')
@@ -14,13 +14,72 @@ class Config:
     DB_USER = os.getenv('DB_USER', 'postgres')
     DB_PASSWORD = os.getenv('DB_PASSWORD', '1234')
     
+    # Configuración del pool de conexiones
+    DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+    DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))  # segundos esperando una conexión libre
+    DB_POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', '1800'))  # segundos; 0 = sin límite
+    DB_POOL_HEALTH_CHECK = os.getenv('DB_POOL_HEALTH_CHECK', 'True').lower() == 'true'
+    
+    # Recarga automática de los Excel de autocompletado
+    EXCEL_WATCH_INTERVAL = float(os.getenv('EXCEL_WATCH_INTERVAL', '5'))  # segundos; 0 = desactivado
+    
+    # Almacenamiento de documentos ('local' o 's3')
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local').lower()
+    STORAGE_LOCAL_DIR = os.getenv('STORAGE_LOCAL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'storage', 'documentos'))
+    S3_BUCKET = os.getenv('S3_BUCKET', '')
+    S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL', '')  # p. ej. http://localhost:9000 para MinIO
+    S3_ACCESS_KEY = os.getenv('S3_ACCESS_KEY', '')
+    S3_SECRET_KEY = os.getenv('S3_SECRET_KEY', '')
+    S3_REGION = os.getenv('S3_REGION', '')
+    S3_PREFIX = os.getenv('S3_PREFIX', 'documentos/')
+    
+    # Subidas reanudables por partes
+    UPLOAD_SESSIONS_DIR = os.getenv('UPLOAD_SESSIONS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'storage', 'subidas'))
+    UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', str(1024 * 1024)))  # bytes por parte
+    UPLOAD_SESSION_TTL = float(os.getenv('UPLOAD_SESSION_TTL', '24'))  # horas sin actividad antes de descartar
+    UPLOAD_GC_INTERVAL = float(os.getenv('UPLOAD_GC_INTERVAL', '900'))  # segundos; 0 = desactivado
+    
+    # Generación de PDF en un pool de procesos
+    PDF_WORKERS = int(os.getenv('PDF_WORKERS', '2'))  # procesos de xhtml2pdf
+    PDF_MAX_CONCURRENT = int(os.getenv('PDF_MAX_CONCURRENT', '2'))  # renders simultáneos por worker de Flask
+    PDF_MAX_QUEUE = int(os.getenv('PDF_MAX_QUEUE', '50'))  # trabajos en espera antes de responder 503
+    PDF_JOB_TTL = float(os.getenv('PDF_JOB_TTL', '600'))  # segundos que se conserva un PDF generado
+    PDF_SYNC_TIMEOUT = float(os.getenv('PDF_SYNC_TIMEOUT', '60'))  # espera máxima de /api/generar-resolucion
+    PDF_CACHE_DIR = os.getenv('PDF_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'storage', 'cache_pdf'))
+    PDF_CACHE_MEMORY_MB = float(os.getenv('PDF_CACHE_MEMORY_MB', '32'))  # LRU en memoria por worker
+    PDF_CACHE_MAX_FILES = int(os.getenv('PDF_CACHE_MAX_FILES', '5000'))  # PDF guardados en disco
+    TEMPLATE_BYTECODE_DIR = os.getenv('TEMPLATE_BYTECODE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'storage', 'cache_jinja'))
+    
+    # Registro (logging) en cola, ver utils/logs.py
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_LEVELS = os.getenv('LOG_LEVELS', '')  # niveles por módulo: "routes.documentos=DEBUG,utils.db_pool=WARNING"
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()  # 'json' o 'texto'
+    LOG_DEBUG_SAMPLE = float(os.getenv('LOG_DEBUG_SAMPLE', '1'))  # fracción de registros DEBUG que se escriben
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))  # registros en espera antes de descartar
+    
+    # Métricas de SQL por petición, ver utils/metricas_sql.py
+    SQL_METRICS = os.getenv('SQL_METRICS', 'True').lower() == 'true'
+    SQL_SERVER_TIMING = os.getenv('SQL_SERVER_TIMING', 'True').lower() == 'true'  # cabecera Server-Timing
+    SQL_SLOW_REQUEST_MS = float(os.getenv('SQL_SLOW_REQUEST_MS', '1000'))  # duración total que se registra como lenta
+    SQL_SLOW_DB_MS = float(os.getenv('SQL_SLOW_DB_MS', '500'))  # tiempo en la base de datos que se registra como lento
+    SQL_MAX_QUERIES = int(os.getenv('SQL_MAX_QUERIES', '50'))  # sentencias por petición antes de advertir
+    SQL_REPEAT_THRESHOLD = int(os.getenv('SQL_REPEAT_THRESHOLD', '10'))  # repeticiones de una huella (N+1)
+    SQL_MAX_FINGERPRINTS = int(os.getenv('SQL_MAX_FINGERPRINTS', '500'))  # huellas distintas en los totales
+    
     # Configuración del servidor
     PORT = int(os.getenv('PORT', '3001'))
     HOST = os.getenv('HOST', '0.0.0.0')
     DEBUG = os.getenv('DEBUG', 'True').lower() == 'true'
     
     # Configuración de Flask
-    SECRET_KEY = os.getenv('SECRET_KEY', 'tu-clave-secreta-aqui')
+    SECRET_KEY = os.getenv('SECRET_KEY', '')  # sin valor por defecto: definirla en el entorno de cada despliegue
+    
+    # Sesiones ('cookie', 'postgres' o 'filesystem'; ver utils/sesiones.py)
+    SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'postgres').lower()
+    SESSION_LIFETIME = float(os.getenv('SESSION_LIFETIME', '12'))  # horas de vigencia de la sesión
+    SESSION_GC_INTERVAL = float(os.getenv('SESSION_GC_INTERVAL', '900'))  # segundos; 0 = desactivado
+    SESSION_GC_BATCH = int(os.getenv('SESSION_GC_BATCH', '1000'))  # sesiones vencidas borradas por sentencia
     
     @property
     def DATABASE_CONFIG(self):
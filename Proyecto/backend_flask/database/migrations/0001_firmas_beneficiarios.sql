@@ -0,0 +1,55 @@
+-- ============================================
+-- 0001: Tabla firmas_beneficiarios y campo funcionario_id en expediente
+-- (antes: create_firmas_beneficiarios_table en cada arranque)
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS app.firmas_beneficiarios (
+    id SERIAL PRIMARY KEY,
+    expediente_id INTEGER NOT NULL REFERENCES app.expediente(id) ON DELETE CASCADE,
+    beneficiario_id INTEGER NOT NULL REFERENCES app.beneficiarios(id) ON DELETE CASCADE,
+    firma_hash VARCHAR(255) NOT NULL,
+    fecha_firma TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    estado VARCHAR(50) DEFAULT 'activa',
+    observaciones TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Agregar campo funcionario_id a tabla expediente si no existe
+ALTER TABLE app.expediente ADD COLUMN IF NOT EXISTS funcionario_id INTEGER;
+
+-- Crear tabla funcionarios básica (y funcionario admin) solo si no existe
+DO $$
+BEGIN
+    IF to_regclass('app.funcionarios') IS NULL THEN
+        CREATE TABLE app.funcionarios (
+            id SERIAL PRIMARY KEY,
+            rut VARCHAR(20) UNIQUE NOT NULL,
+            nombres VARCHAR(100) NOT NULL,
+            apellido_p VARCHAR(100) NOT NULL,
+            apellido_m VARCHAR(100),
+            password_hash VARCHAR(255) NOT NULL,
+            rol VARCHAR(50) DEFAULT 'funcionario',
+            sucursal VARCHAR(100),
+            iniciales VARCHAR(10),
+            activo BOOLEAN DEFAULT true,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+
+        -- Contraseña: admin123
+        INSERT INTO app.funcionarios (rut, nombres, apellido_p, password_hash, rol, sucursal, iniciales)
+        VALUES ('12345678-9', 'Admin', 'Sistema',
+                '$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/LewY5GyYp7QxqN3KO',
+                'administrador', 'Central', 'AS');
+    END IF;
+END $$;
+
+-- Índices
+CREATE INDEX IF NOT EXISTS idx_firmas_beneficiarios_expediente ON app.firmas_beneficiarios(expediente_id);
+CREATE INDEX IF NOT EXISTS idx_firmas_beneficiarios_beneficiario ON app.firmas_beneficiarios(beneficiario_id);
+CREATE INDEX IF NOT EXISTS idx_firmas_beneficiarios_estado ON app.firmas_beneficiarios(estado);
+
+-- Índice único para evitar firmas duplicadas
+CREATE UNIQUE INDEX IF NOT EXISTS idx_firmas_beneficiarios_unique
+ON app.firmas_beneficiarios(expediente_id, beneficiario_id)
+WHERE estado = 'activa';
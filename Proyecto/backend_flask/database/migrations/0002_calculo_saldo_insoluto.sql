@@ -0,0 +1,32 @@
+-- ============================================
+-- 0002: Tablas de cálculo de saldo insoluto
+-- (antes: create_calculo_saldo_insoluto_tables en cada arranque)
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS app.calculo_saldo_insoluto (
+    id SERIAL PRIMARY KEY,
+    expediente_id INTEGER NOT NULL REFERENCES app.expediente(id) ON DELETE CASCADE,
+    solicitud_id INTEGER REFERENCES app.solicitudes(id) ON DELETE SET NULL,
+    total_calculado DECIMAL(15,2) NOT NULL,
+    fecha_calculo TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    calculado_por INTEGER REFERENCES app.funcionarios(id) ON DELETE SET NULL,
+    estado VARCHAR(50) DEFAULT 'pendiente',
+    observaciones TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS app.detalle_calculo_saldo (
+    id SERIAL PRIMARY KEY,
+    calculo_id INTEGER NOT NULL REFERENCES app.calculo_saldo_insoluto(id) ON DELETE CASCADE,
+    beneficio_codigo INTEGER NOT NULL,
+    beneficio_nombre VARCHAR(255) NOT NULL,
+    monto DECIMAL(15,2) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Índices
+CREATE INDEX IF NOT EXISTS idx_calculo_saldo_expediente ON app.calculo_saldo_insoluto(expediente_id);
+CREATE INDEX IF NOT EXISTS idx_calculo_saldo_solicitud ON app.calculo_saldo_insoluto(solicitud_id);
+CREATE INDEX IF NOT EXISTS idx_calculo_saldo_estado ON app.calculo_saldo_insoluto(estado);
+CREATE INDEX IF NOT EXISTS idx_detalle_calculo_calculo ON app.detalle_calculo_saldo(calculo_id);
@@ -0,0 +1,30 @@
+-- ============================================
+-- 0003: Aprobación/rechazo de items individuales por jefatura
+-- (antes: create_aprobacion_items_table en cada arranque)
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS app.aprobacion_items (
+    id SERIAL PRIMARY KEY,
+    expediente_id INTEGER NOT NULL REFERENCES app.expediente(id) ON DELETE CASCADE,
+    solicitud_id INTEGER NOT NULL REFERENCES app.solicitudes(id) ON DELETE CASCADE,
+    item_tipo VARCHAR(50) NOT NULL,
+    item_id INTEGER,
+    estado VARCHAR(20) NOT NULL DEFAULT 'pendiente',
+    observacion TEXT,
+    aprobado_por INTEGER REFERENCES app.funcionarios(id) ON DELETE SET NULL,
+    fecha_aprobacion TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT chk_estado CHECK (estado IN ('pendiente', 'aprobado', 'rechazado')),
+    CONSTRAINT chk_item_tipo CHECK (item_tipo IN ('causante', 'beneficiarios', 'firmas', 'calculo', 'documentos', 'general'))
+);
+
+-- Índices
+CREATE INDEX IF NOT EXISTS idx_aprobacion_items_expediente ON app.aprobacion_items(expediente_id);
+CREATE INDEX IF NOT EXISTS idx_aprobacion_items_solicitud ON app.aprobacion_items(solicitud_id);
+CREATE INDEX IF NOT EXISTS idx_aprobacion_items_tipo ON app.aprobacion_items(item_tipo);
+CREATE INDEX IF NOT EXISTS idx_aprobacion_items_estado ON app.aprobacion_items(estado);
+
+-- Un item solo puede tener un registro activo
+CREATE UNIQUE INDEX IF NOT EXISTS idx_aprobacion_items_unique
+ON app.aprobacion_items(expediente_id, solicitud_id, item_tipo);
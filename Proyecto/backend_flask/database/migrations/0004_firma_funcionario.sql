@@ -0,0 +1,15 @@
+-- ============================================
+-- 0004: Firma de funcionario en solicitudes
+-- Reemplaza el par add_firma_funcionario_columns / remove_unused_firma_columns,
+-- que agregaba y eliminaba las mismas columnas en cada arranque.
+-- Estado final: solo se conserva firmado_funcionario.
+-- (antes también: scripts_historicos/fix_columnas_manual.sql y test_fix_columns.py)
+-- ============================================
+
+ALTER TABLE app.solicitudes ADD COLUMN IF NOT EXISTS firmado_funcionario BOOLEAN DEFAULT FALSE;
+
+CREATE INDEX IF NOT EXISTS idx_solicitudes_firmado_funcionario ON app.solicitudes(firmado_funcionario);
+
+DROP INDEX IF EXISTS app.idx_solicitudes_funcionario_firma;
+ALTER TABLE app.solicitudes DROP COLUMN IF EXISTS fecha_firma_funcionario;
+ALTER TABLE app.solicitudes DROP COLUMN IF EXISTS funcionario_id_firma;
@@ -0,0 +1,27 @@
+-- ============================================
+-- 0005: Columnas de RUT a VARCHAR(20)
+-- (antes: fix_rut_columns en cada arranque)
+-- Solo se altera la columna si todavía es más angosta, para no reescribir
+-- ni bloquear tablas que ya tienen el tamaño correcto.
+-- ============================================
+
+DO $$
+DECLARE
+    col RECORD;
+BEGIN
+    FOR col IN
+        SELECT table_name, column_name
+        FROM information_schema.columns
+        WHERE table_schema = 'app'
+          AND (table_name, column_name) IN (
+              ('causante', 'fal_run'),
+              ('representante', 'rep_rut'),
+              ('solicitudes', 'representante_rut'),
+              ('solicitudes', 'causante_rut'),
+              ('beneficiarios', 'ben_run')
+          )
+          AND character_maximum_length < 20
+    LOOP
+        EXECUTE format('ALTER TABLE app.%I ALTER COLUMN %I TYPE VARCHAR(20)', col.table_name, col.column_name);
+    END LOOP;
+END $$;
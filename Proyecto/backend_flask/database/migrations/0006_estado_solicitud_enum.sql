@@ -0,0 +1,17 @@
+-- ============================================
+-- 0006: Valores del ENUM app.estado_solicitud
+-- (antes: scripts_historicos/agregar_pendiente_enum.py, agregar_completado_enum.py,
+--  agregar_rechazado_enum.py, ejecutar_agregar_rechazado.py y sus .sql)
+-- Las instalaciones creadas con init_database.sql usan VARCHAR y no tienen el ENUM;
+-- en ese caso la migración no hace nada. Requiere PostgreSQL 12 o superior.
+-- ============================================
+
+DO $$
+BEGIN
+    IF to_regtype('app.estado_solicitud') IS NOT NULL THEN
+        ALTER TYPE app.estado_solicitud ADD VALUE IF NOT EXISTS 'pendiente';
+        ALTER TYPE app.estado_solicitud ADD VALUE IF NOT EXISTS 'completado';
+        ALTER TYPE app.estado_solicitud ADD VALUE IF NOT EXISTS 'rechazado';
+        ALTER TYPE app.estado_solicitud ADD VALUE IF NOT EXISTS 'rechazado/enRevision';
+    END IF;
+END $$;
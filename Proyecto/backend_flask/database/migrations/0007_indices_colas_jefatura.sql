@@ -0,0 +1,27 @@
+-- Índices compuestos para la paginación por cursor de las colas de jefatura
+-- (/api/solicitudes-pendientes y /api/solicitudes-rechazadas).
+-- El cursor es (fecha_creacion, id) en orden descendente, filtrado por estado
+-- y opcionalmente por sucursal y prefijo del RUT del causante.
+
+-- Las filas sin fecha de creación no podrían paginarse por cursor
+UPDATE app.solicitudes s
+SET fecha_creacion = COALESCE(e.fecha_creacion, CURRENT_TIMESTAMP)
+FROM app.expediente e
+WHERE s.expediente_id = e.id AND s.fecha_creacion IS NULL;
+
+UPDATE app.solicitudes SET fecha_creacion = CURRENT_TIMESTAMP WHERE fecha_creacion IS NULL;
+
+ALTER TABLE app.solicitudes ALTER COLUMN fecha_creacion SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_solicitudes_estado_fecha
+    ON app.solicitudes (estado, fecha_creacion DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_solicitudes_estado_sucursal_fecha
+    ON app.solicitudes (estado, sucursal, fecha_creacion DESC, id DESC);
+
+-- Búsqueda por prefijo de RUT (LIKE 'prefijo%') independiente de la collation
+CREATE INDEX IF NOT EXISTS idx_causante_run_prefijo
+    ON app.causante (UPPER(fal_run) text_pattern_ops);
+
+-- Reemplazado por idx_solicitudes_estado_fecha (mismo prefijo)
+DROP INDEX IF EXISTS app.idx_solicitudes_estado;
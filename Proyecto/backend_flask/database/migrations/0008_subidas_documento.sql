@@ -0,0 +1,34 @@
+-- Sesiones de subida reanudable por partes (chunks) para documentos grandes.
+-- El contenido de cada parte vive en disco (UPLOAD_SESSIONS_DIR) hasta que la
+-- sesión se finaliza; aquí solo se registra qué partes llegaron y su hash.
+
+CREATE TABLE IF NOT EXISTS app.subidas_documento (
+    id UUID PRIMARY KEY,
+    solicitud_id INTEGER NOT NULL REFERENCES app.solicitudes(id) ON DELETE CASCADE,
+    funcionario_id INTEGER REFERENCES app.funcionarios(id) ON DELETE SET NULL,
+    nombre_archivo VARCHAR(255) NOT NULL,
+    doc_tipo_id INTEGER DEFAULT 1,
+    observaciones TEXT,
+    tamano_bytes BIGINT NOT NULL,
+    sha256 VARCHAR(64) NOT NULL,
+    tamano_chunk INTEGER NOT NULL,
+    total_chunks INTEGER NOT NULL,
+    estado VARCHAR(20) NOT NULL DEFAULT 'abierta',
+    documento_id INTEGER REFERENCES app.documentos_saldo_insoluto(id) ON DELETE SET NULL,
+    creado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expira_en TIMESTAMP NOT NULL,
+    CONSTRAINT chk_subida_estado CHECK (estado IN ('abierta', 'finalizada'))
+);
+
+CREATE TABLE IF NOT EXISTS app.subidas_documento_chunks (
+    subida_id UUID NOT NULL REFERENCES app.subidas_documento(id) ON DELETE CASCADE,
+    numero INTEGER NOT NULL,
+    tamano_bytes INTEGER NOT NULL,
+    sha256 VARCHAR(64) NOT NULL,
+    recibido_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (subida_id, numero)
+);
+
+-- Limpieza periódica de sesiones vencidas
+CREATE INDEX IF NOT EXISTS idx_subidas_documento_expira
+    ON app.subidas_documento (expira_en);
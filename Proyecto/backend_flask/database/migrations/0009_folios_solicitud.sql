@@ -0,0 +1,19 @@
+-- Contador de folios de solicitud por año (SI-NNN-AAAA).
+-- El folio se asigna con un UPDATE ... RETURNING sobre la fila del año dentro
+-- de la transacción que crea la solicitud: el lock de la fila serializa las
+-- creaciones concurrentes y un ROLLBACK devuelve el número.
+
+CREATE TABLE IF NOT EXISTS app.folios_solicitud (
+    anio INTEGER PRIMARY KEY,
+    ultimo INTEGER NOT NULL DEFAULT 0,
+    CONSTRAINT chk_folios_ultimo CHECK (ultimo >= 0)
+);
+
+-- Continuar la numeración de los folios ya emitidos
+INSERT INTO app.folios_solicitud (anio, ultimo)
+SELECT CAST(SUBSTRING(folio FROM '^SI-\d+-(\d{4})$') AS INTEGER),
+       MAX(CAST(SUBSTRING(folio FROM '^SI-(\d+)-\d{4}$') AS INTEGER))
+FROM app.solicitudes
+WHERE folio ~ '^SI-\d+-\d{4}$'
+GROUP BY 1
+ON CONFLICT (anio) DO UPDATE SET ultimo = GREATEST(app.folios_solicitud.ultimo, EXCLUDED.ultimo);
@@ -0,0 +1,151 @@
+-- Resumen del avance de cada expediente (firmas, documentos y cálculo) para
+-- que los listados y búsquedas lo lean de una fila en vez de contar
+-- beneficiarios, firmas y documentos en cada petición.
+--
+-- Se mantiene con triggers por sentencia: cada escritura en las tablas de
+-- origen recalcula, dentro de la misma transacción, solo los expedientes que
+-- tocó. El recálculo bloquea antes la fila del resumen, así dos transacciones
+-- sobre el mismo expediente no se pisan los conteos.
+
+CREATE TABLE IF NOT EXISTS app.progreso_expediente (
+    expediente_id INTEGER PRIMARY KEY REFERENCES app.expediente(id) ON DELETE CASCADE,
+    total_beneficiarios INTEGER NOT NULL DEFAULT 0,
+    beneficiarios_firmados INTEGER NOT NULL DEFAULT 0,
+    representante_firmado BOOLEAN NOT NULL DEFAULT FALSE,
+    total_documentos INTEGER NOT NULL DEFAULT 0,
+    bytes_documentos BIGINT NOT NULL DEFAULT 0,
+    calculo_vigente BOOLEAN NOT NULL DEFAULT FALSE,
+    actualizado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Búsqueda de firmas de representantes sin distinguir mayúsculas
+CREATE INDEX IF NOT EXISTS idx_usuarios_firma_rut_upper ON app.usuarios_firma (UPPER(rut));
+CREATE INDEX IF NOT EXISTS idx_representante_rut_upper ON app.representante (UPPER(rep_rut));
+
+CREATE OR REPLACE FUNCTION app.recalcular_progreso_expediente(ids INTEGER[])
+RETURNS VOID AS $$
+DECLARE
+    exp_id INTEGER;
+BEGIN
+    -- Orden fijo para que dos transacciones no se bloqueen en cruz
+    FOR exp_id IN
+        SELECT DISTINCT x.id FROM unnest(ids) AS x(id)
+        JOIN app.expediente e ON e.id = x.id
+        ORDER BY x.id
+    LOOP
+        INSERT INTO app.progreso_expediente (expediente_id) VALUES (exp_id)
+        ON CONFLICT (expediente_id) DO NOTHING;
+        -- Con la fila bloqueada, los conteos siguientes ven lo ya confirmado por otras transacciones
+        PERFORM 1 FROM app.progreso_expediente WHERE expediente_id = exp_id FOR UPDATE;
+
+        UPDATE app.progreso_expediente p SET
+            total_beneficiarios = (
+                SELECT COUNT(*) FROM app.beneficiarios b WHERE b.expediente_id = exp_id
+            ),
+            beneficiarios_firmados = (
+                SELECT COUNT(*) FROM app.beneficiarios b
+                WHERE b.expediente_id = exp_id
+                  AND EXISTS (SELECT 1 FROM app.usuarios_firma uf WHERE uf.rut = b.ben_run)
+            ),
+            representante_firmado = EXISTS (
+                SELECT 1 FROM app.representante r
+                JOIN app.usuarios_firma uf ON UPPER(uf.rut) = UPPER(r.rep_rut)
+                WHERE r.expediente_id = exp_id
+            ),
+            total_documentos = d.total,
+            bytes_documentos = d.bytes,
+            calculo_vigente = EXISTS (
+                SELECT 1 FROM app.calculo_saldo_insoluto c
+                WHERE c.expediente_id = exp_id AND c.estado IN ('pendiente', 'aprobado')
+            ),
+            actualizado_en = CURRENT_TIMESTAMP
+        FROM (
+            SELECT COUNT(*) AS total,
+                   COALESCE(SUM(COALESCE(doc_tamano_bytes, octet_length(doc_archivo_blob))), 0) AS bytes
+            FROM app.documentos_saldo_insoluto
+            WHERE expediente_id = exp_id
+        ) d
+        WHERE p.expediente_id = exp_id;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Tablas con columna expediente_id (beneficiarios, documentos, cálculos, representante, expediente)
+CREATE OR REPLACE FUNCTION app.trg_progreso_por_expediente()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'expediente' THEN
+        PERFORM app.recalcular_progreso_expediente(ARRAY(SELECT id FROM filas_nuevas));
+    ELSIF TG_OP = 'INSERT' THEN
+        PERFORM app.recalcular_progreso_expediente(ARRAY(SELECT expediente_id FROM filas_nuevas));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM app.recalcular_progreso_expediente(ARRAY(
+            SELECT expediente_id FROM filas_nuevas
+            UNION SELECT expediente_id FROM filas_anteriores
+        ));
+    ELSE
+        PERFORM app.recalcular_progreso_expediente(ARRAY(SELECT expediente_id FROM filas_anteriores));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Una firma nueva o eliminada afecta a los expedientes donde ese RUT es beneficiario o representante
+CREATE OR REPLACE FUNCTION app.trg_progreso_por_firma()
+RETURNS TRIGGER AS $$
+DECLARE
+    ruts VARCHAR[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        ruts := ARRAY(SELECT rut FROM filas_nuevas);
+    ELSIF TG_OP = 'UPDATE' THEN
+        ruts := ARRAY(SELECT rut FROM filas_nuevas UNION SELECT rut FROM filas_anteriores);
+    ELSE
+        ruts := ARRAY(SELECT rut FROM filas_anteriores);
+    END IF;
+
+    PERFORM app.recalcular_progreso_expediente(ARRAY(
+        SELECT b.expediente_id FROM app.beneficiarios b WHERE b.ben_run = ANY(ruts)
+        UNION
+        SELECT r.expediente_id FROM app.representante r
+        WHERE UPPER(r.rep_rut) = ANY(ARRAY(SELECT UPPER(x) FROM unnest(ruts) AS x))
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Los triggers con tablas de transición no admiten varios eventos a la vez: uno por operación
+DO $$
+DECLARE
+    tabla TEXT;
+    funcion TEXT;
+BEGIN
+    FOREACH tabla IN ARRAY ARRAY['beneficiarios', 'documentos_saldo_insoluto', 'calculo_saldo_insoluto',
+                                 'representante', 'usuarios_firma', 'expediente']
+    LOOP
+        funcion := CASE WHEN tabla = 'usuarios_firma' THEN 'app.trg_progreso_por_firma()'
+                        ELSE 'app.trg_progreso_por_expediente()' END;
+
+        EXECUTE format('DROP TRIGGER IF EXISTS progreso_ins ON app.%I', tabla);
+        EXECUTE format('CREATE TRIGGER progreso_ins AFTER INSERT ON app.%I
+                        REFERENCING NEW TABLE AS filas_nuevas
+                        FOR EACH STATEMENT EXECUTE FUNCTION %s', tabla, funcion);
+
+        -- El expediente solo necesita su fila al crearse (el resto llega por las otras tablas)
+        CONTINUE WHEN tabla = 'expediente';
+
+        EXECUTE format('DROP TRIGGER IF EXISTS progreso_upd ON app.%I', tabla);
+        EXECUTE format('CREATE TRIGGER progreso_upd AFTER UPDATE ON app.%I
+                        REFERENCING OLD TABLE AS filas_anteriores NEW TABLE AS filas_nuevas
+                        FOR EACH STATEMENT EXECUTE FUNCTION %s', tabla, funcion);
+
+        EXECUTE format('DROP TRIGGER IF EXISTS progreso_del ON app.%I', tabla);
+        EXECUTE format('CREATE TRIGGER progreso_del AFTER DELETE ON app.%I
+                        REFERENCING OLD TABLE AS filas_anteriores
+                        FOR EACH STATEMENT EXECUTE FUNCTION %s', tabla, funcion);
+    END LOOP;
+END;
+$$;
+
+-- Carga inicial
+SELECT app.recalcular_progreso_expediente(ARRAY(SELECT id FROM app.expediente));
@@ -0,0 +1,130 @@
+-- RUT en forma canónica en todas las tablas que los guardan.
+-- El texto original se conserva para mostrarlo, pero las búsquedas y los
+-- cruces (beneficiario <-> firma, representante <-> firma, login) usan el
+-- número del RUT como entero, calculado por columnas generadas a partir de
+-- cualquier formato ("12.345.678-k", "12345678K", " 12345678-K ").
+-- La misma regla está en utils/helpers.py (normalizar_rut / rut_a_clave).
+
+CREATE OR REPLACE FUNCTION app.rut_numero(rut TEXT)
+RETURNS INTEGER
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT CASE WHEN limpio ~ '^[0-9]{1,9}[0-9K]$' THEN left(limpio, -1)::INTEGER END
+    FROM (SELECT regexp_replace(upper(rut), '[^0-9K]', '', 'g') AS limpio) x
+$$;
+
+CREATE OR REPLACE FUNCTION app.rut_dv(rut TEXT)
+RETURNS CHAR(1)
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT CASE WHEN limpio ~ '^[0-9]{1,9}[0-9K]$' THEN right(limpio, 1) END
+    FROM (SELECT regexp_replace(upper(rut), '[^0-9K]', '', 'g') AS limpio) x
+$$;
+
+-- Columnas generadas: se calculan para las filas existentes al agregarlas
+ALTER TABLE app.causante
+    ADD COLUMN IF NOT EXISTS fal_run_num INTEGER GENERATED ALWAYS AS (app.rut_numero(fal_run)) STORED,
+    ADD COLUMN IF NOT EXISTS fal_run_dv CHAR(1) GENERATED ALWAYS AS (app.rut_dv(fal_run)) STORED;
+
+ALTER TABLE app.representante
+    ADD COLUMN IF NOT EXISTS rep_rut_num INTEGER GENERATED ALWAYS AS (app.rut_numero(rep_rut)) STORED,
+    ADD COLUMN IF NOT EXISTS rep_rut_dv CHAR(1) GENERATED ALWAYS AS (app.rut_dv(rep_rut)) STORED;
+
+ALTER TABLE app.beneficiarios
+    ADD COLUMN IF NOT EXISTS ben_run_num INTEGER GENERATED ALWAYS AS (app.rut_numero(ben_run)) STORED,
+    ADD COLUMN IF NOT EXISTS ben_run_dv CHAR(1) GENERATED ALWAYS AS (app.rut_dv(ben_run)) STORED;
+
+ALTER TABLE app.usuarios_firma
+    ADD COLUMN IF NOT EXISTS rut_num INTEGER GENERATED ALWAYS AS (app.rut_numero(rut)) STORED,
+    ADD COLUMN IF NOT EXISTS rut_dv CHAR(1) GENERATED ALWAYS AS (app.rut_dv(rut)) STORED;
+
+ALTER TABLE app.funcionarios
+    ADD COLUMN IF NOT EXISTS rut_num INTEGER GENERATED ALWAYS AS (app.rut_numero(rut)) STORED,
+    ADD COLUMN IF NOT EXISTS rut_dv CHAR(1) GENERATED ALWAYS AS (app.rut_dv(rut)) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_causante_run_num ON app.causante (fal_run_num);
+CREATE INDEX IF NOT EXISTS idx_representante_rut_num ON app.representante (rep_rut_num);
+CREATE INDEX IF NOT EXISTS idx_beneficiarios_run_num ON app.beneficiarios (ben_run_num);
+CREATE INDEX IF NOT EXISTS idx_usuarios_firma_rut_num ON app.usuarios_firma (rut_num);
+CREATE INDEX IF NOT EXISTS idx_funcionarios_rut_num ON app.funcionarios (rut_num);
+
+-- Búsqueda por prefijo del RUT canónico (filtro rut_causante de las colas)
+CREATE INDEX IF NOT EXISTS idx_causante_run_canonico_prefijo
+    ON app.causante ((fal_run_num::TEXT || fal_run_dv) text_pattern_ops);
+
+-- Reemplazados por los índices sobre el RUT canónico
+DROP INDEX IF EXISTS app.idx_usuarios_firma_rut_upper;
+DROP INDEX IF EXISTS app.idx_representante_rut_upper;
+DROP INDEX IF EXISTS app.idx_causante_run_prefijo;
+
+-- El resumen de avance (0010) cruza firmas por el número del RUT
+CREATE OR REPLACE FUNCTION app.recalcular_progreso_expediente(ids INTEGER[])
+RETURNS VOID AS $$
+DECLARE
+    exp_id INTEGER;
+BEGIN
+    -- Orden fijo para que dos transacciones no se bloqueen en cruz
+    FOR exp_id IN
+        SELECT DISTINCT x.id FROM unnest(ids) AS x(id)
+        JOIN app.expediente e ON e.id = x.id
+        ORDER BY x.id
+    LOOP
+        INSERT INTO app.progreso_expediente (expediente_id) VALUES (exp_id)
+        ON CONFLICT (expediente_id) DO NOTHING;
+        -- Con la fila bloqueada, los conteos siguientes ven lo ya confirmado por otras transacciones
+        PERFORM 1 FROM app.progreso_expediente WHERE expediente_id = exp_id FOR UPDATE;
+
+        UPDATE app.progreso_expediente p SET
+            total_beneficiarios = (
+                SELECT COUNT(*) FROM app.beneficiarios b WHERE b.expediente_id = exp_id
+            ),
+            beneficiarios_firmados = (
+                SELECT COUNT(*) FROM app.beneficiarios b
+                WHERE b.expediente_id = exp_id
+                  AND EXISTS (SELECT 1 FROM app.usuarios_firma uf WHERE uf.rut_num = b.ben_run_num)
+            ),
+            representante_firmado = EXISTS (
+                SELECT 1 FROM app.representante r
+                JOIN app.usuarios_firma uf ON uf.rut_num = r.rep_rut_num
+                WHERE r.expediente_id = exp_id
+            ),
+            total_documentos = d.total,
+            bytes_documentos = d.bytes,
+            calculo_vigente = EXISTS (
+                SELECT 1 FROM app.calculo_saldo_insoluto c
+                WHERE c.expediente_id = exp_id AND c.estado IN ('pendiente', 'aprobado')
+            ),
+            actualizado_en = CURRENT_TIMESTAMP
+        FROM (
+            SELECT COUNT(*) AS total,
+                   COALESCE(SUM(COALESCE(doc_tamano_bytes, octet_length(doc_archivo_blob))), 0) AS bytes
+            FROM app.documentos_saldo_insoluto
+            WHERE expediente_id = exp_id
+        ) d
+        WHERE p.expediente_id = exp_id;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION app.trg_progreso_por_firma()
+RETURNS TRIGGER AS $$
+DECLARE
+    ruts INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        ruts := ARRAY(SELECT rut_num FROM filas_nuevas);
+    ELSIF TG_OP = 'UPDATE' THEN
+        ruts := ARRAY(SELECT rut_num FROM filas_nuevas UNION SELECT rut_num FROM filas_anteriores);
+    ELSE
+        ruts := ARRAY(SELECT rut_num FROM filas_anteriores);
+    END IF;
+
+    PERFORM app.recalcular_progreso_expediente(ARRAY(
+        SELECT b.expediente_id FROM app.beneficiarios b WHERE b.ben_run_num = ANY(ruts)
+        UNION
+        SELECT r.expediente_id FROM app.representante r WHERE r.rep_rut_num = ANY(ruts)
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Los RUT escritos con otro formato ahora cuentan como firmados
+SELECT app.recalcular_progreso_expediente(ARRAY(SELECT id FROM app.expediente));
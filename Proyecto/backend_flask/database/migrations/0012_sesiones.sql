@@ -0,0 +1,13 @@
+-- Sesiones de Flask guardadas en PostgreSQL (SESSION_BACKEND=postgres), para
+-- que cualquier host atienda cualquier petición sin archivos en disco.
+-- La cookie lleva solo el identificador firmado; los datos van en JSONB.
+
+CREATE TABLE IF NOT EXISTS app.sesiones (
+    id VARCHAR(64) PRIMARY KEY,
+    datos JSONB NOT NULL DEFAULT '{}'::jsonb,
+    expira_en TIMESTAMP NOT NULL,
+    actualizado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- La limpieza recorre las vencidas por lotes sobre este índice
+CREATE INDEX IF NOT EXISTS idx_sesiones_expira_en ON app.sesiones (expira_en);
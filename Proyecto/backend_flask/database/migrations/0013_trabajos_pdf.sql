@@ -0,0 +1,21 @@
+-- Estado de los trabajos de PDF compartido entre workers y hosts: el trabajo
+-- se genera en el worker que lo recibió, pero la consulta de su estado puede
+-- llegar a cualquiera. El PDF listo se lee desde la caché en disco (cache_grupo,
+-- cache_clave), que debe ser compartida (PDF_CACHE_DIR).
+
+CREATE TABLE IF NOT EXISTS app.trabajos_pdf (
+    id UUID PRIMARY KEY,
+    propietario INTEGER,
+    estado VARCHAR(20) NOT NULL,
+    nombre_archivo VARCHAR(255) NOT NULL,
+    cache_grupo VARCHAR(100) NOT NULL,
+    cache_clave VARCHAR(64) NOT NULL,
+    error TEXT,
+    render_ms DOUBLE PRECISION,
+    tamano_bytes INTEGER,
+    creado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    actualizado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Los trabajos vencidos se borran por fecha de la última actualización
+CREATE INDEX IF NOT EXISTS idx_trabajos_pdf_actualizado_en ON app.trabajos_pdf (actualizado_en);
@@ -0,0 +1,26 @@
+-- app.rut_numero / app.rut_dv quitaban cualquier carácter que no fuera dígito
+-- o K, así que "12a345678-5" se leía como un RUT válido. Ahora solo se quitan
+-- puntos, guiones y espacios (igual que utils/helpers.py rut_a_clave) y un RUT
+-- con otros caracteres queda sin número (NULL).
+
+CREATE OR REPLACE FUNCTION app.rut_numero(rut TEXT)
+RETURNS INTEGER
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT CASE WHEN limpio ~ '^[0-9]{1,9}[0-9K]$' THEN left(limpio, -1)::INTEGER END
+    FROM (SELECT regexp_replace(upper(rut), '[.[:space:]-]', '', 'g') AS limpio) x
+$$;
+
+CREATE OR REPLACE FUNCTION app.rut_dv(rut TEXT)
+RETURNS CHAR(1)
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $$
+    SELECT CASE WHEN limpio ~ '^[0-9]{1,9}[0-9K]$' THEN right(limpio, 1) END
+    FROM (SELECT regexp_replace(upper(rut), '[.[:space:]-]', '', 'g') AS limpio) x
+$$;
+
+-- Las columnas generadas guardadas no se recalculan solas: reescribir solo
+-- las filas cuyo RUT tiene otros caracteres (las demás no cambian de valor)
+UPDATE app.causante SET fal_run = fal_run WHERE upper(fal_run) ~ '[^0-9K.[:space:]-]';
+UPDATE app.representante SET rep_rut = rep_rut WHERE upper(rep_rut) ~ '[^0-9K.[:space:]-]';
+UPDATE app.beneficiarios SET ben_run = ben_run WHERE upper(ben_run) ~ '[^0-9K.[:space:]-]';
+UPDATE app.usuarios_firma SET rut = rut WHERE upper(rut) ~ '[^0-9K.[:space:]-]';
+UPDATE app.funcionarios SET rut = rut WHERE upper(rut) ~ '[^0-9K.[:space:]-]';
@@ -0,0 +1,95 @@
+-- El bloqueo de la fila de progreso_expediente no cubría el caso entre tablas:
+-- si una transacción crea la firma de un RUT mientras otra agrega un
+-- beneficiario (o representante) con ese RUT, ninguna ve la fila sin confirmar
+-- de la otra, ninguna recalcula el expediente afectado y beneficiarios_firmados
+-- queda desactualizado hasta otra escritura.
+--
+-- Ahora ambos triggers toman primero un advisory lock de transacción por RUT
+-- (en orden, para no bloquearse en cruz). La segunda transacción espera al
+-- COMMIT de la primera y, como en READ COMMITTED cada sentencia del trigger
+-- toma una instantánea nueva, su recálculo ya ve la fila de la otra.
+--
+-- Recálculo completo si hiciera falta:
+--     SELECT app.recalcular_progreso_expediente(ARRAY(SELECT id FROM app.expediente));
+
+CREATE OR REPLACE FUNCTION app.bloquear_ruts_progreso(ruts INTEGER[])
+RETURNS VOID AS $$
+DECLARE
+    rut INTEGER;
+BEGIN
+    FOR rut IN
+        SELECT DISTINCT x.rut FROM unnest(ruts) AS x(rut)
+        WHERE x.rut IS NOT NULL
+        ORDER BY x.rut
+    LOOP
+        PERFORM pg_advisory_xact_lock(hashtext('app.progreso_rut'), rut);
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Tablas con columna expediente_id (beneficiarios, documentos, cálculos, representante, expediente)
+CREATE OR REPLACE FUNCTION app.trg_progreso_por_expediente()
+RETURNS TRIGGER AS $$
+DECLARE
+    columna_rut TEXT;
+    ruts INTEGER[];
+BEGIN
+    -- Beneficiarios y representantes se serializan con las firmas del mismo RUT
+    columna_rut := CASE TG_TABLE_NAME WHEN 'beneficiarios' THEN 'ben_run_num'
+                                      WHEN 'representante' THEN 'rep_rut_num' END;
+    IF columna_rut IS NOT NULL THEN
+        IF TG_OP = 'INSERT' THEN
+            EXECUTE format('SELECT ARRAY(SELECT %I FROM filas_nuevas)', columna_rut) INTO ruts;
+        ELSIF TG_OP = 'UPDATE' THEN
+            EXECUTE format('SELECT ARRAY(SELECT %1$I FROM filas_nuevas UNION SELECT %1$I FROM filas_anteriores)',
+                           columna_rut) INTO ruts;
+        ELSE
+            EXECUTE format('SELECT ARRAY(SELECT %I FROM filas_anteriores)', columna_rut) INTO ruts;
+        END IF;
+        PERFORM app.bloquear_ruts_progreso(ruts);
+    END IF;
+
+    IF TG_TABLE_NAME = 'expediente' THEN
+        PERFORM app.recalcular_progreso_expediente(ARRAY(SELECT id FROM filas_nuevas));
+    ELSIF TG_OP = 'INSERT' THEN
+        PERFORM app.recalcular_progreso_expediente(ARRAY(SELECT expediente_id FROM filas_nuevas));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM app.recalcular_progreso_expediente(ARRAY(
+            SELECT expediente_id FROM filas_nuevas
+            UNION SELECT expediente_id FROM filas_anteriores
+        ));
+    ELSE
+        PERFORM app.recalcular_progreso_expediente(ARRAY(SELECT expediente_id FROM filas_anteriores));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION app.trg_progreso_por_firma()
+RETURNS TRIGGER AS $$
+DECLARE
+    ruts INTEGER[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        ruts := ARRAY(SELECT rut_num FROM filas_nuevas);
+    ELSIF TG_OP = 'UPDATE' THEN
+        ruts := ARRAY(SELECT rut_num FROM filas_nuevas UNION SELECT rut_num FROM filas_anteriores);
+    ELSE
+        ruts := ARRAY(SELECT rut_num FROM filas_anteriores);
+    END IF;
+
+    -- Antes de buscar los expedientes: así se ven los beneficiarios y
+    -- representantes que otra transacción confirmó mientras se esperaba
+    PERFORM app.bloquear_ruts_progreso(ruts);
+
+    PERFORM app.recalcular_progreso_expediente(ARRAY(
+        SELECT b.expediente_id FROM app.beneficiarios b WHERE b.ben_run_num = ANY(ruts)
+        UNION
+        SELECT r.expediente_id FROM app.representante r WHERE r.rep_rut_num = ANY(ruts)
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Corregir los conteos que hayan quedado desactualizados por esta carrera
+SELECT app.recalcular_progreso_expediente(ARRAY(SELECT id FROM app.expediente));
@@ -1,22 +1,33 @@
 """
 Decoradores de autenticación y autorización
 """
+import logging
 from functools import wraps
 from flask import jsonify, session
 
+logger = logging.getLogger(__name__)
+
 def login_required(f):
     """Decorador para requerir autenticación"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        print(f"🔍 Verificando sesión para {f.__name__}")
-        print(f"🔍 Session keys: {list(session.keys())}")
-        print(f"🔍 User ID en sesión: {session.get('user_id', 'NO HAY')}")
-        
         if 'user_id' not in session:
-            print(f"❌ No autorizado - no hay user_id en sesión")
+            logger.debug("No autorizado en %s - no hay user_id en sesión", f.__name__)
             return jsonify({'error': 'No autorizado', 'redirect': '/IngresoCredenciales.html'}), 401
         
-        print(f"✅ Autorizado - user_id: {session['user_id']}")
+        logger.debug("Autorizado en %s - user_id: %s", f.__name__, session['user_id'])
         return f(*args, **kwargs)
     return decorated_function
 
+def rol_requerido(*roles):
+    """Decorador para restringir una ruta a ciertos roles (usar después de login_required)"""
+    def decorador(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if session.get('rol') not in roles:
+                logger.debug("Acceso denegado en %s - rol: %s", f.__name__, session.get('rol'))
+                return jsonify({'error': 'No tiene permisos para acceder a este recurso'}), 403
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorador
+
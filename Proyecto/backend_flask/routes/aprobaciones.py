@@ -1,10 +1,90 @@
 """
 Rutas de gestión de aprobaciones y rechazos
 """
+import logging
 from flask import request, jsonify, session
 from psycopg2.extras import RealDictCursor
 from utils.database import get_db_connection
 from middleware.auth import login_required
+from utils.paginacion import leer_paginacion, filtros_keyset, armar_pagina
+from utils.pdf_cache import invalidar_pdfs_expediente
+
+logger = logging.getLogger(__name__)
+
+def _documentos_por_expediente(cur, expediente_ids):
+    """Documentos de varios expedientes en una sola consulta: {expediente_id: [documentos]}"""
+    resultado = {}
+    if not expediente_ids:
+        return resultado
+    
+    cur.execute("""
+        SELECT 
+            d.id,
+            d.expediente_id,
+            d.doc_nombre_archivo,
+            d.doc_tipo_id,
+            d.doc_tamano_bytes,
+            d.doc_mime_type,
+            d.doc_fecha_subida,
+            d.doc_estado,
+            d.doc_ruta_storage
+        FROM app.documentos_saldo_insoluto d
+        WHERE d.expediente_id = ANY(%s)
+        ORDER BY d.expediente_id, d.doc_fecha_subida DESC
+    """, (expediente_ids,))
+    
+    for doc in cur.fetchall():
+        tamano_mb = (doc['doc_tamano_bytes'] / (1024 * 1024)) if doc['doc_tamano_bytes'] else 0
+        resultado.setdefault(doc['expediente_id'], []).append({
+            'id': doc['id'],
+            'nombre': doc['doc_nombre_archivo'],
+            'tipo_id': doc['doc_tipo_id'],
+            'tamano_mb': round(tamano_mb, 2),
+            'mime_type': doc['doc_mime_type'],
+            'fecha_subida': doc['doc_fecha_subida'].strftime('%d/%m/%Y %H:%M') if doc['doc_fecha_subida'] else 'No especificada',
+            'estado': doc['doc_estado'],
+            'ruta_descarga': doc['doc_ruta_storage']
+        })
+    return resultado
+
+def _beneficiarios_por_expediente(cur, expediente_ids):
+    """Beneficiarios (con su firma) de varios expedientes: {expediente_id: [beneficiarios]}"""
+    resultado = {}
+    if not expediente_ids:
+        return resultado
+    
+    cur.execute("""
+        SELECT 
+            b.id,
+            b.expediente_id,
+            b.ben_nombre,
+            b.ben_run,
+            b.ben_parentesco,
+            uf.id as firma_id,
+            uf.rut as firma_rut
+        FROM app.beneficiarios b
+        LEFT JOIN LATERAL (
+            SELECT id, rut FROM app.usuarios_firma
+            WHERE rut_num = b.ben_run_num
+            ORDER BY id LIMIT 1
+        ) uf ON TRUE
+        WHERE b.expediente_id = ANY(%s)
+        ORDER BY b.id
+    """, (expediente_ids,))
+    
+    for ben in cur.fetchall():
+        resultado.setdefault(ben['expediente_id'], []).append({
+            'id': ben['id'],
+            'expediente_id': ben['expediente_id'],
+            'nombre_completo': ben['ben_nombre'] or 'Sin nombre',
+            'rut': ben['ben_run'],
+            'parentesco': ben['ben_parentesco'],
+            'firma': {
+                'firmado': ben['firma_id'] is not None,
+                'rut_firma': ben['firma_rut'] if ben['firma_rut'] else None
+            }
+        })
+    return resultado
 
 def register_routes(app):
     """Registrar rutas de aprobaciones"""
@@ -13,7 +93,7 @@ def register_routes(app):
     @login_required
     def solicitudes_pendientes():
         """Obtener solicitudes pendientes de aprobación por jefatura"""
-        print("🔔 Petición de solicitudes pendientes")
+        logger.debug("Petición de solicitudes pendientes")
         
         conn = get_db_connection()
         if not conn:
@@ -21,143 +101,95 @@ def register_routes(app):
         
         try:
             estado_filtro = request.args.get('estado', '')
-            sucursal_filtro = request.args.get('sucursal', '')
+            
+            try:
+                paginacion = leer_paginacion(request.args)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
             
             cur = conn.cursor(cursor_factory=RealDictCursor)
             
-            # Construir consulta base
-            query = """
-                SELECT DISTINCT
+            # Por defecto, mostrar solo pendientes (en revisión)
+            condiciones = ['s.estado = %s']
+            params = [estado_filtro or 'pendiente']
+            
+            # Filtros opcionales (sucursal, rango de fechas, prefijo RUT causante) y cursor
+            condiciones_extra, params_extra = filtros_keyset(paginacion)
+            condiciones += condiciones_extra
+            params += params_extra
+            
+            # Primero se elige la página de solicitudes recorriendo el índice
+            # (estado, fecha_creacion, id); luego se completan sus datos
+            query = f"""
+                WITH pagina AS (
+                    SELECT s.id, s.expediente_id, s.folio, s.estado, s.firmado_funcionario,
+                           s.sucursal, s.fecha_creacion
+                    FROM app.solicitudes s
+                    WHERE {' AND '.join(condiciones)}
+                      AND EXISTS (SELECT 1 FROM app.causante cx WHERE cx.expediente_id = s.expediente_id)
+                    ORDER BY s.fecha_creacion DESC, s.id DESC
+                    LIMIT %s
+                )
+                SELECT
                     e.id as expediente_id,
                     e.expediente_numero,
                     e.fecha_creacion,
-                    s.id as solicitud_id,
-                    s.folio,
-                    s.estado as estado_solicitud,
-                    s.firmado_funcionario,
-                    s.sucursal,
+                    p.id as solicitud_id,
+                    p.fecha_creacion as solicitud_fecha_creacion,
+                    p.folio,
+                    p.estado as estado_solicitud,
+                    p.firmado_funcionario,
+                    p.sucursal,
                     c.fal_nombre || ' ' || c.fal_apellido_p || ' ' || COALESCE(c.fal_apellido_m, '') as causante_nombre_completo,
                     c.fal_run as causante_rut,
                     c.fal_fecha_defuncion as causante_fecha_defuncion,
                     r.rep_nombre || ' ' || COALESCE(r.rep_apellido_p, '') || ' ' || COALESCE(r.rep_apellido_m, '') as representante_nombre_completo,
                     r.rep_rut as representante_rut,
                     r.rep_calidad as representante_calidad,
-                    COUNT(DISTINCT b.id) as total_beneficiarios,
-                    COUNT(DISTINCT uf.id) as beneficiarios_firmados,
-                    COUNT(DISTINCT d.id) as total_documentos
-                FROM app.expediente e
-                JOIN app.solicitudes s ON e.id = s.expediente_id
-                JOIN app.causante c ON e.id = c.expediente_id
-                LEFT JOIN app.representante r ON e.id = r.expediente_id
-                LEFT JOIN app.beneficiarios b ON e.id = b.expediente_id
-                LEFT JOIN app.usuarios_firma uf ON b.ben_run = uf.rut
-                LEFT JOIN app.documentos_saldo_insoluto d ON e.id = d.expediente_id
-                WHERE 1=1
-            """
-            
-            params = []
-            
-            # Filtro por estado
-            if estado_filtro:
-                # Filtrar por estado exacto (pendiente o completado)
-                query += " AND s.estado = %s"
-                params.append(estado_filtro)
-            else:
-                # Por defecto, mostrar solo pendientes (en revisión)
-                query += " AND s.estado = 'pendiente'"
-            
-            # Filtro por sucursal
-            if sucursal_filtro:
-                query += " AND s.sucursal = %s"
-                params.append(sucursal_filtro)
-            
-            query += """
-                GROUP BY e.id, e.expediente_numero, e.fecha_creacion,
-                         s.id, s.folio, s.estado, s.firmado_funcionario, s.sucursal,
-                         c.fal_nombre, c.fal_apellido_p, c.fal_apellido_m, c.fal_run, c.fal_fecha_defuncion,
-                         r.rep_nombre, r.rep_apellido_p, r.rep_apellido_m, r.rep_rut, r.rep_calidad
-                ORDER BY e.fecha_creacion DESC
+                    COALESCE(pr.total_beneficiarios, 0) as total_beneficiarios,
+                    COALESCE(pr.beneficiarios_firmados, 0) as beneficiarios_firmados,
+                    COALESCE(pr.total_documentos, 0) as total_documentos,
+                    COALESCE(pr.representante_firmado, FALSE) as representante_firmado
+                FROM pagina p
+                JOIN app.expediente e ON e.id = p.expediente_id
+                JOIN LATERAL (
+                    SELECT fal_nombre, fal_apellido_p, fal_apellido_m, fal_run, fal_fecha_defuncion
+                    FROM app.causante
+                    WHERE expediente_id = e.id
+                    LIMIT 1
+                ) c ON TRUE
+                LEFT JOIN LATERAL (
+                    SELECT rep_nombre, rep_apellido_p, rep_apellido_m, rep_rut, rep_calidad
+                    FROM app.representante
+                    WHERE expediente_id = e.id
+                    LIMIT 1
+                ) r ON TRUE
+                LEFT JOIN app.progreso_expediente pr ON pr.expediente_id = e.id
+                ORDER BY p.fecha_creacion DESC, p.id DESC
             """
+            params.append(paginacion['limit'] + 1)
             
             cur.execute(query, tuple(params))
-            solicitudes = cur.fetchall()
+            solicitudes, info_paginacion = armar_pagina(
+                cur.fetchall(), paginacion['limit'], campo_fecha='solicitud_fecha_creacion'
+            )
+            
+            # Cargar documentos y beneficiarios de todos los expedientes
+            # en consultas por lote (número de consultas constante)
+            expediente_ids = list({s['expediente_id'] for s in solicitudes})
+            documentos_por_expediente = _documentos_por_expediente(cur, expediente_ids)
+            beneficiarios_por_expediente = _beneficiarios_por_expediente(cur, expediente_ids)
             
             # Procesar resultado
             resultados = []
             for s in solicitudes:
                 pendientes_firmas = (s['total_beneficiarios'] or 0) - (s['beneficiarios_firmados'] or 0)
                 
-                # Obtener documentos del expediente
-                cur.execute("""
-                    SELECT 
-                        d.id,
-                        d.doc_nombre_archivo,
-                        d.doc_tipo_id,
-                        d.doc_tamano_bytes,
-                        d.doc_mime_type,
-                        d.doc_fecha_subida,
-                        d.doc_estado,
-                        d.doc_ruta_storage
-                    FROM app.documentos_saldo_insoluto d
-                    WHERE d.expediente_id = %s
-                    ORDER BY d.doc_fecha_subida DESC
-                """, (s['expediente_id'],))
-                
-                documentos_db = cur.fetchall()
-                documentos_lista = []
-                for doc in documentos_db:
-                    tamano_mb = (doc['doc_tamano_bytes'] / (1024 * 1024)) if doc['doc_tamano_bytes'] else 0
-                    documentos_lista.append({
-                        'id': doc['id'],
-                        'nombre': doc['doc_nombre_archivo'],
-                        'tipo_id': doc['doc_tipo_id'],
-                        'tamano_mb': round(tamano_mb, 2),
-                        'mime_type': doc['doc_mime_type'],
-                        'fecha_subida': doc['doc_fecha_subida'].strftime('%d/%m/%Y %H:%M') if doc['doc_fecha_subida'] else 'No especificada',
-                        'estado': doc['doc_estado'],
-                        'ruta_descarga': doc['doc_ruta_storage']
-                    })
-                
-                # Verificar si representante tiene firma
-                representante_firmado = False
-                if s['representante_rut']:
-                    cur.execute("""
-                        SELECT id FROM app.usuarios_firma 
-                        WHERE UPPER(rut) = UPPER(%s)
-                    """, (s['representante_rut'],))
-                    if cur.fetchone():
-                        representante_firmado = True
-                
-                # Obtener beneficiarios del expediente
-                cur.execute("""
-                    SELECT 
-                        b.id,
-                        b.expediente_id,
-                        b.ben_nombre,
-                        b.ben_run,
-                        b.ben_parentesco,
-                        uf.id as firma_id,
-                        uf.rut as firma_rut
-                    FROM app.beneficiarios b
-                    LEFT JOIN app.usuarios_firma uf ON b.ben_run = uf.rut
-                    WHERE b.expediente_id = %s
-                    ORDER BY b.id
-                """, (s['expediente_id'],))
+                documentos_lista = documentos_por_expediente.get(s['expediente_id'], [])
+                beneficiarios_lista = beneficiarios_por_expediente.get(s['expediente_id'], [])
                 
-                beneficiarios_db = cur.fetchall()
-                beneficiarios_lista = []
-                for ben in beneficiarios_db:
-                    beneficiarios_lista.append({
-                        'id': ben['id'],
-                        'expediente_id': ben['expediente_id'],
-                        'nombre_completo': ben['ben_nombre'] or 'Sin nombre',
-                        'rut': ben['ben_run'],
-                        'parentesco': ben['ben_parentesco'],
-                        'firma': {
-                            'firmado': ben['firma_id'] is not None,
-                            'rut_firma': ben['firma_rut'] if ben['firma_rut'] else None
-                        }
-                    })
+                # Firma del representante (precalculada en progreso_expediente)
+                representante_firmado = bool(s['representante_rut']) and bool(s['representante_firmado'])
                 
                 resultados.append({
                     'expediente_id': s['expediente_id'],
@@ -195,11 +227,12 @@ def register_routes(app):
             
             return jsonify({
                 'success': True,
-                'data': resultados
+                'data': resultados,
+                'paginacion': info_paginacion
             }), 200
             
         except Exception as e:
-            print(f'❌ Error obteniendo solicitudes pendientes: {e}')
+            logger.exception('Error obteniendo solicitudes pendientes: %s', e)
             if 'conn' in locals():
                 conn.close()
             return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
@@ -261,7 +294,7 @@ def register_routes(app):
             }), 200
             
         except Exception as e:
-            print(f'❌ Error obteniendo aprobación de items: {e}')
+            logger.exception('Error obteniendo aprobación de items: %s', e)
             if 'conn' in locals():
                 conn.close()
             return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
@@ -358,7 +391,7 @@ def register_routes(app):
             }), 200
             
         except Exception as e:
-            print(f'❌ Error aprobando/rechazando item: {e}')
+            logger.exception('Error aprobando/rechazando item: %s', e)
             if 'conn' in locals():
                 conn.rollback()
                 conn.close()
@@ -374,34 +407,61 @@ def register_routes(app):
         
         try:
             funcionario_id = session.get('user_id')
+            
+            try:
+                paginacion = leer_paginacion(request.args)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
             cur = conn.cursor(cursor_factory=RealDictCursor)
             
+            condiciones = ["s.estado = 'rechazado/enRevision'", 'ex.funcionario_id = %s']
+            params = [funcionario_id]
+            condiciones_extra, params_extra = filtros_keyset(paginacion)
+            condiciones += condiciones_extra
+            params += params_extra
+            params.append(paginacion['limit'] + 1)
+            
             # Obtener solicitudes rechazadas del funcionario (por expediente que gestionó)
-            cur.execute("""
-                SELECT DISTINCT
+            cur.execute(f"""
+                WITH pagina AS (
+                    SELECT s.id, s.expediente_id, s.folio, s.estado, s.firmado_funcionario,
+                           s.sucursal, s.fecha_creacion
+                    FROM app.solicitudes s
+                    JOIN app.expediente ex ON ex.id = s.expediente_id
+                    WHERE {' AND '.join(condiciones)}
+                      AND EXISTS (SELECT 1 FROM app.causante cx WHERE cx.expediente_id = s.expediente_id)
+                    ORDER BY s.fecha_creacion DESC, s.id DESC
+                    LIMIT %s
+                )
+                SELECT
                     e.id as expediente_id,
                     e.expediente_numero,
                     e.fecha_creacion,
-                    s.id as solicitud_id,
-                    s.folio,
-                    s.estado as estado_solicitud,
-                    s.firmado_funcionario,
-                    s.sucursal,
+                    p.id as solicitud_id,
+                    p.fecha_creacion as solicitud_fecha_creacion,
+                    p.folio,
+                    p.estado as estado_solicitud,
+                    p.firmado_funcionario,
+                    p.sucursal,
                     c.fal_nombre || ' ' || c.fal_apellido_p || ' ' || COALESCE(c.fal_apellido_m, '') as causante_nombre_completo,
                     c.fal_run as causante_rut,
-                    COUNT(DISTINCT ai.id) FILTER (WHERE ai.estado = 'rechazado') as items_rechazados
-                FROM app.expediente e
-                JOIN app.solicitudes s ON e.id = s.expediente_id
-                JOIN app.causante c ON e.id = c.expediente_id
-                LEFT JOIN app.aprobacion_items ai ON s.id = ai.solicitud_id AND ai.estado = 'rechazado'
-                WHERE s.estado = 'rechazado/enRevision' AND e.funcionario_id = %s
-                GROUP BY e.id, e.expediente_numero, e.fecha_creacion,
-                         s.id, s.folio, s.estado, s.firmado_funcionario, s.sucursal,
-                         c.fal_nombre, c.fal_apellido_p, c.fal_apellido_m, c.fal_run
-                ORDER BY e.fecha_creacion DESC
-            """, (funcionario_id,))
-            
-            solicitudes = cur.fetchall()
+                    (SELECT COUNT(*) FROM app.aprobacion_items ai
+                     WHERE ai.solicitud_id = p.id AND ai.estado = 'rechazado') as items_rechazados
+                FROM pagina p
+                JOIN app.expediente e ON e.id = p.expediente_id
+                JOIN LATERAL (
+                    SELECT fal_nombre, fal_apellido_p, fal_apellido_m, fal_run
+                    FROM app.causante
+                    WHERE expediente_id = e.id
+                    LIMIT 1
+                ) c ON TRUE
+                ORDER BY p.fecha_creacion DESC, p.id DESC
+            """, tuple(params))
+            
+            solicitudes, info_paginacion = armar_pagina(
+                cur.fetchall(), paginacion['limit'], campo_fecha='solicitud_fecha_creacion'
+            )
             
             resultados = []
             for s in solicitudes:
@@ -424,11 +484,12 @@ def register_routes(app):
             
             return jsonify({
                 'success': True,
-                'data': resultados
+                'data': resultados,
+                'paginacion': info_paginacion
             }), 200
             
         except Exception as e:
-            print(f'❌ Error obteniendo solicitudes rechazadas: {e}')
+            logger.exception('Error obteniendo solicitudes rechazadas: %s', e)
             if 'conn' in locals():
                 conn.close()
             return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
@@ -516,6 +577,8 @@ def register_routes(app):
             cur.close()
             conn.close()
             
+            invalidar_pdfs_expediente(expediente_id)
+            
             return jsonify({
                 'success': True,
                 'message': 'Solicitud aprobada exitosamente',
@@ -526,7 +589,7 @@ def register_routes(app):
             }), 200
             
         except Exception as e:
-            print(f'❌ Error aprobando solicitud: {e}')
+            logger.exception('Error aprobando solicitud: %s', e)
             if 'conn' in locals():
                 conn.rollback()
                 conn.close()
@@ -536,7 +599,7 @@ def register_routes(app):
     @login_required
     def reenviar_solicitud(solicitud_id):
         """Reenviar solicitud rechazada para nueva evaluación por jefatura"""
-        print(f"🔄 Petición de reenvío para solicitud: {solicitud_id}")
+        logger.debug("Petición de reenvío para solicitud: %s", solicitud_id)
         conn = get_db_connection()
         if not conn:
             return jsonify({'error': 'Error de conexión a la base de datos'}), 500
@@ -551,23 +614,23 @@ def register_routes(app):
             if not solicitud:
                 cur.close()
                 conn.close()
-                print(f"❌ Solicitud {solicitud_id} no encontrada")
+                logger.warning("Solicitud %s no encontrada", solicitud_id)
                 return jsonify({'error': 'Solicitud no encontrada'}), 404
             
             estado_actual = solicitud[0]
             expediente_id = solicitud[1]
             
-            print(f"📊 Estado actual de solicitud {solicitud_id}: '{estado_actual}'")
+            logger.debug("Estado actual de solicitud %s: '%s'", solicitud_id, estado_actual)
             
             # Solo aceptar 'rechazado/enRevision' (estado cuando está siendo corregida)
             if estado_actual != 'rechazado/enRevision':
                 cur.close()
                 conn.close()
-                print(f"⚠️ La solicitud no está en estado rechazado/enRevision. Estado: '{estado_actual}'")
+                logger.warning("La solicitud no está en estado rechazado/enRevision. Estado: '%s'", estado_actual)
                 return jsonify({'error': f'La solicitud debe estar en estado rechazado/enRevision para reenviarla. Estado actual: {estado_actual}'}), 400
             
             # Cambiar estado de solicitud a 'pendiente'
-            print(f"🔄 Cambiando estado de '{estado_actual}' a 'pendiente'...")
+            logger.debug("Cambiando estado de '%s' a 'pendiente'...", estado_actual)
             cur.execute("""
                 UPDATE app.solicitudes 
                 SET estado = 'pendiente'
@@ -575,9 +638,9 @@ def register_routes(app):
             """, (solicitud_id,))
             
             if cur.rowcount == 0:
-                print(f"⚠️ No se pudo actualizar solicitud {solicitud_id} - rowcount: {cur.rowcount}")
+                logger.warning("No se pudo actualizar solicitud %s - rowcount: %s", solicitud_id, cur.rowcount)
             else:
-                print(f"✅ Solicitud {solicitud_id} actualizada - rowcount: {cur.rowcount}")
+                logger.debug("Solicitud %s actualizada - rowcount: %s", solicitud_id, cur.rowcount)
             
             # Resetear items rechazados a 'pendiente' para nueva evaluación
             cur.execute("""
@@ -589,7 +652,7 @@ def register_routes(app):
             """, (expediente_id, solicitud_id))
             
             items_reseteados = cur.rowcount
-            print(f"✅ Items rechazados reseteados: {items_reseteados}")
+            logger.info("Items rechazados reseteados: %s", items_reseteados)
             
             # Mantener items aprobados como aprobados (no resetearlos)
             
@@ -598,7 +661,7 @@ def register_routes(app):
             # Verificar que se guardó correctamente
             cur.execute("SELECT estado FROM app.solicitudes WHERE id = %s", (solicitud_id,))
             estado_verificado = cur.fetchone()[0]
-            print(f"✅ Estado verificado después del commit: '{estado_verificado}'")
+            logger.debug("Estado verificado después del commit: '%s'", estado_verificado)
             
             cur.close()
             conn.close()
@@ -615,9 +678,7 @@ def register_routes(app):
             }), 200
             
         except Exception as e:
-            print(f'❌ Error reenviando solicitud: {e}')
-            import traceback
-            print(traceback.format_exc())
+            logger.exception('Error reenviando solicitud: %s', e)
             if 'conn' in locals():
                 conn.rollback()
                 conn.close()
@@ -627,7 +688,7 @@ def register_routes(app):
     @login_required
     def enviar_solicitud_revision(solicitud_id):
         """Enviar solicitud rechazada a revisión (cambia de 'rechazado' a 'rechazado/enRevision')"""
-        print(f"📤 Petición de envío a revisión para solicitud: {solicitud_id}")
+        logger.debug("Petición de envío a revisión para solicitud: %s", solicitud_id)
         conn = get_db_connection()
         if not conn:
             return jsonify({'error': 'Error de conexión a la base de datos'}), 500
@@ -642,23 +703,23 @@ def register_routes(app):
             if not solicitud:
                 cur.close()
                 conn.close()
-                print(f"❌ Solicitud {solicitud_id} no encontrada")
+                logger.warning("Solicitud %s no encontrada", solicitud_id)
                 return jsonify({'error': 'Solicitud no encontrada'}), 404
             
             estado_actual = solicitud[0]
             expediente_id = solicitud[1]
             
-            print(f"📊 Estado actual de solicitud {solicitud_id}: '{estado_actual}'")
+            logger.debug("Estado actual de solicitud %s: '%s'", solicitud_id, estado_actual)
             
             # Solo aceptar 'rechazado' (no puede estar ya en revisión)
             if estado_actual != 'rechazado':
                 cur.close()
                 conn.close()
-                print(f"⚠️ La solicitud no está en estado rechazado. Estado: '{estado_actual}'")
+                logger.warning("La solicitud no está en estado rechazado. Estado: '%s'", estado_actual)
                 return jsonify({'error': f'La solicitud debe estar rechazada para enviarla a revisión. Estado actual: {estado_actual}'}), 400
             
             # Cambiar estado de solicitud a 'rechazado/enRevision'
-            print(f"🔄 Cambiando estado de 'rechazado' a 'rechazado/enRevision'...")
+            logger.debug("Cambiando estado de 'rechazado' a 'rechazado/enRevision'...")
             cur.execute("""
                 UPDATE app.solicitudes 
                 SET estado = 'rechazado/enRevision'
@@ -666,9 +727,9 @@ def register_routes(app):
             """, (solicitud_id,))
             
             if cur.rowcount == 0:
-                print(f"⚠️ No se pudo actualizar solicitud {solicitud_id} - rowcount: {cur.rowcount}")
+                logger.warning("No se pudo actualizar solicitud %s - rowcount: %s", solicitud_id, cur.rowcount)
             else:
-                print(f"✅ Solicitud {solicitud_id} actualizada - rowcount: {cur.rowcount}")
+                logger.debug("Solicitud %s actualizada - rowcount: %s", solicitud_id, cur.rowcount)
             
             # NO resetear items rechazados - mantener las observaciones para que jefatura vea qué se corrigió
             
@@ -677,7 +738,7 @@ def register_routes(app):
             # Verificar que se guardó correctamente
             cur.execute("SELECT estado FROM app.solicitudes WHERE id = %s", (solicitud_id,))
             estado_verificado = cur.fetchone()[0]
-            print(f"✅ Estado verificado después del commit: '{estado_verificado}'")
+            logger.debug("Estado verificado después del commit: '%s'", estado_verificado)
             
             cur.close()
             conn.close()
@@ -693,9 +754,7 @@ def register_routes(app):
             }), 200
             
         except Exception as e:
-            print(f'❌ Error enviando solicitud a revisión: {e}')
-            import traceback
-            print(traceback.format_exc())
+            logger.exception('Error enviando solicitud a revisión: %s', e)
             if 'conn' in locals():
                 conn.rollback()
                 conn.close()
@@ -1,12 +1,16 @@
 """
 Rutas de autenticación
 """
+import logging
 from flask import request, jsonify, session
 import bcrypt
 from utils.database import get_db_connection
+from utils.helpers import rut_a_clave
 from psycopg2.extras import RealDictCursor
 from middleware.auth import login_required
 
+logger = logging.getLogger(__name__)
+
 def register_routes(app):
     """Registrar rutas de autenticación"""
     
@@ -20,6 +24,11 @@ def register_routes(app):
         if not username or not password:
             return jsonify({'error': 'RUT y contraseña requeridos'}), 400
         
+        # El RUT se acepta en cualquier formato (con o sin puntos, guion, K minúscula)
+        clave_rut = rut_a_clave(username)
+        if not clave_rut:
+            return jsonify({'error': 'RUT o contraseña incorrectos'}), 401
+        
         conn = get_db_connection()
         if not conn:
             return jsonify({'error': 'Error de conexión a la base de datos'}), 500
@@ -29,8 +38,8 @@ def register_routes(app):
             cur.execute("""
                 SELECT id, rut, nombres, apellido_p, apellido_m, password_hash, rol, sucursal, iniciales
                 FROM app.funcionarios 
-                WHERE rut = %s AND activo = true
-            """, (username,))
+                WHERE rut_num = %s AND activo = true
+            """, (clave_rut[0],))
             
             funcionario = cur.fetchone()
             cur.close()
@@ -60,7 +69,7 @@ def register_routes(app):
                 return jsonify({'error': 'RUT o contraseña incorrectos'}), 401
                 
         except Exception as e:
-            print(f'❌ Error en login: {e}')
+            logger.exception('Error en login: %s', e)
             if 'conn' in locals():
                 conn.close()
             return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
@@ -70,31 +79,28 @@ def register_routes(app):
         """Cerrar sesión"""
         import traceback
         try:
-            print('🔔 Petición de cierre de sesión recibida')
-            print(f'📋 Tipo de session: {type(session)}')
+            logger.debug('Petición de cierre de sesión recibida')
             
             # Intentar obtener las keys de la sesión de forma segura
             try:
                 session_keys = list(session.keys()) if hasattr(session, 'keys') else []
-                print(f'📋 Session keys antes de limpiar: {session_keys}')
+                logger.debug('Session keys antes de limpiar: %s', session_keys)
             except Exception as session_error:
-                print(f'⚠️ No se pudieron leer las keys de la sesión: {session_error}')
-                print(f'⚠️ Traceback: {traceback.format_exc()}')
+                logger.warning('No se pudieron leer las keys de la sesión: %s', session_error, exc_info=True)
                 session_keys = []
             
             # Limpiar la sesión de forma segura
             try:
                 if hasattr(session, 'clear'):
                     session.clear()
-                    print('✅ Sesión limpiada exitosamente')
+                    logger.info('Sesión limpiada exitosamente')
                 else:
-                    print('⚠️ session no tiene método clear')
+                    logger.warning('session no tiene método clear')
                     # Intentar limpiar manualmente
                     for key in list(session.keys()):
                         session.pop(key, None)
             except Exception as clear_error:
-                print(f'⚠️ Error al limpiar sesión: {clear_error}')
-                print(f'⚠️ Traceback: {traceback.format_exc()}')
+                logger.warning('Error al limpiar sesión: %s', clear_error, exc_info=True)
                 # Continuar de todas formas
             
             return jsonify({
@@ -103,9 +109,7 @@ def register_routes(app):
             }), 200
             
         except Exception as e:
-            print(f'❌ Error cerrando sesión: {e}')
-            print(f'❌ Traceback completo:')
-            traceback.print_exc()
+            logger.exception('Error cerrando sesión: %s', e)
             
             # Intentar limpiar la sesión de todas formas
             try:
@@ -1,6 +1,7 @@
 """
 Rutas para autocompletar formularios desde Excel
 """
+import logging
 from flask import request, jsonify
 from utils.excel_service import (
     buscar_representante, 
@@ -9,9 +10,20 @@ from utils.excel_service import (
     buscar_beneficiario_por_rut,
     recargar_excel,
     esta_cargado,
+    estado_carga,
     normalizar_rut
 )
 
+logger = logging.getLogger(__name__)
+
+def _respuesta_no_disponible():
+    """Respuesta mientras los Excel aún se están cargando"""
+    estado = estado_carga()
+    return jsonify({
+        'error': 'Datos de autocompletado aún no disponibles',
+        'estado': estado['estado']
+    }), 503
+
 def register_routes(app):
     """Registrar rutas de autocompletado"""
     
@@ -29,12 +41,14 @@ def register_routes(app):
             datos = buscar_representante(rut_norm)
             
             if datos is None:
+                if not esta_cargado():
+                    return _respuesta_no_disponible()
                 return jsonify({'error': 'Representante no encontrado'}), 404
             
             return jsonify({'data': datos}), 200
             
         except Exception as e:
-            print(f'❌ Error en autocompletar_representante: {str(e)}')
+            logger.exception('Error en autocompletar_representante: %s', str(e))
             return jsonify({'error': f'Error interno: {str(e)}'}), 500
     
     @app.route('/api/autocompletar/causante/<rut>', methods=['GET'])
@@ -51,12 +65,14 @@ def register_routes(app):
             datos = buscar_causante(rut_norm)
             
             if datos is None:
+                if not esta_cargado():
+                    return _respuesta_no_disponible()
                 return jsonify({'error': 'Causante no encontrado'}), 404
             
             return jsonify({'data': datos}), 200
             
         except Exception as e:
-            print(f'❌ Error en autocompletar_causante: {str(e)}')
+            logger.exception('Error en autocompletar_causante: %s', str(e))
             return jsonify({'error': f'Error interno: {str(e)}'}), 500
     
     @app.route('/api/autocompletar/beneficiarios/<rut_causante>', methods=['GET'])
@@ -72,10 +88,13 @@ def register_routes(app):
             # Buscar beneficiarios
             beneficiarios = buscar_beneficiarios(rut_norm)
             
+            if not beneficiarios and not esta_cargado():
+                return _respuesta_no_disponible()
+            
             return jsonify({'data': beneficiarios}), 200
             
         except Exception as e:
-            print(f'❌ Error en autocompletar_beneficiarios: {str(e)}')
+            logger.exception('Error en autocompletar_beneficiarios: %s', str(e))
             return jsonify({'error': f'Error interno: {str(e)}'}), 500
     
     @app.route('/api/autocompletar/recargar', methods=['POST'])
@@ -87,7 +106,7 @@ def register_routes(app):
             else:
                 return jsonify({'error': 'Error al recargar Excel'}), 500
         except Exception as e:
-            print(f'❌ Error recargando Excel: {str(e)}')
+            logger.exception('Error recargando Excel: %s', str(e))
             return jsonify({'error': f'Error interno: {str(e)}'}), 500
     
     @app.route('/api/autocompletar/beneficiario/<rut>', methods=['GET'])
@@ -104,18 +123,18 @@ def register_routes(app):
             datos = buscar_beneficiario_por_rut(rut_norm)
             
             if datos is None:
+                if not esta_cargado():
+                    return _respuesta_no_disponible()
                 return jsonify({'error': 'Beneficiario no encontrado'}), 404
             
             return jsonify({'data': datos}), 200
             
         except Exception as e:
-            print(f'❌ Error en autocompletar_beneficiario: {str(e)}')
+            logger.exception('Error en autocompletar_beneficiario: %s', str(e))
             return jsonify({'error': f'Error interno: {str(e)}'}), 500
     
     @app.route('/api/autocompletar/status', methods=['GET'])
     def status_excel():
-        """Verificar estado de carga de Excel"""
-        return jsonify({
-            'cargado': esta_cargado()
-        }), 200
+        """Verificar estado de carga de Excel (readiness del autocompletado)"""
+        return jsonify(estado_carga()), 200
 
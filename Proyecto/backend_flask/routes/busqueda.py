@@ -1,11 +1,15 @@
 """
 Rutas de búsqueda de saldos insolutos
 """
+import logging
 from flask import request, jsonify
 from psycopg2.extras import RealDictCursor
 from utils.database import get_db_connection
+from utils.helpers import normalizar_rut, rut_a_clave
 from middleware.auth import login_required
 
+logger = logging.getLogger(__name__)
+
 def register_routes(app):
     """Registrar rutas de búsqueda"""
     
@@ -13,7 +17,7 @@ def register_routes(app):
     @login_required
     def buscar_saldo_insoluto():
         """Buscar saldos insolutos por RUT del causante"""
-        print("🔔 Petición de búsqueda de saldo insoluto")
+        logger.debug("Petición de búsqueda de saldo insoluto")
         
         conn = get_db_connection()
         if not conn:
@@ -29,18 +33,16 @@ def register_routes(app):
             rut = data['rut'].strip()
             
             # Validar formato básico de RUT (sin validación matemática estricta)
-            rut_limpio = rut.replace('.', '').replace('-', '').upper()
-            if len(rut_limpio) < 8 or len(rut_limpio) > 9:
-                return jsonify({'error': 'Formato de RUT inválido'}), 400
-            
-            if not rut_limpio[:-1].isdigit() or rut_limpio[-1] not in '0123456789K':
+            clave_rut = rut_a_clave(rut)
+            if clave_rut is None or not 8 <= len(normalizar_rut(rut)) <= 9:
                 return jsonify({'error': 'Formato de RUT inválido'}), 400
             
             cur = conn.cursor(cursor_factory=RealDictCursor)
             
-            # Buscar expedientes por RUT del causante
+            # Buscar expedientes por RUT del causante: una fila por expediente con
+            # su última solicitud; los conteos vienen ya agregados en progreso_expediente
             cur.execute("""
-                SELECT DISTINCT
+                SELECT
                     e.id as expediente_id,
                     e.expediente_numero,
                     e.estado as estado_expediente,
@@ -55,20 +57,20 @@ def register_routes(app):
                     s.estado as estado_solicitud,
                     s.sucursal,
                     e.fecha_creacion,
-                    COUNT(b.id) as total_beneficiarios,
-                    COUNT(uf.id) as beneficiarios_firmados
-                FROM app.expediente e
-                JOIN app.causante c ON e.id = c.expediente_id
-                JOIN app.solicitudes s ON e.id = s.expediente_id
-                LEFT JOIN app.beneficiarios b ON e.id = b.expediente_id
-                LEFT JOIN app.usuarios_firma uf ON b.ben_run = uf.rut
-                WHERE c.fal_run = %s
-                GROUP BY e.id, e.expediente_numero, e.estado, e.observaciones, e.fecha_creacion,
-                         c.fal_nombre, c.fal_apellido_p, c.fal_apellido_m, c.fal_run,
-                         c.fal_fecha_defuncion, c.fal_comuna_defuncion,
-                         s.folio, s.estado, s.sucursal
+                    COALESCE(p.total_beneficiarios, 0) as total_beneficiarios,
+                    COALESCE(p.beneficiarios_firmados, 0) as beneficiarios_firmados
+                FROM app.causante c
+                JOIN app.expediente e ON e.id = c.expediente_id
+                JOIN LATERAL (
+                    SELECT folio, estado, sucursal FROM app.solicitudes
+                    WHERE expediente_id = e.id
+                    ORDER BY id DESC
+                    LIMIT 1
+                ) s ON TRUE
+                LEFT JOIN app.progreso_expediente p ON p.expediente_id = e.id
+                WHERE c.fal_run_num = %s
                 ORDER BY e.fecha_creacion DESC
-            """, (rut,))
+            """, (clave_rut[0],))
             
             expedientes = cur.fetchall()
             
@@ -132,7 +134,7 @@ def register_routes(app):
             cur.close()
             conn.close()
             
-            print(f'✅ Búsqueda exitosa para RUT {rut}: {len(resultados)} expedientes encontrados')
+            logger.info('Búsqueda exitosa para RUT %s: %s expedientes encontrados', rut, len(resultados))
             
             return jsonify({
                 'success': True,
@@ -145,7 +147,7 @@ def register_routes(app):
             }), 200
             
         except Exception as e:
-            print(f'❌ Error en búsqueda de saldo insoluto: {e}')
+            logger.exception('Error en búsqueda de saldo insoluto: %s', e)
             if 'conn' in locals():
                 conn.close()
             return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
@@ -1,11 +1,15 @@
 """
 Rutas de gestión de cálculos de saldo insoluto
 """
+import logging
 from flask import request, jsonify, session
 from psycopg2.extras import RealDictCursor
-from utils.database import get_db_connection
+from utils.database import get_db_connection, insertar_filas
 from middleware.auth import login_required
-from services.solicitud_service import verificar_y_actualizar_estado_pendiente
+from services.solicitud_service import verificar_y_actualizar_estado_pendiente, requisitos_pendientes
+from utils.pdf_cache import invalidar_pdfs_expediente
+
+logger = logging.getLogger(__name__)
 
 def register_routes(app):
     """Registrar rutas de cálculos"""
@@ -89,39 +93,38 @@ def register_routes(app):
                 """, (expediente_id, solicitud_id, total, funcionario_id))
                 calculo_id = cur.fetchone()[0]
             
-            # Insertar detalles de beneficios (tanto para nuevo como para actualizado)
-            for beneficio in beneficios:
-                cur.execute("""
-                    INSERT INTO app.detalle_calculo_saldo 
-                    (calculo_id, beneficio_codigo, beneficio_nombre, monto)
-                    VALUES (%s, %s, %s, %s)
-                """, (calculo_id, beneficio.get('codigo'), beneficio.get('nombre'), beneficio.get('monto')))
+            # Insertar detalles de beneficios en un solo INSERT (tanto para nuevo como para actualizado)
+            insertar_filas(
+                cur, 'app.detalle_calculo_saldo',
+                ('calculo_id', 'beneficio_codigo', 'beneficio_nombre', 'monto'),
+                (
+                    (calculo_id, beneficio.get('codigo'), beneficio.get('nombre'), beneficio.get('monto'))
+                    for beneficio in beneficios
+                )
+            )
             
-            print(f"✅ Cálculo guardado: ID {calculo_id}, Total: {total}")
+            logger.info("Cálculo guardado: ID %s, Total: %s", calculo_id, total)
             
             # Verificar si la solicitud está lista para evaluación (todas las firmas + cálculo)
             # IMPORTANTE: Verificar DESPUÉS de insertar el cálculo para que lo encuentre
             estado_actualizado = False
+            pendientes = []
             if solicitud_id:
-                print(f"\n{'='*60}")
-                print(f"🔍 INICIANDO VERIFICACIÓN DE ESTADO PARA SOLICITUD {solicitud_id}")
-                print(f"{'='*60}\n")
-                resultado_verificacion = verificar_y_actualizar_estado_pendiente(expediente_id, solicitud_id, cur, conn)
-                print(f"\n{'='*60}")
-                if resultado_verificacion:
-                    print(f"✅ RESULTADO: Solicitud {solicitud_id} BLOQUEADA - Estado actualizado a 'pendiente'")
-                    estado_actualizado = True
-                else:
-                    print(f"❌ RESULTADO: Solicitud {solicitud_id} NO se pudo actualizar a 'pendiente'")
-                    print(f"   Revisa los mensajes anteriores para ver qué condición no se cumplió")
-                print(f"{'='*60}\n")
+                estado_actualizado = verificar_y_actualizar_estado_pendiente(expediente_id, solicitud_id, cur, conn)
+                if not estado_actualizado:
+                    # El diagnóstico solo se consulta cuando la solicitud no avanzó
+                    pendientes = requisitos_pendientes(expediente_id, solicitud_id, cur)
+                    logger.info("Solicitud %s sigue sin pasar a 'pendiente': %s", solicitud_id, '; '.join(pendientes))
             else:
-                print(f"⚠️ No se proporcionó solicitud_id, no se puede verificar estado")
+                logger.warning("No se proporcionó solicitud_id, no se puede verificar estado")
             
             conn.commit()
             cur.close()
             conn.close()
             
+            # El cálculo cambió: las resoluciones guardadas ya no sirven
+            invalidar_pdfs_expediente(expediente_id)
+            
             return jsonify({
                 'success': True,
                 'message': 'Cálculo guardado exitosamente',
@@ -129,12 +132,13 @@ def register_routes(app):
                     'calculo_id': calculo_id,
                     'expediente_id': expediente_id,
                     'total': total,
-                    'estado_actualizado': estado_actualizado
+                    'estado_actualizado': estado_actualizado,
+                    'requisitos_pendientes': pendientes
                 }
             }), 201
             
         except Exception as e:
-            print(f'❌ Error guardando cálculo: {e}')
+            logger.exception('Error guardando cálculo: %s', e)
             if 'conn' in locals():
                 conn.rollback()
                 conn.close()
@@ -180,7 +184,7 @@ def register_routes(app):
                 }), 200
             
         except Exception as e:
-            print(f'❌ Error verificando cálculo: {e}')
+            logger.exception('Error verificando cálculo: %s', e)
             if 'conn' in locals():
                 conn.close()
             return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
@@ -261,7 +265,7 @@ def register_routes(app):
             }), 200
             
         except Exception as e:
-            print(f'❌ Error obteniendo cálculo completo: {e}')
+            logger.exception('Error obteniendo cálculo completo: %s', e)
             if 'conn' in locals():
                 conn.close()
             return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
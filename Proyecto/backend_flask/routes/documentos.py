@@ -1,15 +1,212 @@
 """
 Rutas de gestión de documentos
 """
-from flask import request, jsonify, send_file
+import logging
+from flask import request, jsonify, send_file, Response, stream_with_context, session
 import io
-import zipfile
+import uuid
 from psycopg2.extras import RealDictCursor
 from utils.database import get_db_connection
-from utils.helpers import allowed_file, get_file_hash, get_mime_type
+from utils.helpers import allowed_file, get_mime_type
 from werkzeug.utils import secure_filename
 from middleware.auth import login_required
 from utils.helpers import ALLOWED_EXTENSIONS, MAX_FILE_SIZE
+from utils.zip_stream import generar_zip
+from utils.storage import get_storage, ArchivoEntrante
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
+from config import Config
+from utils.subidas import (
+    ChunkInvalido, recibir_chunk, aceptar_chunk, ensamblar, eliminar_archivos, tamano_esperado
+)
+
+logger = logging.getLogger(__name__)
+
+_config = Config()
+
+# Margen para los campos del formulario y los encabezados multipart
+MARGEN_MULTIPART = 64 * 1024
+
+# Memoria máxima para los campos de texto del formulario (y el buffer del parser)
+MAX_FORM_MEMORIA = 500 * 1024
+
+def _recibir_formulario():
+    """
+    Leer el cuerpo multipart por bloques.
+    Cada archivo se escribe a un temporal del almacenamiento mientras llega, con
+    su SHA-256 calculado en el camino. Retorna (form, files, destinos).
+    Lanza RequestEntityTooLarge apenas se supera MAX_FILE_SIZE.
+    """
+    limite_cuerpo = MAX_FILE_SIZE + MARGEN_MULTIPART
+    if request.content_length is not None and request.content_length > limite_cuerpo:
+        raise RequestEntityTooLarge()
+    
+    destinos = []
+    directorio = get_storage().directorio_temporal()
+    
+    def stream_factory(total_content_length=None, content_type=None, filename=None, content_length=None):
+        destino = ArchivoEntrante(directorio, MAX_FILE_SIZE)
+        destinos.append(destino)
+        return destino
+    
+    try:
+        _, form, files = parse_form_data(
+            request.environ,
+            stream_factory=stream_factory,
+            max_form_memory_size=MAX_FORM_MEMORIA,
+            max_content_length=limite_cuerpo,
+            silent=False
+        )
+    except Exception:
+        for destino in destinos:
+            destino.descartar()
+        raise
+    return form, files, destinos
+
+def _bloquear_contenido(cur, sha256):
+    """
+    Serializar (dentro de la transacción) las operaciones sobre un mismo contenido,
+    para que una subida y una eliminación del mismo hash no se crucen.
+    """
+    cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (sha256,))
+
+def _descartar_contenido_sin_documento(conn, sha256):
+    """
+    Borrar del almacenamiento un contenido que esta petición guardó, si su
+    documento no llegó a confirmarse (se llama después del rollback). Con el
+    lock del hash tomado solo se borra si ningún documento lo referencia: otra
+    subida del mismo contenido pudo confirmarse entretanto.
+    """
+    try:
+        cur = conn.cursor()
+        _bloquear_contenido(cur, sha256)
+        cur.execute("""
+            SELECT 1 FROM app.documentos_saldo_insoluto WHERE doc_sha256 = %s LIMIT 1
+        """, (sha256,))
+        if cur.fetchone() is None:
+            get_storage().eliminar(sha256)
+        cur.close()
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.warning('No se pudo borrar el contenido sin documento %s: %s', sha256, e)
+
+def _expediente_para_documentos(cur, solicitud_id):
+    """
+    Expediente de la solicitud si admite documentos nuevos.
+    Retorna (expediente_id, None) o (None, respuesta de error).
+    """
+    cur.execute("""
+        SELECT expediente_id, estado FROM app.solicitudes WHERE id = %s
+    """, (solicitud_id,))
+    
+    solicitud_result = cur.fetchone()
+    if not solicitud_result:
+        return None, (jsonify({'error': 'Solicitud no encontrada'}), 404)
+    
+    # Bloquear subida de documentos si está en pendiente (revisión de jefatura)
+    if solicitud_result[1] == 'pendiente':
+        return None, (jsonify({'error': 'No se pueden agregar documentos a un expediente que está en revisión de jefatura. Debe estar rechazado para poder agregar documentos.'}), 400)
+    
+    return solicitud_result[0], None
+
+def _registrar_documento(cur, expediente_id, solicitud_id, doc_tipo_id, nombre_archivo,
+                         mime_type, tamano_bytes, sha256, observaciones):
+    """Insertar el documento (sin BLOB: el contenido vive en el almacenamiento) y retornar su id"""
+    cur.execute("""
+        INSERT INTO app.documentos_saldo_insoluto 
+        (expediente_id, solicitud_id, doc_tipo_id, doc_nombre_archivo, 
+         doc_mime_type, doc_tamano_bytes, doc_sha256, doc_ruta_storage, doc_observaciones, 
+         doc_estado, doc_fecha_subida)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, 'subido', NOW())
+        RETURNING id
+    """, (
+        expediente_id, solicitud_id, doc_tipo_id, nombre_archivo,
+        mime_type, tamano_bytes, sha256, "/api/download-documento/temp", observaciones
+    ))
+    
+    documento_id = cur.fetchone()[0]
+    
+    # Actualizar la ruta con el ID real del documento
+    cur.execute("""
+        UPDATE app.documentos_saldo_insoluto 
+        SET doc_ruta_storage = %s
+        WHERE id = %s
+    """, (f"/api/download-documento/{documento_id}", documento_id))
+    
+    return documento_id
+
+def _datos_documento_subido(documento_id, expediente_id, nombre_archivo, tamano_bytes, mime_type, sha256):
+    """Datos del documento que se devuelven al terminar una subida"""
+    return {
+        'documento_id': documento_id,
+        'expediente_id': expediente_id,
+        'nombre_archivo': nombre_archivo,
+        'tamano_bytes': tamano_bytes,
+        'mime_type': mime_type,
+        'sha256_hash': sha256,
+        'ruta_storage': f"/api/download-documento/{documento_id}"
+    }
+
+def _obtener_subida(cur, subida_id, bloqueo=''):
+    """Sesión de subida vigente del usuario actual (None si no existe o venció)"""
+    cur.execute(f"""
+        SELECT solicitud_id, nombre_archivo, doc_tipo_id, observaciones, tamano_bytes, sha256,
+               tamano_chunk, total_chunks, estado, documento_id, expira_en
+        FROM app.subidas_documento
+        WHERE id = %s AND expira_en > NOW()
+          AND (funcionario_id = %s OR funcionario_id IS NULL)
+        {bloqueo}
+    """, (str(subida_id), session.get('user_id')))
+    return cur.fetchone()
+
+def _cabeceras_cache(respuesta, sha256, fecha_subida):
+    """
+    ETag fuerte (el contenido no cambia para un mismo hash), Last-Modified y
+    Accept-Ranges. no-cache obliga a revalidar, lo que cuesta solo un 304.
+    """
+    if sha256:
+        respuesta.set_etag(sha256)
+    if fecha_subida:
+        respuesta.last_modified = fecha_subida
+    respuesta.headers['Accept-Ranges'] = 'bytes'
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+def _no_modificado(sha256, fecha_subida):
+    """Evaluar If-None-Match (o If-Modified-Since si no viene) para responder 304"""
+    if request.if_none_match:
+        return bool(sha256) and request.if_none_match.contains(sha256)
+    if request.if_modified_since and fecha_subida:
+        return fecha_subida <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+def _rango_solicitado(tamano, sha256, fecha_subida):
+    """
+    Rango pedido con la cabecera Range como (inicio, fin) con fin exclusivo.
+    Retorna None para entregar el archivo completo (sin Range, If-Range que no
+    coincide o varios rangos) y 'invalido' si el rango no es satisfacible.
+    """
+    rango = request.range
+    if rango is None or len(rango.ranges) != 1:
+        return None
+    
+    if_range = request.if_range
+    if if_range.etag is not None and (not sha256 or if_range.etag != sha256):
+        return None
+    if if_range.date is not None and (not fecha_subida or if_range.date.replace(tzinfo=None) != fecha_subida):
+        return None
+    
+    limites = rango.range_for_length(tamano)
+    if limites is None:
+        return 'invalido'
+    return limites
+
+def _partes_documento(sha256, archivo_blob):
+    """Contenido de un documento por bloques: desde el almacenamiento o desde el BLOB antiguo"""
+    if archivo_blob is None:
+        return get_storage().iterar(sha256)
+    return [bytes(archivo_blob)]
 
 def register_routes(app):
     """Registrar rutas de documentos"""
@@ -17,65 +214,77 @@ def register_routes(app):
     @app.route('/api/upload-documento', methods=['POST'])
     @login_required
     def upload_documento():
-        """Subir un documento como BLOB"""
-        print('📁 Iniciando subida de archivo...')
-        print(f'📋 Form data recibido: {dict(request.form)}')
-        print(f'📋 Files recibidos: {list(request.files.keys())}')
+        """Subir un documento al almacenamiento (recibido por streaming)"""
+        logger.debug('Iniciando subida de archivo...')
+        
+        destinos = []
+        try:
+            form, files, destinos = _recibir_formulario()
+        except RequestEntityTooLarge:
+            return jsonify({
+                'error': f'Archivo demasiado grande. Tamaño máximo: {MAX_FILE_SIZE // (1024*1024)}MB'
+            }), 413
+        except Exception as e:
+            logger.exception('Error leyendo el formulario: %s', e)
+            return jsonify({'error': 'No se pudo leer el formulario enviado'}), 400
+        
+        logger.debug('Form data recibido: %s', dict(form))
+        logger.debug('Files recibidos: %s', list(files.keys()))
         
         conn = get_db_connection()
         if not conn:
+            for destino in destinos:
+                destino.descartar()
             return jsonify({'error': 'Error de conexión a la base de datos'}), 500
         
+        # Hash guardado por esta petición (se borra si el documento no se confirma)
+        contenido_nuevo = None
         try:
             # Verificar que se envió un archivo
-            if 'archivo' not in request.files:
-                print('❌ No se encontró archivo en la petición')
+            if 'archivo' not in files:
+                logger.warning('No se encontró archivo en la petición')
                 return jsonify({'error': 'No se encontró archivo en la petición'}), 400
             
-            file = request.files['archivo']
-            print(f'📄 Archivo recibido: {file.filename}')
+            file = files['archivo']
+            logger.debug('Archivo recibido: %s', file.filename)
             
             if file.filename == '':
-                print('❌ No se seleccionó ningún archivo')
+                logger.warning('No se seleccionó ningún archivo')
                 return jsonify({'error': 'No se seleccionó ningún archivo'}), 400
             
             # Verificar extensión permitida
             if not allowed_file(file.filename):
-                print(f'❌ Extensión no permitida: {file.filename}')
+                logger.warning('Extensión no permitida: %s', file.filename)
                 return jsonify({
                     'error': f'Extensión no permitida. Extensiones válidas: {", ".join(ALLOWED_EXTENSIONS)}'
                 }), 400
             
-            # Leer el archivo
-            file_data = file.read()
-            
-            # Verificar tamaño
-            if len(file_data) > MAX_FILE_SIZE:
-                return jsonify({
-                    'error': f'Archivo demasiado grande. Tamaño máximo: {MAX_FILE_SIZE // (1024*1024)}MB'
-                }), 400
+            # El archivo ya quedó en un temporal; el tamaño se controló al recibirlo
+            archivo_entrante = file.stream
+            archivo_entrante.cerrar()
+            tamano_bytes = archivo_entrante.tamano
             
             # Obtener datos adicionales
-            solicitud_id = request.form.get('solicitud_id')
-            doc_tipo_id = request.form.get('doc_tipo_id', 1)
-            observaciones = request.form.get('observaciones', '')
+            solicitud_id = form.get('solicitud_id')
+            doc_tipo_id = form.get('doc_tipo_id', 1)
+            observaciones = form.get('observaciones', '')
             
-            print(f'🆔 Solicitud ID recibido: "{solicitud_id}" (tipo: {type(solicitud_id)})')
+            logger.debug('Solicitud ID recibido: "%s" (tipo: %s)', solicitud_id, type(solicitud_id))
             
             if not solicitud_id or solicitud_id == 'undefined':
-                print('❌ ID de solicitud requerido')
+                logger.warning('ID de solicitud requerido')
                 return jsonify({'error': 'ID de solicitud requerido'}), 400
             
             # Validar que solicitud_id sea un número
             try:
                 solicitud_id = int(solicitud_id)
-                print(f'✅ Solicitud ID convertido a entero: {solicitud_id}')
+                logger.debug('Solicitud ID convertido a entero: %s', solicitud_id)
             except (ValueError, TypeError):
-                print(f'❌ Error convirtiendo solicitud_id a entero: {solicitud_id}')
+                logger.warning('Error convirtiendo solicitud_id a entero: %s', solicitud_id)
                 return jsonify({'error': 'ID de solicitud debe ser un número válido'}), 400
             
-            # Generar hash del archivo
-            file_hash = get_file_hash(file_data)
+            # Hash calculado mientras se recibía el archivo
+            file_hash = archivo_entrante.sha256
             
             # Obtener tipo MIME
             mime_type = get_mime_type(file.filename)
@@ -85,71 +294,402 @@ def register_routes(app):
             
             cur = conn.cursor()
             
-            # Obtener expediente_id y estado de la solicitud
-            cur.execute("""
-                SELECT expediente_id, estado FROM app.solicitudes WHERE id = %s
-            """, (solicitud_id,))
+            expediente_id, error = _expediente_para_documentos(cur, solicitud_id)
+            if error:
+                return error
             
-            solicitud_result = cur.fetchone()
-            if not solicitud_result:
-                return jsonify({'error': 'Solicitud no encontrada'}), 404
+            # Guardar el contenido en el almacenamiento (una sola copia por hash)
+            _bloquear_contenido(cur, file_hash)
+            if get_storage().guardar_archivo(file_hash, archivo_entrante.ruta):
+                contenido_nuevo = file_hash
             
-            expediente_id = solicitud_result[0]
-            estado_solicitud = solicitud_result[1]
+            documento_id = _registrar_documento(
+                cur, expediente_id, solicitud_id, doc_tipo_id, safe_filename,
+                mime_type, tamano_bytes, file_hash, observaciones
+            )
             
-            # Bloquear subida de documentos si está en pendiente (revisión de jefatura)
-            if estado_solicitud == 'pendiente':
-                return jsonify({'error': 'No se pueden agregar documentos a un expediente que está en revisión de jefatura. Debe estar rechazado para poder agregar documentos.'}), 400
+            conn.commit()
+            cur.close()
+            conn.close()
+            
+            logger.info('Archivo subido: %s (%s bytes)', safe_filename, tamano_bytes)
+            logger.debug('Ruta generada: /api/download-documento/%s', documento_id)
+            
+            return jsonify({
+                'success': True,
+                'message': 'Archivo subido exitosamente',
+                'data': _datos_documento_subido(
+                    documento_id, expediente_id, safe_filename, tamano_bytes, mime_type, file_hash
+                )
+            }), 201
+            
+        except Exception as e:
+            logger.exception('Error subiendo archivo: %s', e)
+            conn.rollback()
+            if contenido_nuevo:
+                _descartar_contenido_sin_documento(conn, contenido_nuevo)
+            conn.close()
+            return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
+        
+        finally:
+            # Borrar temporales que no llegaron al almacenamiento (errores, archivos extra)
+            for destino in destinos:
+                destino.descartar()
+
+    @app.route('/api/subidas-documento', methods=['POST'])
+    @login_required
+    def crear_subida_documento():
+        """
+        Iniciar una subida reanudable por partes.
+        Body JSON: solicitud_id, nombre_archivo, tamano_bytes, sha256 (del archivo
+        completo) y opcionalmente doc_tipo_id y observaciones.
+        """
+        data = request.get_json(silent=True) or {}
+        nombre_archivo = (data.get('nombre_archivo') or '').strip()
+        sha256 = (data.get('sha256') or '').strip().lower()
+        
+        try:
+            solicitud_id = int(data.get('solicitud_id'))
+            tamano_bytes = int(data.get('tamano_bytes'))
+        except (ValueError, TypeError):
+            return jsonify({'error': 'solicitud_id y tamano_bytes deben ser números válidos'}), 400
+        
+        if not nombre_archivo or not allowed_file(nombre_archivo):
+            return jsonify({
+                'error': f'Extensión no permitida. Extensiones válidas: {", ".join(ALLOWED_EXTENSIONS)}'
+            }), 400
+        if len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256):
+            return jsonify({'error': 'sha256 debe ser el hash SHA-256 del archivo en hexadecimal'}), 400
+        if tamano_bytes < 1:
+            return jsonify({'error': 'tamano_bytes debe ser mayor que cero'}), 400
+        if tamano_bytes > MAX_FILE_SIZE:
+            return jsonify({
+                'error': f'Archivo demasiado grande. Tamaño máximo: {MAX_FILE_SIZE // (1024*1024)}MB'
+            }), 413
+        
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+        
+        try:
+            cur = conn.cursor()
+            
+            _, error = _expediente_para_documentos(cur, solicitud_id)
+            if error:
+                return error
+            
+            tamano_chunk = _config.UPLOAD_CHUNK_SIZE
+            total_chunks = -(-tamano_bytes // tamano_chunk)
+            subida_id = str(uuid.uuid4())
             
-            # Insertar el documento
             cur.execute("""
-                INSERT INTO app.documentos_saldo_insoluto 
-                (expediente_id, solicitud_id, doc_tipo_id, doc_nombre_archivo, doc_archivo_blob, 
-                 doc_mime_type, doc_tamano_bytes, doc_sha256, doc_ruta_storage, doc_observaciones, 
-                 doc_estado, doc_fecha_subida)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 'subido', NOW())
-                RETURNING id
+                INSERT INTO app.subidas_documento
+                (id, solicitud_id, funcionario_id, nombre_archivo, doc_tipo_id, observaciones,
+                 tamano_bytes, sha256, tamano_chunk, total_chunks, expira_en)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW() + %s * INTERVAL '1 hour')
+                RETURNING expira_en
             """, (
-                expediente_id, solicitud_id, doc_tipo_id, safe_filename, file_data,
-                mime_type, len(file_data), file_hash, "/api/download-documento/temp", observaciones
+                subida_id, solicitud_id, session.get('user_id'), secure_filename(nombre_archivo),
+                data.get('doc_tipo_id', 1), data.get('observaciones', ''),
+                tamano_bytes, sha256, tamano_chunk, total_chunks, _config.UPLOAD_SESSION_TTL
             ))
+            expira_en = cur.fetchone()[0]
+            
+            conn.commit()
+            cur.close()
+            conn.close()
             
-            documento_id = cur.fetchone()[0]
+            logger.info('Subida por partes iniciada: %s (%s bytes, %s partes)', subida_id, tamano_bytes, total_chunks)
+            
+            return jsonify({
+                'success': True,
+                'data': {
+                    'subida_id': subida_id,
+                    'tamano_chunk': tamano_chunk,
+                    'total_chunks': total_chunks,
+                    'expira_en': expira_en.isoformat()
+                }
+            }), 201
+            
+        except Exception as e:
+            logger.exception('Error iniciando subida por partes: %s', e)
+            conn.rollback()
+            conn.close()
+            return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
+
+    @app.route('/api/subidas-documento/<uuid:subida_id>', methods=['GET'])
+    @login_required
+    def estado_subida_documento(subida_id):
+        """Estado de una subida por partes: qué partes llegaron y cuáles faltan"""
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+        
+        try:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            subida = _obtener_subida(cur, subida_id)
+            if not subida:
+                return jsonify({'error': 'Subida no encontrada o vencida'}), 404
             
-            # Actualizar la ruta con el ID real del documento
             cur.execute("""
-                UPDATE app.documentos_saldo_insoluto 
-                SET doc_ruta_storage = %s
+                SELECT numero FROM app.subidas_documento_chunks
+                WHERE subida_id = %s ORDER BY numero
+            """, (str(subida_id),))
+            recibidos = [fila['numero'] for fila in cur.fetchall()]
+            
+            cur.close()
+            conn.close()
+            
+            pendientes = sorted(set(range(subida['total_chunks'])) - set(recibidos))
+            return jsonify({
+                'success': True,
+                'data': {
+                    'subida_id': str(subida_id),
+                    'estado': subida['estado'],
+                    'documento_id': subida['documento_id'],
+                    'tamano_bytes': subida['tamano_bytes'],
+                    'tamano_chunk': subida['tamano_chunk'],
+                    'total_chunks': subida['total_chunks'],
+                    'chunks_recibidos': recibidos,
+                    'chunks_pendientes': pendientes,
+                    'expira_en': subida['expira_en'].isoformat()
+                }
+            })
+            
+        except Exception as e:
+            logger.exception('Error consultando subida por partes: %s', e)
+            conn.close()
+            return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
+
+    @app.route('/api/subidas-documento/<uuid:subida_id>/chunks/<int:numero>', methods=['PUT'])
+    @login_required
+    def subir_chunk_documento(subida_id, numero):
+        """
+        Recibir la parte `numero` (desde 0) como cuerpo binario de la petición.
+        La cabecera X-Chunk-SHA256 lleva el hash de la parte; reenviarla es seguro.
+        """
+        sha256_chunk = (request.headers.get('X-Chunk-SHA256') or '').strip().lower()
+        if len(sha256_chunk) != 64 or any(c not in '0123456789abcdef' for c in sha256_chunk):
+            return jsonify({'error': 'La cabecera X-Chunk-SHA256 es obligatoria'}), 400
+        
+        tamano_maximo = _config.UPLOAD_CHUNK_SIZE
+        if request.content_length is not None and request.content_length > tamano_maximo:
+            return jsonify({'error': f'Cada parte puede tener como máximo {tamano_maximo} bytes'}), 413
+        
+        # Recibir primero los bytes; la conexión a la base de datos se pide después
+        try:
+            entrante = recibir_chunk(request.stream, tamano_maximo)
+        except RequestEntityTooLarge:
+            return jsonify({'error': f'Cada parte puede tener como máximo {tamano_maximo} bytes'}), 413
+        
+        try:
+            conn = get_db_connection()
+            if not conn:
+                return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+            
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            
+            # FOR KEY SHARE: varias partes en paralelo, pero no durante la finalización
+            subida = _obtener_subida(cur, subida_id, bloqueo='FOR KEY SHARE')
+            if not subida:
+                conn.rollback()
+                return jsonify({'error': 'Subida no encontrada o vencida'}), 404
+            if subida['estado'] != 'abierta':
+                conn.rollback()
+                return jsonify({'error': 'La subida ya fue finalizada'}), 409
+            if numero >= subida['total_chunks']:
+                conn.rollback()
+                return jsonify({'error': f'Número de parte fuera de rango (0 a {subida["total_chunks"] - 1})'}), 400
+            
+            tamano = tamano_esperado(numero, subida['tamano_bytes'], subida['tamano_chunk'])
+            try:
+                aceptar_chunk(subida_id, numero, entrante, tamano, sha256_chunk)
+            except ChunkInvalido as e:
+                conn.rollback()
+                return jsonify({'error': str(e)}), 400
+            
+            cur.execute("""
+                INSERT INTO app.subidas_documento_chunks (subida_id, numero, tamano_bytes, sha256)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (subida_id, numero)
+                DO UPDATE SET tamano_bytes = EXCLUDED.tamano_bytes, sha256 = EXCLUDED.sha256,
+                              recibido_en = CURRENT_TIMESTAMP
+            """, (str(subida_id), numero, tamano, sha256_chunk))
+            
+            # Cada parte recibida renueva la vigencia de la sesión
+            cur.execute("""
+                UPDATE app.subidas_documento
+                SET expira_en = NOW() + %s * INTERVAL '1 hour'
                 WHERE id = %s
-            """, (f"/api/download-documento/{documento_id}", documento_id))
+            """, (_config.UPLOAD_SESSION_TTL, str(subida_id)))
+            
+            cur.execute("""
+                SELECT COUNT(*) AS recibidos FROM app.subidas_documento_chunks WHERE subida_id = %s
+            """, (str(subida_id),))
+            recibidos = cur.fetchone()['recibidos']
             
             conn.commit()
             cur.close()
             conn.close()
             
-            print(f'📁 Archivo subido: {safe_filename} ({len(file_data)} bytes)')
-            print(f'🔗 Ruta generada: /api/download-documento/{documento_id}')
-            
             return jsonify({
                 'success': True,
-                'message': 'Archivo subido exitosamente',
                 'data': {
-                    'documento_id': documento_id,
-                    'expediente_id': expediente_id,
-                    'nombre_archivo': safe_filename,
-                    'tamano_bytes': len(file_data),
-                    'mime_type': mime_type,
-                    'sha256_hash': file_hash,
-                    'ruta_storage': f"/api/download-documento/{documento_id}"
+                    'numero': numero,
+                    'chunks_recibidos': recibidos,
+                    'total_chunks': subida['total_chunks']
                 }
-            }), 201
+            })
             
         except Exception as e:
-            print(f'❌ Error subiendo archivo: {e}')
-            if 'conn' in locals():
+            logger.error('Error recibiendo parte %s de la subida %s: %s', numero, subida_id, e)
+            if 'conn' in locals() and conn:
                 conn.rollback()
                 conn.close()
             return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
+        
+        finally:
+            entrante.descartar()
+
+    @app.route('/api/subidas-documento/<uuid:subida_id>/finalizar', methods=['POST'])
+    @login_required
+    def finalizar_subida_documento(subida_id):
+        """
+        Ensamblar las partes, verificar el SHA-256 y registrar el documento.
+        Es idempotente: si la subida ya se finalizó, retorna el mismo documento.
+        """
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+        
+        archivo = None
+        contenido_nuevo = None
+        try:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            
+            # FOR UPDATE serializa finalizaciones concurrentes: el documento se crea una sola vez
+            subida = _obtener_subida(cur, subida_id, bloqueo='FOR UPDATE')
+            if not subida:
+                conn.rollback()
+                return jsonify({'error': 'Subida no encontrada o vencida'}), 404
+            
+            if subida['estado'] == 'finalizada':
+                cur.execute("""
+                    SELECT id, expediente_id, doc_nombre_archivo, doc_tamano_bytes, doc_mime_type, doc_sha256
+                    FROM app.documentos_saldo_insoluto WHERE id = %s
+                """, (subida['documento_id'],))
+                documento = cur.fetchone()
+                conn.rollback()
+                if not documento:
+                    return jsonify({'error': 'El documento de esta subida fue eliminado'}), 410
+                return jsonify({
+                    'success': True,
+                    'message': 'Archivo subido exitosamente',
+                    'data': _datos_documento_subido(
+                        documento['id'], documento['expediente_id'], documento['doc_nombre_archivo'],
+                        documento['doc_tamano_bytes'], documento['doc_mime_type'], documento['doc_sha256']
+                    )
+                })
+            
+            cur.execute("""
+                SELECT numero FROM app.subidas_documento_chunks WHERE subida_id = %s
+            """, (str(subida_id),))
+            pendientes = sorted(set(range(subida['total_chunks'])) - {fila['numero'] for fila in cur.fetchall()})
+            if pendientes:
+                conn.rollback()
+                return jsonify({'error': 'Faltan partes por subir', 'chunks_pendientes': pendientes}), 409
+            
+            # Los helpers de documentos usan un cursor de tuplas
+            cur_doc = conn.cursor()
+            expediente_id, error = _expediente_para_documentos(cur_doc, subida['solicitud_id'])
+            if error:
+                conn.rollback()
+                return error
+            
+            storage = get_storage()
+            archivo = ensamblar(subida_id, subida['total_chunks'], storage.directorio_temporal(), MAX_FILE_SIZE)
+            if archivo.tamano != subida['tamano_bytes'] or archivo.sha256 != subida['sha256']:
+                conn.rollback()
+                return jsonify({'error': 'El archivo ensamblado no coincide con el SHA-256 declarado'}), 400
+            
+            _bloquear_contenido(cur_doc, archivo.sha256)
+            if storage.guardar_archivo(archivo.sha256, archivo.ruta):
+                contenido_nuevo = archivo.sha256
+            
+            mime_type = get_mime_type(subida['nombre_archivo'])
+            documento_id = _registrar_documento(
+                cur_doc, expediente_id, subida['solicitud_id'], subida['doc_tipo_id'], subida['nombre_archivo'],
+                mime_type, archivo.tamano, archivo.sha256, subida['observaciones']
+            )
+            
+            cur.execute("""
+                UPDATE app.subidas_documento
+                SET estado = 'finalizada', documento_id = %s
+                WHERE id = %s
+            """, (documento_id, str(subida_id)))
+            
+            conn.commit()
+            cur_doc.close()
+            cur.close()
+            conn.close()
+            
+            # Las partes ya no se necesitan; la fila queda para responder reintentos
+            eliminar_archivos(subida_id)
+            
+            logger.info('Archivo subido por partes: %s (%s bytes)', subida["nombre_archivo"], archivo.tamano)
+            logger.debug('Ruta generada: /api/download-documento/%s', documento_id)
+            
+            return jsonify({
+                'success': True,
+                'message': 'Archivo subido exitosamente',
+                'data': _datos_documento_subido(
+                    documento_id, expediente_id, subida['nombre_archivo'],
+                    archivo.tamano, mime_type, archivo.sha256
+                )
+            }), 201
+            
+        except Exception as e:
+            logger.error('Error finalizando subida %s: %s', subida_id, e)
+            conn.rollback()
+            if contenido_nuevo:
+                _descartar_contenido_sin_documento(conn, contenido_nuevo)
+            conn.close()
+            return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
+        
+        finally:
+            if archivo is not None:
+                archivo.descartar()
+
+    @app.route('/api/subidas-documento/<uuid:subida_id>', methods=['DELETE'])
+    @login_required
+    def cancelar_subida_documento(subida_id):
+        """Cancelar una subida por partes y borrar lo recibido"""
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+        
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                DELETE FROM app.subidas_documento
+                WHERE id = %s AND (funcionario_id = %s OR funcionario_id IS NULL)
+            """, (str(subida_id), session.get('user_id')))
+            eliminadas = cur.rowcount
+            conn.commit()
+            cur.close()
+            conn.close()
+            
+            if not eliminadas:
+                return jsonify({'error': 'Subida no encontrada'}), 404
+            
+            eliminar_archivos(subida_id)
+            return jsonify({'success': True, 'message': 'Subida cancelada'})
+            
+        except Exception as e:
+            logger.error('Error cancelando subida %s: %s', subida_id, e)
+            conn.rollback()
+            conn.close()
+            return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
 
     @app.route('/api/download-documento/<int:documento_id>', methods=['GET'])
     def download_documento(documento_id):
@@ -161,9 +701,12 @@ def register_routes(app):
         try:
             cur = conn.cursor()
             
-            # Obtener el documento
+            # Obtener el documento (sin traer el BLOB; octet_length no lo descomprime)
             cur.execute("""
-                SELECT doc_nombre_archivo, doc_archivo_blob, doc_mime_type, doc_tamano_bytes
+                SELECT doc_nombre_archivo, doc_mime_type,
+                       COALESCE(doc_tamano_bytes, octet_length(doc_archivo_blob)),
+                       doc_sha256, doc_fecha_subida,
+                       doc_archivo_blob IS NULL AS en_storage
                 FROM app.documentos_saldo_insoluto 
                 WHERE id = %s
             """, (documento_id,))
@@ -172,25 +715,65 @@ def register_routes(app):
             if not documento:
                 return jsonify({'error': 'Documento no encontrado'}), 404
             
-            nombre_archivo, archivo_blob, mime_type, tamano_bytes = documento
+            nombre_archivo, mime_type, tamano_bytes, sha256, fecha_subida, en_storage = documento
+            tamano_bytes = tamano_bytes or 0
+            fecha_subida = fecha_subida.replace(microsecond=0) if fecha_subida else None
             
-            cur.close()
-            conn.close()
+            # El cliente ya tiene esta versión: no se lee el contenido
+            if _no_modificado(sha256, fecha_subida):
+                cur.close()
+                conn.close()
+                return _cabeceras_cache(Response(status=304), sha256, fecha_subida)
             
-            # Crear objeto BytesIO para enviar el archivo
-            file_obj = io.BytesIO(archivo_blob)
+            rango = _rango_solicitado(tamano_bytes, sha256, fecha_subida)
+            if rango == 'invalido':
+                cur.close()
+                conn.close()
+                respuesta = jsonify({'error': 'Rango no satisfacible'})
+                respuesta.status_code = 416
+                respuesta.headers['Content-Range'] = f'bytes */{tamano_bytes}'
+                return respuesta
+            inicio, fin = rango or (0, tamano_bytes)
+            
+            archivo_blob = None
+            if not en_storage:
+                # Documento antiguo que todavía no se migra: leer solo el tramo pedido
+                cur.execute("""
+                    SELECT substring(doc_archivo_blob FROM %s FOR %s)
+                    FROM app.documentos_saldo_insoluto WHERE id = %s
+                """, (inicio + 1, fin - inicio, documento_id))
+                archivo_blob = bytes(cur.fetchone()[0])
             
-            print(f'📥 Descargando archivo: {nombre_archivo} ({tamano_bytes} bytes)')
+            cur.close()
+            conn.close()
             
-            return send_file(
-                file_obj,
-                mimetype=mime_type,
-                as_attachment=True,
-                download_name=nombre_archivo
-            )
+            if rango:
+                logger.debug('Descargando archivo: %s (bytes %s-%s/%s)', nombre_archivo, inicio, fin - 1, tamano_bytes)
+            else:
+                logger.debug('Descargando archivo: %s (%s bytes)', nombre_archivo, tamano_bytes)
+            
+            if archivo_blob is not None:
+                respuesta = Response(archivo_blob, mimetype=mime_type)
+            else:
+                storage = get_storage()
+                ruta = storage.ruta_local(sha256) if not rango else None
+                if ruta:
+                    # Archivo completo en disco local: send_file usa sendfile del servidor
+                    respuesta = send_file(ruta, mimetype=mime_type, etag=False, conditional=False)
+                else:
+                    respuesta = Response(
+                        storage.iterar(sha256, inicio=inicio, fin=fin), mimetype=mime_type
+                    )
+                    respuesta.headers['Content-Length'] = str(fin - inicio)
+            
+            if rango:
+                respuesta.status_code = 206
+                respuesta.headers['Content-Range'] = f'bytes {inicio}-{fin - 1}/{tamano_bytes}'
+            respuesta.headers['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
+            return _cabeceras_cache(respuesta, sha256, fecha_subida)
             
         except Exception as e:
-            print(f'❌ Error descargando archivo: {e}')
+            logger.exception('Error descargando archivo: %s', e)
             if 'conn' in locals():
                 conn.close()
             return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
@@ -225,7 +808,7 @@ def register_routes(app):
             }), 200
             
         except Exception as e:
-            print(f'❌ Error listando documentos: {e}')
+            logger.exception('Error listando documentos: %s', e)
             if 'conn' in locals():
                 conn.close()
             return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
@@ -239,48 +822,59 @@ def register_routes(app):
             return jsonify({'error': 'Error de conexión a la base de datos'}), 500
         
         try:
-            cur = conn.cursor(cursor_factory=RealDictCursor)
-            
-            # Obtener todos los documentos del expediente
+            cur = conn.cursor()
             cur.execute("""
-                SELECT id, doc_nombre_archivo, doc_archivo_blob, doc_mime_type
-                FROM app.documentos_saldo_insoluto 
-                WHERE expediente_id = %s
-                ORDER BY doc_fecha_subida ASC
+                SELECT COUNT(*) FROM app.documentos_saldo_insoluto WHERE expediente_id = %s
             """, (expediente_id,))
-            
-            documentos = cur.fetchall()
-            
-            if not documentos:
-                return jsonify({'error': 'No hay documentos en este expediente'}), 404
-            
-            # Crear ZIP en memoria
-            zip_buffer = io.BytesIO()
-            
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                for i, documento in enumerate(documentos):
-                    # Usar el nombre del archivo original
-                    zip_file.writestr(documento['doc_nombre_archivo'], documento['doc_archivo_blob'])
-            
-            zip_buffer.seek(0)
-            
+            total_documentos = cur.fetchone()[0]
             cur.close()
-            conn.close()
-            
-            print(f'📦 Generando ZIP con {len(documentos)} documentos para expediente {expediente_id}')
             
-            return send_file(
-                zip_buffer,
-                mimetype='application/zip',
-                as_attachment=True,
-                download_name=f'expediente_{expediente_id}_completo.zip'
-            )
+            if not total_documentos:
+                conn.close()
+                return jsonify({'error': 'No hay documentos en este expediente'}), 404
             
         except Exception as e:
-            print(f'❌ Error generando ZIP: {e}')
+            logger.exception('Error generando ZIP: %s', e)
             if 'conn' in locals():
                 conn.close()
             return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
+        
+        def documentos_del_expediente():
+            """Recorrer los documentos con un cursor del lado del servidor (uno a la vez)"""
+            cur = conn.cursor(name=f'zip_expediente_{expediente_id}')
+            cur.itersize = 1
+            try:
+                cur.execute("""
+                    SELECT id, doc_nombre_archivo, doc_sha256, doc_archivo_blob
+                    FROM app.documentos_saldo_insoluto 
+                    WHERE expediente_id = %s
+                    ORDER BY doc_fecha_subida ASC
+                """, (expediente_id,))
+                for documento_id, nombre_archivo, sha256, archivo_blob in cur:
+                    # Usar el nombre del archivo original
+                    nombre = nombre_archivo or f'documento_{documento_id}'
+                    yield nombre, _partes_documento(sha256, archivo_blob)
+            finally:
+                cur.close()
+                conn.rollback()
+                conn.close()
+        
+        def generar():
+            try:
+                yield from generar_zip(documentos_del_expediente())
+            except Exception as e:
+                logger.exception('Error generando ZIP: %s', e)
+                raise
+        
+        logger.info('Generando ZIP con %s documentos para expediente %s', total_documentos, expediente_id)
+        
+        return Response(
+            stream_with_context(generar()),
+            mimetype='application/zip',
+            headers={
+                'Content-Disposition': f'attachment; filename=expediente_{expediente_id}_completo.zip'
+            }
+        )
 
     @app.route('/api/documentos/<int:documento_id>', methods=['DELETE'])
     @login_required
@@ -295,7 +889,7 @@ def register_routes(app):
             
             # Verificar que el documento existe y pertenece a un expediente rechazado/enRevision
             cur.execute("""
-                SELECT d.id, d.expediente_id, s.estado
+                SELECT d.id, d.expediente_id, s.estado, d.doc_sha256, d.doc_archivo_blob IS NULL AS en_storage
                 FROM app.documentos_saldo_insoluto d
                 JOIN app.solicitudes s ON d.expediente_id = s.expediente_id
                 WHERE d.id = %s
@@ -314,10 +908,32 @@ def register_routes(app):
                 conn.close()
                 return jsonify({'error': 'Solo se pueden eliminar documentos de expedientes rechazados en revisión'}), 400
             
-            # Eliminar documento
-            cur.execute("DELETE FROM app.documentos_saldo_insoluto WHERE id = %s", (documento_id,))
+            sha256 = documento[3] if documento[4] else None
+            if sha256:
+                # Lock de sesión: se mantiene hasta después de borrar el archivo
+                cur.execute("SELECT pg_advisory_lock(hashtext(%s))", (sha256,))
             
-            conn.commit()
+            try:
+                # Eliminar documento
+                cur.execute("DELETE FROM app.documentos_saldo_insoluto WHERE id = %s", (documento_id,))
+                
+                huerfano = False
+                if sha256:
+                    cur.execute("""
+                        SELECT 1 FROM app.documentos_saldo_insoluto WHERE doc_sha256 = %s LIMIT 1
+                    """, (sha256,))
+                    huerfano = cur.fetchone() is None
+                
+                conn.commit()
+                
+                # Borrar el archivo si ningún otro documento comparte el mismo contenido
+                if huerfano:
+                    get_storage().eliminar(sha256)
+            finally:
+                if sha256:
+                    conn.rollback()
+                    cur.execute("SELECT pg_advisory_unlock(hashtext(%s))", (sha256,))
+                    conn.commit()
             cur.close()
             conn.close()
             
@@ -327,7 +943,7 @@ def register_routes(app):
             }), 200
             
         except Exception as e:
-            print(f'❌ Error eliminando documento: {e}')
+            logger.exception('Error eliminando documento: %s', e)
             if 'conn' in locals():
                 conn.rollback()
                 conn.close()
@@ -1,12 +1,16 @@
 """
 Rutas de gestión de expedientes
 """
+import logging
 from flask import request, jsonify
 from psycopg2.extras import RealDictCursor
 from datetime import datetime
 from utils.database import get_db_connection
+from utils.helpers import normalizar_rut, rut_a_clave
 from middleware.auth import login_required
 
+logger = logging.getLogger(__name__)
+
 def register_routes(app):
     """Registrar rutas de expedientes"""
     
@@ -131,7 +135,7 @@ def register_routes(app):
     @login_required
     def revision_expediente():
         """Obtener expediente completo por RUT del causante para revisión"""
-        print("🔔 Petición de revisión de expediente")
+        logger.debug("Petición de revisión de expediente")
         
         conn = get_db_connection()
         if not conn:
@@ -146,19 +150,17 @@ def register_routes(app):
             
             rut = data['rut'].strip()
             
-            # Validar formato básico de RUT
-            rut_limpio = rut.replace('.', '').replace('-', '').upper()
-            if len(rut_limpio) < 8 or len(rut_limpio) > 9:
-                return jsonify({'error': 'Formato de RUT inválido'}), 400
-            
-            if not rut_limpio[:-1].isdigit() or rut_limpio[-1] not in '0123456789K':
+            # Validar formato básico de RUT (sin validación matemática estricta)
+            clave_rut = rut_a_clave(rut)
+            if clave_rut is None or not 8 <= len(normalizar_rut(rut)) <= 9:
                 return jsonify({'error': 'Formato de RUT inválido'}), 400
             
             cur = conn.cursor(cursor_factory=RealDictCursor)
             
-            # Obtener expediente completo por RUT del causante
+            # Obtener expediente completo por RUT del causante (última solicitud y
+            # representante por LATERAL; conteos desde progreso_expediente)
             cur.execute("""
-                SELECT DISTINCT
+                SELECT
                     e.id as expediente_id,
                     e.expediente_numero,
                     e.estado as estado_expediente,
@@ -189,28 +191,32 @@ def register_routes(app):
                     r.rep_calidad,
                     r.rep_telefono,
                     r.rep_email,
-                    COUNT(DISTINCT b.id) as total_beneficiarios,
-                    COUNT(DISTINCT uf.id) as beneficiarios_firmados,
-                    COUNT(DISTINCT d.id) as total_documentos
-                FROM app.expediente e
-                JOIN app.causante c ON e.id = c.expediente_id
-                JOIN app.solicitudes s ON e.id = s.expediente_id
+                    COALESCE(p.total_beneficiarios, 0) as total_beneficiarios,
+                    COALESCE(p.beneficiarios_firmados, 0) as beneficiarios_firmados,
+                    COALESCE(p.total_documentos, 0) as total_documentos,
+                    COALESCE(p.representante_firmado, FALSE) as representante_firmado
+                FROM app.causante c
+                JOIN app.expediente e ON e.id = c.expediente_id
+                JOIN LATERAL (
+                    SELECT id, folio, estado, firmado_funcionario, sucursal, observacion
+                    FROM app.solicitudes
+                    WHERE expediente_id = e.id
+                    ORDER BY id DESC
+                    LIMIT 1
+                ) s ON TRUE
                 LEFT JOIN app.funcionarios f ON e.funcionario_id = f.id
-                LEFT JOIN app.representante r ON e.id = r.expediente_id
-                LEFT JOIN app.beneficiarios b ON e.id = b.expediente_id
-                LEFT JOIN app.usuarios_firma uf ON b.ben_run = uf.rut
-                LEFT JOIN app.documentos_saldo_insoluto d ON e.id = d.expediente_id
-                WHERE c.fal_run = %s
-                GROUP BY e.id, e.expediente_numero, e.estado, e.observaciones, e.fecha_creacion, e.funcionario_id,
-                         f.iniciales, f.nombres, f.apellido_p, f.apellido_m,
-                         c.fal_nombre, c.fal_apellido_p, c.fal_apellido_m, c.fal_run,
-                         c.fal_fecha_defuncion, c.fal_comuna_defuncion, c.fal_nacionalidad,
-                         s.id, s.folio, s.estado, s.firmado_funcionario, s.sucursal, s.observacion,
-                         r.rep_nombre, r.rep_apellido_p, r.rep_apellido_m, r.rep_rut,
-                         r.rep_calidad, r.rep_telefono, r.rep_email
+                LEFT JOIN LATERAL (
+                    SELECT rep_nombre, rep_apellido_p, rep_apellido_m, rep_rut, rep_calidad,
+                           rep_telefono, rep_email
+                    FROM app.representante
+                    WHERE expediente_id = e.id
+                    LIMIT 1
+                ) r ON TRUE
+                LEFT JOIN app.progreso_expediente p ON p.expediente_id = e.id
+                WHERE c.fal_run_num = %s
                 ORDER BY e.fecha_creacion DESC
                 LIMIT 1
-            """, (rut,))
+            """, (clave_rut[0],))
             
             expediente = cur.fetchone()
             
@@ -226,7 +232,7 @@ def register_routes(app):
                     }
                 }), 200
             
-            # Query optimizada: Obtener beneficiarios, documentos y verificar firma del representante en una sola query
+            # Query optimizada: Obtener beneficiarios y documentos en una sola query
             cur.execute("""
                 SELECT 
                     (SELECT json_agg(row_to_json(b)) FROM (
@@ -239,7 +245,11 @@ def register_routes(app):
                             uf.id as firma_id,
                             uf.rut as firma_rut
                         FROM app.beneficiarios b
-                        LEFT JOIN app.usuarios_firma uf ON b.ben_run = uf.rut
+                        LEFT JOIN LATERAL (
+                            SELECT id, rut FROM app.usuarios_firma
+                            WHERE rut_num = b.ben_run_num
+                            ORDER BY id LIMIT 1
+                        ) uf ON TRUE
                         WHERE b.expediente_id = %s
                         ORDER BY b.id
                     ) b) as beneficiarios,
@@ -256,18 +266,14 @@ def register_routes(app):
                         FROM app.documentos_saldo_insoluto d
                         WHERE d.expediente_id = %s
                         ORDER BY d.doc_fecha_subida DESC
-                    ) d) as documentos,
-                    EXISTS(
-                        SELECT 1 FROM app.usuarios_firma 
-                        WHERE UPPER(rut) = UPPER(%s)
-                    ) as representante_firmado
-            """, (expediente['expediente_id'], expediente['expediente_id'], expediente.get('rep_rut', '')))
+                    ) d) as documentos
+            """, (expediente['expediente_id'], expediente['expediente_id']))
             
             result_extra = cur.fetchone()
             
             beneficiarios = result_extra['beneficiarios'] if result_extra['beneficiarios'] else []
             documentos = result_extra['documentos'] if result_extra['documentos'] else []
-            representante_firmado = result_extra['representante_firmado'] if expediente.get('rep_rut') else False
+            representante_firmado = expediente['representante_firmado'] if expediente.get('rep_rut') else False
             
             cur.close()
             conn.close()
@@ -402,7 +408,7 @@ def register_routes(app):
                 'beneficiarios': beneficiarios_procesados
             }
             
-            print(f'✅ Revisión exitosa para RUT {rut}: Expediente {expediente["expediente_numero"]}')
+            logger.info('Revisión exitosa para RUT %s: Expediente %s', rut, expediente["expediente_numero"])
             
             return jsonify({
                 'success': True,
@@ -411,9 +417,7 @@ def register_routes(app):
             }), 200
             
         except Exception as e:
-            print(f'❌ Error en revisión de expediente: {e}')
-            import traceback
-            print(traceback.format_exc())
+            logger.exception('Error en revisión de expediente: %s', e)
             if 'conn' in locals():
                 conn.close()
             return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
@@ -1,6 +1,7 @@
 """
 Rutas de gestión de firmas
 """
+import logging
 from flask import request, jsonify, session
 from datetime import datetime
 import json
@@ -11,6 +12,8 @@ from utils.database import get_db_connection
 from middleware.auth import login_required
 from services.solicitud_service import verificar_y_actualizar_estado_pendiente
 
+logger = logging.getLogger(__name__)
+
 def register_routes(app):
     """Registrar rutas de firmas"""
     
@@ -55,7 +58,7 @@ def register_routes(app):
             return jsonify({'success': True, 'message': 'Firma de representante guardada'}), 200
             
         except Exception as e:
-            print(f'❌ Error firmando representante: {e}')
+            logger.exception('Error firmando representante: %s', e)
             if 'cur' in locals():
                 cur.close()
             if 'conn' in locals():
@@ -103,7 +106,7 @@ def register_routes(app):
             return jsonify({'success': True, 'message': 'Firma de funcionario guardada'}), 200
             
         except Exception as e:
-            print(f'❌ Error firmando funcionario: {e}')
+            logger.exception('Error firmando funcionario: %s', e)
             if 'cur' in locals():
                 cur.close()
             if 'conn' in locals():
@@ -114,7 +117,7 @@ def register_routes(app):
     @login_required
     def firmar_beneficiario(beneficiario_id):
         """Firmar como beneficiario usando contraseña de app externa"""
-        print(f"🔔 Petición de firma de beneficiario ID: {beneficiario_id}")
+        logger.debug("Petición de firma de beneficiario ID: %s", beneficiario_id)
         
         conn = get_db_connection()
         if not conn:
@@ -149,7 +152,7 @@ def register_routes(app):
             # Verificar si ya tiene una firma activa en usuarios_firma
             cur.execute("""
                 SELECT uf.id FROM app.usuarios_firma uf
-                JOIN app.beneficiarios b ON uf.rut = b.ben_run
+                JOIN app.beneficiarios b ON uf.rut_num = b.ben_run_num
                 WHERE b.id = %s AND b.expediente_id = %s
             """, (beneficiario_id, expediente_id))
             
@@ -159,7 +162,7 @@ def register_routes(app):
             # Obtener la firma existente para la respuesta
             cur.execute("""
                 SELECT uf.id FROM app.usuarios_firma uf
-                JOIN app.beneficiarios b ON uf.rut = b.ben_run
+                JOIN app.beneficiarios b ON uf.rut_num = b.ben_run_num
                 WHERE b.id = %s AND b.expediente_id = %s
             """, (beneficiario_id, expediente_id))
             
@@ -184,7 +187,7 @@ def register_routes(app):
             cur.close()
             conn.close()
             
-            print(f'✅ Firma de beneficiario registrada: {beneficiario[1]}')
+            logger.info('Firma de beneficiario registrada: %s', beneficiario[1])
             
             return jsonify({
                 'success': True,
@@ -201,7 +204,7 @@ def register_routes(app):
             }), 200
             
         except Exception as e:
-            print(f'❌ Error firmando beneficiario: {e}')
+            logger.exception('Error firmando beneficiario: %s', e)
             if 'conn' in locals():
                 conn.rollback()
                 conn.close()
@@ -211,7 +214,7 @@ def register_routes(app):
     @login_required
     def obtener_firmas_beneficiarios(expediente_id):
         """Obtener todas las firmas de beneficiarios de un expediente"""
-        print(f"🔔 Consultando firmas de beneficiarios para expediente: {expediente_id}")
+        logger.debug("Consultando firmas de beneficiarios para expediente: %s", expediente_id)
         
         conn = get_db_connection()
         if not conn:
@@ -229,7 +232,7 @@ def register_routes(app):
                     b.ben_nombre,
                     b.ben_run
                 FROM app.usuarios_firma uf
-                JOIN app.beneficiarios b ON uf.rut = b.ben_run
+                JOIN app.beneficiarios b ON uf.rut_num = b.ben_run_num
                 WHERE b.expediente_id = %s
                 ORDER BY uf.id DESC
             """, (expediente_id,))
@@ -260,7 +263,7 @@ def register_routes(app):
             }), 200
             
         except Exception as e:
-            print(f'❌ Error consultando firmas de beneficiarios: {e}')
+            logger.exception('Error consultando firmas de beneficiarios: %s', e)
             if 'conn' in locals():
                 conn.close()
             return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
@@ -269,7 +272,7 @@ def register_routes(app):
     @login_required
     def firmar_solicitud_funcionario(solicitud_id):
         """Firmar solicitud como funcionario"""
-        print(f"🔔 Petición de firma de funcionario para solicitud: {solicitud_id}")
+        logger.debug("Petición de firma de funcionario para solicitud: %s", solicitud_id)
         
         conn = get_db_connection()
         if not conn:
@@ -298,8 +301,8 @@ def register_routes(app):
             # Obtener funcionario_id de la firma_data o de la sesión
             funcionario_id_firma = firma_data.get('funcionario_id') or session.get('user_id')
             
-            print(f'🔍 funcionario_id_firma obtenido: {funcionario_id_firma}')
-            print(f'🔍 firma_data contiene: {list(firma_data.keys())}')
+            logger.debug('funcionario_id_firma obtenido: %s', funcionario_id_firma)
+            logger.debug('firma_data contiene: %s', list(firma_data.keys()))
             
             if not funcionario_id_firma:
                 return jsonify({'error': 'No se pudo identificar al funcionario'}), 400
@@ -314,78 +317,36 @@ def register_routes(app):
             if not funcionario:
                 return jsonify({'error': 'Funcionario no encontrado o inactivo'}), 404
             
-            print(f'✅ Funcionario {funcionario_id_firma} verificado correctamente')
-            
-            # Verificar que las columnas existen, si no, intentar crearlas
-            try:
-                cur.execute("""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_schema = 'app' 
-                    AND table_name = 'solicitudes' 
-                    AND column_name IN ('firmado_funcionario', 'fecha_firma_funcionario', 'funcionario_id_firma')
-                """)
-                columnas_existentes = [row[0] for row in cur.fetchall()]
-                print(f'🔍 Columnas existentes: {columnas_existentes}')
-                
-                if 'firmado_funcionario' not in columnas_existentes:
-                    print('⚠️ Columnas no existen, intentando crearlas...')
-                    from utils.database import add_firma_funcionario_columns
-                    add_firma_funcionario_columns()
-            except Exception as e:
-                print(f'⚠️ Error verificando columnas: {e}')
-            
-            # Asegurar que las columnas existen antes de hacer UPDATE
-            print('🔍 Verificando existencia de columnas...')
-            cur.execute("""
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_schema = 'app' 
-                AND table_name = 'solicitudes' 
-                AND column_name IN ('firmado_funcionario', 'fecha_firma_funcionario', 'funcionario_id_firma')
-            """)
-            columnas_existentes = [row[0] for row in cur.fetchall()]
-            print(f'🔍 Columnas encontradas: {columnas_existentes}')
-            
-            if len(columnas_existentes) < 3:
-                print('⚠️ Faltan columnas, creándolas ahora...')
-                cur.close()
-                conn.close()
-                from utils.database import add_firma_funcionario_columns
-                add_firma_funcionario_columns()
-                conn = get_db_connection()
-                cur = conn.cursor()
-                print('✅ Columnas creadas, continuando con UPDATE...')
+            logger.debug('Funcionario %s verificado correctamente', funcionario_id_firma)
             
             # Actualizar solicitudes con la información de firma del funcionario
-            print(f'📝 Ejecutando UPDATE en solicitud {solicitud_id} con funcionario_id={funcionario_id_firma}')
+            # (las columnas las garantiza la migración 0004_firma_funcionario)
+            logger.debug('Ejecutando UPDATE en solicitud %s con funcionario_id=%s', solicitud_id, funcionario_id_firma)
             cur.execute("""
                 UPDATE app.solicitudes 
                 SET firmado_funcionario = TRUE,
-                    fecha_firma_funcionario = NOW(),
-                    funcionario_id_firma = %s,
                     estado = 'firmado_funcionario'
                 WHERE id = %s
-            """, (funcionario_id_firma, solicitud_id))
+            """, (solicitud_id,))
             
-            print(f'📊 Rowcount después del UPDATE: {cur.rowcount}')
+            logger.debug('Rowcount después del UPDATE: %s', cur.rowcount)
             
             # Verificar que el UPDATE de solicitud funcionó
             if cur.rowcount == 0:
-                print(f'❌ ERROR: No se pudo actualizar solicitud {solicitud_id} - rowcount: {cur.rowcount}')
-                print(f'🔍 Verificando si la solicitud existe...')
+                logger.error('No se pudo actualizar solicitud %s - rowcount: %s', solicitud_id, cur.rowcount)
+                logger.debug('Verificando si la solicitud existe...')
                 cur.execute("SELECT id FROM app.solicitudes WHERE id = %s", (solicitud_id,))
                 existe = cur.fetchone()
                 if existe:
-                    print(f'⚠️ La solicitud existe pero el UPDATE no afectó filas. ¿Problema con las columnas?')
+                    logger.warning('La solicitud existe pero el UPDATE no afectó filas. ¿Problema con las columnas?')
                 else:
-                    print(f'⚠️ La solicitud {solicitud_id} NO existe')
+                    logger.warning('La solicitud %s NO existe', solicitud_id)
                 conn.rollback()
                 cur.close()
                 conn.close()
                 return jsonify({'error': 'No se pudo actualizar el estado de la solicitud'}), 404
             
-            print(f'✅ Solicitud {solicitud_id} actualizada EXITOSAMENTE - firmado_funcionario=TRUE, funcionario_id_firma={funcionario_id_firma}')
+            logger.info('Solicitud %s actualizada EXITOSAMENTE - firmado_funcionario=TRUE', solicitud_id)
             
             # Actualizar validación con la firma del funcionario (mantener por compatibilidad)
             # Si falla, no hacer rollback porque ya actualizamos solicitudes
@@ -399,30 +360,30 @@ def register_routes(app):
                 """, (json.dumps(firma_data), solicitud_id))
                 
                 if cur.rowcount == 0:
-                    print(f'⚠️ No se encontró registro de validación para solicitud {solicitud_id}, pero la solicitud ya fue actualizada')
+                    logger.warning('No se encontró registro de validación para solicitud %s, pero la solicitud ya fue actualizada', solicitud_id)
                 else:
-                    print(f'✅ Validación actualizada para solicitud {solicitud_id}')
+                    logger.debug('Validación actualizada para solicitud %s', solicitud_id)
             except Exception as e:
-                print(f'⚠️ Error actualizando validación (no crítico): {e}')
+                logger.warning('Error actualizando validación (no crítico): %s', e)
             
             # Commit siempre para guardar los cambios de solicitudes
-            print('💾 Ejecutando COMMIT...')
+            logger.debug('Ejecutando COMMIT...')
             conn.commit()
-            print('✅ COMMIT ejecutado exitosamente')
+            logger.debug('COMMIT ejecutado exitosamente')
             
             # Verificar que se guardó correctamente
             cur.execute("""
-                SELECT firmado_funcionario, fecha_firma_funcionario, funcionario_id_firma 
+                SELECT firmado_funcionario, estado 
                 FROM app.solicitudes 
                 WHERE id = %s
             """, (solicitud_id,))
             resultado = cur.fetchone()
-            print(f'🔍 Verificación POST-COMMIT: firmado={resultado[0]}, fecha={resultado[1]}, funcionario_id={resultado[2]}')
+            logger.debug('Verificación POST-COMMIT: firmado=%s, estado=%s', resultado[0], resultado[1])
             
             cur.close()
             conn.close()
             
-            print(f'✅ Solicitud {solicitud_id} firmada por funcionario exitosamente')
+            logger.info('Solicitud %s firmada por funcionario exitosamente', solicitud_id)
             
             return jsonify({
                 'success': True,
@@ -436,7 +397,7 @@ def register_routes(app):
             }), 200
             
         except Exception as e:
-            print(f'❌ Error firmando solicitud como funcionario: {e}')
+            logger.exception('Error firmando solicitud como funcionario: %s', e)
             if 'conn' in locals():
                 conn.rollback()
                 conn.close()
@@ -446,7 +407,7 @@ def register_routes(app):
     @login_required
     def firmar_solicitud_funcionario_directo(solicitud_id):
         """Firmar solicitud como funcionario - Solo guarda en app.solicitudes"""
-        print(f"🔔 Petición de firma DIRECTA de funcionario para solicitud: {solicitud_id}")
+        logger.debug("Petición de firma DIRECTA de funcionario para solicitud: %s", solicitud_id)
         
         conn = get_db_connection()
         if not conn:
@@ -463,7 +424,7 @@ def register_routes(app):
             if not funcionario_id_firma:
                 funcionario_id_firma = session.get('user_id')
             
-            print(f'🔍 funcionario_id_firma: {funcionario_id_firma}')
+            logger.debug('funcionario_id_firma: %s', funcionario_id_firma)
             
             if not funcionario_id_firma:
                 return jsonify({'error': 'No se pudo identificar al funcionario'}), 400
@@ -473,14 +434,6 @@ def register_routes(app):
             if not cur.fetchone():
                 return jsonify({'error': 'Funcionario no encontrado o inactivo'}), 404
             
-            # Crear columnas si no existen
-            try:
-                cur.execute("ALTER TABLE app.solicitudes ADD COLUMN IF NOT EXISTS firmado_funcionario BOOLEAN DEFAULT FALSE")
-                conn.commit()
-                print('✅ Columna firmado_funcionario verificada/creada')
-            except Exception as e:
-                print(f'⚠️ Error creando columna (puede que ya exista): {e}')
-            
             # Obtener expediente_id antes de actualizar
             cur.execute("SELECT expediente_id FROM app.solicitudes WHERE id = %s", (solicitud_id,))
             expediente_result = cur.fetchone()
@@ -499,7 +452,7 @@ def register_routes(app):
                 WHERE id = %s
             """, (solicitud_id,))
             
-            print(f'📊 Rowcount: {cur.rowcount}')
+            logger.debug('Rowcount: %s', cur.rowcount)
             
             if cur.rowcount == 0:
                 conn.rollback()
@@ -515,7 +468,7 @@ def register_routes(app):
             # Verificar que se guardó
             cur.execute("SELECT firmado_funcionario, estado FROM app.solicitudes WHERE id = %s", (solicitud_id,))
             resultado = cur.fetchone()
-            print(f'✅ Guardado: firmado_funcionario={resultado[0]}, estado={resultado[1]}')
+            logger.info('Guardado: firmado_funcionario=%s, estado=%s', resultado[0], resultado[1])
             
             cur.close()
             conn.close()
@@ -530,7 +483,7 @@ def register_routes(app):
             }), 200
             
         except Exception as e:
-            print(f'❌ Error: {e}')
+            logger.error('Error: %s', e)
             if 'conn' in locals():
                 conn.rollback()
                 conn.close()
@@ -3,17 +3,75 @@ Rutas de salud del sistema
 """
 from flask import jsonify
 from datetime import datetime
+from utils.database import get_pool_stats
+from utils.pdf_service import get_pdf_service
+from utils.pdf_cache import get_pdf_cache
+from utils.logs import estadisticas_logging
+from utils.metricas_sql import estadisticas_sql
+from middleware.auth import login_required, rol_requerido
+
+# Las métricas detalladas (SQL normalizado, rutas, tiempos) solo para estos roles
+ROLES_METRICAS = ('jefatura', 'administrador')
 
 def register_routes(app):
     """Registrar rutas de health check"""
     
     @app.route('/api/health', methods=['GET'])
     def health_check():
-        """Endpoint de salud del servidor"""
+        """Endpoint de salud del servidor (público)"""
         return jsonify({
             'status': 'OK',
             'message': 'Servidor Flask funcionando correctamente',
             'timestamp': datetime.now().isoformat()
         }), 200
 
+    @app.route('/api/health/db-pool', methods=['GET'])
+    @login_required
+    @rol_requerido(*ROLES_METRICAS)
+    def health_db_pool():
+        """Estadísticas en vivo del pool de conexiones a PostgreSQL"""
+        try:
+            return jsonify({
+                'status': 'OK',
+                'pool': get_pool_stats(),
+                'timestamp': datetime.now().isoformat()
+            }), 200
+        except Exception as e:
+            return jsonify({'status': 'ERROR', 'error': str(e)}), 500
+
+    @app.route('/api/health/logs', methods=['GET'])
+    @login_required
+    @rol_requerido(*ROLES_METRICAS)
+    def health_logs():
+        """Cola del logging: registros en espera y descartados"""
+        return jsonify({
+            'status': 'OK',
+            'logs': estadisticas_logging(),
+            'timestamp': datetime.now().isoformat()
+        }), 200
+
+    @app.route('/api/health/sql', methods=['GET'])
+    @login_required
+    @rol_requerido(*ROLES_METRICAS)
+    def health_sql():
+        """Sentencias y tiempo de SQL por endpoint, y las consultas más costosas o repetidas"""
+        return jsonify({
+            'status': 'OK',
+            'sql': estadisticas_sql(),
+            'timestamp': datetime.now().isoformat()
+        }), 200
 
+    @app.route('/api/health/pdf', methods=['GET'])
+    @login_required
+    @rol_requerido(*ROLES_METRICAS)
+    def health_pdf():
+        """Cola, renders en curso, tiempos y caché del servicio de PDF"""
+        try:
+            return jsonify({
+                'status': 'OK',
+                'pdf': get_pdf_service().stats(),
+                'cache': get_pdf_cache().stats(),
+                'timestamp': datetime.now().isoformat()
+            }), 200
+        except Exception as e:
+            return jsonify({'status': 'ERROR', 'error': str(e)}), 500
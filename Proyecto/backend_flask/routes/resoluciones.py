@@ -1,208 +1,474 @@
 """
 Rutas de generación de resoluciones
 """
-from flask import request, jsonify, session, send_file, render_template_string
-from datetime import datetime
-import os
+import logging
+from flask import request, jsonify, session, send_file, Response, stream_with_context
+from datetime import datetime, timedelta
 import io
+import json
 from psycopg2.extras import RealDictCursor
 from utils.database import get_db_connection
 from utils.helpers import formatear_rut, formatear_fecha, formatear_moneda
 from middleware.auth import login_required
+from utils.pdf_service import XHTML2PDF_AVAILABLE, ColaLlena, TrabajoPDF, get_pdf_service
+from utils.trabajos_pdf import obtener_trabajo, registrar_trabajo
+from utils.pdf_cache import clave_pdf, get_pdf_cache, grupo_expediente
+from utils.plantillas import get_registro_plantillas
+from utils.zip_stream import generar_zip
+from config import Config
 
-# Importar xhtml2pdf si está disponible
-try:
-    from xhtml2pdf import pisa
-    XHTML2PDF_AVAILABLE = True
-except ImportError as e:
-    print(f'⚠️ xhtml2pdf no disponible: {e}')
-    XHTML2PDF_AVAILABLE = False
-    pisa = None
+logger = logging.getLogger(__name__)
+
+_config = Config()
+
+# Máximo de expedientes por descarga de resoluciones en lote
+MAX_RESOLUCIONES_LOTE = 200
+
+# Datos de la resolución por expediente en una sola consulta: la última
+# solicitud, el causante, el representante y el último cálculo aprobado
+# (NULL si no hay) se toman con LATERAL para que sirva para uno o muchos.
+SQL_DATOS_RESOLUCION = """
+    SELECT 
+        e.id AS expediente_id,
+        e.expediente_numero,
+        e.fecha_creacion,
+        c.fal_nombre,
+        c.fal_apellido_p,
+        c.fal_apellido_m,
+        c.fal_run,
+        c.fal_fecha_defuncion,
+        c.fal_comuna_defuncion,
+        r.rep_nombre,
+        r.rep_apellido_p,
+        r.rep_apellido_m,
+        r.rep_rut,
+        r.rep_calidad,
+        s.folio,
+        s.sucursal,
+        calc.id AS calculo_id,
+        calc.total_calculado,
+        calc.fecha_calculo
+    FROM app.expediente e
+    JOIN LATERAL (
+        SELECT folio, sucursal FROM app.solicitudes
+        WHERE expediente_id = e.id
+        ORDER BY id DESC
+        LIMIT 1
+    ) s ON TRUE
+    JOIN LATERAL (
+        SELECT fal_nombre, fal_apellido_p, fal_apellido_m, fal_run,
+               fal_fecha_defuncion, fal_comuna_defuncion
+        FROM app.causante
+        WHERE expediente_id = e.id
+        LIMIT 1
+    ) c ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT rep_nombre, rep_apellido_p, rep_apellido_m, rep_rut, rep_calidad
+        FROM app.representante
+        WHERE expediente_id = e.id
+        LIMIT 1
+    ) r ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT id, total_calculado, fecha_calculo, updated_at
+        FROM app.calculo_saldo_insoluto
+        WHERE expediente_id = e.id AND estado = 'aprobado'
+        ORDER BY fecha_calculo DESC
+        LIMIT 1
+    ) calc ON TRUE
+"""
+
+def _datos_resolucion(cur, condiciones, params, limite=None):
+    """Filas de SQL_DATOS_RESOLUCION que cumplen las condiciones, ordenadas por expediente"""
+    sql = SQL_DATOS_RESOLUCION + " WHERE " + " AND ".join(condiciones) + " ORDER BY e.id"
+    if limite is not None:
+        sql += " LIMIT %s"
+        params = list(params) + [limite]
+    cur.execute(sql, params)
+    return cur.fetchall()
+
+def _funcionario_jefatura(cur, funcionario_jefatura_id):
+    """
+    Funcionario de jefatura que inició sesión (el que aprueba).
+    Retorna (funcionario, None) o (None, respuesta de error).
+    """
+    if not funcionario_jefatura_id:
+        return None, (jsonify({'error': 'No se pudo identificar al funcionario de jefatura'}), 400)
+    
+    cur.execute("""
+        SELECT nombres, apellido_p, apellido_m
+        FROM app.funcionarios
+        WHERE id = %s
+    """, (funcionario_jefatura_id,))
+    
+    funcionario_jefatura = cur.fetchone()
+    if not funcionario_jefatura:
+        return None, (jsonify({'error': 'Funcionario de jefatura no encontrado'}), 404)
+    return funcionario_jefatura, None
+
+def _armar_contexto(datos_expediente, funcionario_jefatura):
+    """Contexto del template a partir de una fila de SQL_DATOS_RESOLUCION con cálculo aprobado"""
+    nombre_causante = f"{datos_expediente['fal_nombre']} {datos_expediente['fal_apellido_p']} {datos_expediente['fal_apellido_m'] or ''}".strip()
+    nombre_representante = f"{datos_expediente['rep_nombre'] or ''} {datos_expediente['rep_apellido_p'] or ''} {datos_expediente['rep_apellido_m'] or ''}".strip()
+    nombre_funcionario_jefatura = f"{funcionario_jefatura['nombres'] or ''} {funcionario_jefatura['apellido_p'] or ''} {funcionario_jefatura['apellido_m'] or ''}".strip()
+    
+    # Generar número de resolución (usar folio o generar uno)
+    numero_resolucion = datos_expediente['folio'] or f"RES-{datos_expediente['expediente_id']:03d}-{datetime.now().year}"
+    
+    return {
+        'NUMERO_CORRELATIVO': numero_resolucion,
+        'FECHA_APROBACION': formatear_fecha(datos_expediente['fecha_calculo']),
+        'NOMBRE_CAUSANTE': nombre_causante,
+        'RUT_CAUSANTE': formatear_rut(datos_expediente['fal_run']),
+        'FECHA_FALLECIMIENTO': formatear_fecha(datos_expediente['fal_fecha_defuncion']),
+        'NOMBRE_REPRESENTANTE': nombre_representante,
+        'RUT_REPRESENTANTE': formatear_rut(datos_expediente['rep_rut']) if datos_expediente['rep_rut'] else '',
+        'NOMBRE_FALLECIDA': nombre_causante,
+        'VALOR_SALDO_INSOLUTO': formatear_moneda(datos_expediente['total_calculado']),
+        'FUNCIONARIO_JEFATURA': nombre_funcionario_jefatura,
+        'FIRMA_FUNCIONARIO': nombre_funcionario_jefatura  # Funcionario de jefatura que inició sesión
+    }
+
+def _contexto_resolucion(cur, expediente_id, funcionario_jefatura_id):
+    """
+    Reunir los datos de la resolución de un expediente.
+    Retorna (context, None) o (None, respuesta de error).
+    """
+    filas = _datos_resolucion(cur, ['e.id = %s'], [expediente_id])
+    if not filas:
+        return None, (jsonify({'error': 'Expediente no encontrado'}), 404)
+    
+    datos_expediente = filas[0]
+    if datos_expediente['calculo_id'] is None:
+        return None, (jsonify({'error': 'No existe un cálculo aprobado para este expediente'}), 400)
+    
+    funcionario_jefatura, error = _funcionario_jefatura(cur, funcionario_jefatura_id)
+    if error:
+        return None, error
+    
+    return _armar_contexto(datos_expediente, funcionario_jefatura), None
+
+def _enviar_resolucion(expediente_id):
+    """
+    Preparar el HTML de la resolución y encolar su PDF.
+    Retorna (trabajo, None) o (None, respuesta de error).
+    """
+    if not XHTML2PDF_AVAILABLE:
+        return None, (jsonify({'error': 'xhtml2pdf no está disponible. Por favor, instale las dependencias correctas.'}), 500)
+    
+    conn = get_db_connection()
+    if not conn:
+        return None, (jsonify({'error': 'Error de conexión a la base de datos'}), 500)
+    
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        context, error = _contexto_resolucion(cur, expediente_id, session.get('user_id'))
+        cur.close()
+        conn.close()
+    except Exception:
+        conn.close()
+        raise
+    if error:
+        return None, error
+    
+    plantillas = get_registro_plantillas()
+    if not plantillas.existe('resolucion'):
+        return None, (jsonify({'error': 'Template HTML de resolución no encontrado'}), 500)
+    
+    nombre_archivo = f"resolucion_{expediente_id}_{datetime.now().strftime('%Y%m%d')}.pdf"
+    
+    # Mismo template y mismo contexto: se entrega el PDF guardado sin Jinja ni xhtml2pdf
+    cache = get_pdf_cache()
+    grupo = grupo_expediente(expediente_id)
+    clave = clave_pdf(plantillas.version('resolucion'), context)
+    pdf = cache.obtener(grupo, clave)
+    if pdf is not None:
+        return TrabajoPDF.desde_cache(pdf, nombre_archivo, propietario=session.get('user_id')), None
+    
+    html_content = plantillas.renderizar('resolucion', **context)
+    try:
+        # El estado se registra en app.trabajos_pdf para consultarlo desde cualquier worker
+        trabajo = get_pdf_service().enviar(
+            html_content, nombre_archivo, propietario=session.get('user_id'),
+            al_terminar=lambda pdf_generado: cache.guardar(grupo, clave, pdf_generado),
+            al_cambiar_estado=lambda t: registrar_trabajo(t, grupo, clave)
+        )
+    except ColaLlena as e:
+        respuesta = jsonify({'error': str(e)})
+        respuesta.headers['Retry-After'] = '5'
+        return None, (respuesta, 503)
+    
+    # Se reutilizó un trabajo ya terminado (p. ej. tras invalidar la caché): volver a guardarlo
+    if trabajo.estado == 'listo':
+        cache.guardar(grupo, clave, trabajo.pdf)
+    registrar_trabajo(trabajo, grupo, clave, nuevo=True)
+    return trabajo, None
+
+def _buscar_trabajo(trabajo_id):
+    """Trabajo de este worker o, si lo recibió otro, el registrado en app.trabajos_pdf"""
+    propietario = session.get('user_id')
+    trabajo = get_pdf_service().obtener(trabajo_id, propietario=propietario)
+    if trabajo is None:
+        trabajo = obtener_trabajo(trabajo_id, propietario=propietario)
+    return trabajo
+
+def _respuesta_pdf(trabajo):
+    """Descargar el PDF de un trabajo terminado"""
+    return send_file(
+        io.BytesIO(trabajo.pdf),
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=trabajo.nombre_archivo
+    )
+
+def _respuesta_trabajo(trabajo, status=202):
+    """Estado de un trabajo con las URLs para consultarlo y descargarlo"""
+    datos = trabajo.a_dict()
+    datos['url_estado'] = f'/api/resoluciones/trabajos/{trabajo.id}'
+    datos['url_pdf'] = f'/api/resoluciones/trabajos/{trabajo.id}/pdf'
+    return jsonify({'success': True, 'data': datos}), status
+
+def _leer_fecha_lote(valor, nombre):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise ValueError(f'{nombre} debe tener formato YYYY-MM-DD')
+
+def _seleccion_lote(data):
+    """
+    Traducir el cuerpo de la descarga en lote a condiciones de SQL_DATOS_RESOLUCION.
+    Acepta 'expediente_ids' o filtros ('sucursal', 'fecha_desde', 'fecha_hasta'
+    sobre la fecha de aprobación del cálculo).
+    Retorna ((condiciones, params, ids), None) o (None, respuesta de error).
+    """
+    ids = data.get('expediente_ids')
+    if ids is not None:
+        if not isinstance(ids, list) or not ids:
+            return None, (jsonify({'error': 'expediente_ids debe ser una lista no vacía'}), 400)
+        try:
+            ids = list(dict.fromkeys(int(i) for i in ids))
+        except (TypeError, ValueError):
+            return None, (jsonify({'error': 'expediente_ids debe contener solo números'}), 400)
+        if len(ids) > MAX_RESOLUCIONES_LOTE:
+            return None, (jsonify({'error': f'Se pueden descargar hasta {MAX_RESOLUCIONES_LOTE} resoluciones por lote'}), 400)
+        return (['e.id = ANY(%s)'], [ids], ids), None
+    
+    condiciones = ['calc.id IS NOT NULL']
+    params = []
+    try:
+        if data.get('sucursal'):
+            condiciones.append('s.sucursal = %s')
+            params.append(data['sucursal'])
+        if data.get('fecha_desde'):
+            condiciones.append('calc.updated_at >= %s')
+            params.append(_leer_fecha_lote(data['fecha_desde'], 'fecha_desde'))
+        if data.get('fecha_hasta'):
+            condiciones.append('calc.updated_at < %s')
+            params.append(_leer_fecha_lote(data['fecha_hasta'], 'fecha_hasta') + timedelta(days=1))
+    except ValueError as e:
+        return None, (jsonify({'error': str(e)}), 400)
+    
+    if not params:
+        return None, (jsonify({'error': 'Indique expediente_ids o al menos un filtro (sucursal, fecha_desde, fecha_hasta)'}), 400)
+    return (condiciones, params, None), None
 
 def register_routes(app):
     """Registrar rutas de resoluciones"""
     
+    # Compilar las plantillas de documentos al arrancar
+    try:
+        logger.info('Plantillas de documentos cargadas: %s', get_registro_plantillas().precargar())
+    except Exception as e:
+        logger.warning('Error precargando plantillas de documentos: %s', e)
+    
     @app.route('/api/generar-resolucion/<int:expediente_id>', methods=['GET'])
     @login_required
     def generar_resolucion(expediente_id):
-        """Generar resolución de saldo insoluto en formato PDF"""
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Error de conexión a la base de datos'}), 500
-        
+        """
+        Generar resolución de saldo insoluto en formato PDF.
+        El PDF se genera en el pool de procesos; esta ruta espera el resultado
+        (hasta PDF_SYNC_TIMEOUT) y, si no alcanza, responde 202 con el trabajo.
+        """
         try:
-            cur = conn.cursor(cursor_factory=RealDictCursor)
+            trabajo, error = _enviar_resolucion(expediente_id)
+            if error:
+                return error
             
-            # 1. Obtener datos del expediente, causante, representante y solicitud
-            cur.execute("""
-                SELECT 
-                    e.expediente_numero,
-                    e.fecha_creacion,
-                    c.fal_nombre,
-                    c.fal_apellido_p,
-                    c.fal_apellido_m,
-                    c.fal_run,
-                    c.fal_fecha_defuncion,
-                    c.fal_comuna_defuncion,
-                    r.rep_nombre,
-                    r.rep_apellido_p,
-                    r.rep_apellido_m,
-                    r.rep_rut,
-                    r.rep_calidad,
-                    s.folio,
-                    s.sucursal
-                FROM app.expediente e
-                JOIN app.causante c ON e.id = c.expediente_id
-                LEFT JOIN app.representante r ON e.id = r.expediente_id
-                JOIN app.solicitudes s ON e.id = s.expediente_id
-                WHERE e.id = %s
-                ORDER BY s.id DESC
-                LIMIT 1
-            """, (expediente_id,))
+            if not trabajo.esperar(_config.PDF_SYNC_TIMEOUT):
+                return _respuesta_trabajo(trabajo)
             
-            datos_expediente = cur.fetchone()
+            if trabajo.estado == 'error':
+                return jsonify({'error': f'Error generando PDF: {trabajo.error}'}), 500
             
-            if not datos_expediente:
-                cur.close()
-                conn.close()
-                return jsonify({'error': 'Expediente no encontrado'}), 404
+            return _respuesta_pdf(trabajo)
             
-            # 2. Obtener cálculo aprobado
-            cur.execute("""
-                SELECT 
-                    c.id,
-                    c.total_calculado,
-                    c.fecha_calculo,
-                    c.calculado_por,
-                    f.nombres,
-                    f.apellido_p,
-                    f.apellido_m
-                FROM app.calculo_saldo_insoluto c
-                LEFT JOIN app.funcionarios f ON c.calculado_por = f.id
-                WHERE c.expediente_id = %s AND c.estado = 'aprobado'
-                ORDER BY c.fecha_calculo DESC
-                LIMIT 1
-            """, (expediente_id,))
-            
-            calculo = cur.fetchone()
-            
-            if not calculo:
-                cur.close()
-                conn.close()
-                return jsonify({'error': 'No existe un cálculo aprobado para este expediente'}), 400
-            
-            # 3. Obtener funcionario de jefatura que inició sesión (el que aprueba)
-            funcionario_jefatura_id = session.get('user_id')
-            if not funcionario_jefatura_id:
-                cur.close()
-                conn.close()
-                return jsonify({'error': 'No se pudo identificar al funcionario de jefatura'}), 400
+        except Exception as e:
+            logger.exception('Error generando resolución: %s', e)
+            return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
+
+    @app.route('/api/resoluciones/<int:expediente_id>/trabajos', methods=['POST'])
+    @login_required
+    def crear_trabajo_resolucion(expediente_id):
+        """
+        Encolar la resolución y responder de inmediato con el id del trabajo (202).
+        Si el mismo PDF ya está generado se descarga directamente (200).
+        """
+        try:
+            trabajo, error = _enviar_resolucion(expediente_id)
+            if error:
+                return error
             
-            cur.execute("""
-                SELECT nombres, apellido_p, apellido_m
-                FROM app.funcionarios
-                WHERE id = %s
-            """, (funcionario_jefatura_id,))
+            if trabajo.estado == 'listo':
+                return _respuesta_pdf(trabajo)
             
-            funcionario_jefatura = cur.fetchone()
-            if not funcionario_jefatura:
-                cur.close()
-                conn.close()
-                return jsonify({'error': 'Funcionario de jefatura no encontrado'}), 404
+            return _respuesta_trabajo(trabajo)
             
-            # 4. Preparar datos para el template
-            nombre_causante = f"{datos_expediente['fal_nombre']} {datos_expediente['fal_apellido_p']} {datos_expediente['fal_apellido_m'] or ''}".strip()
-            nombre_representante = f"{datos_expediente['rep_nombre'] or ''} {datos_expediente['rep_apellido_p'] or ''} {datos_expediente['rep_apellido_m'] or ''}".strip()
-            nombre_funcionario_jefatura = f"{funcionario_jefatura['nombres'] or ''} {funcionario_jefatura['apellido_p'] or ''} {funcionario_jefatura['apellido_m'] or ''}".strip()
+        except Exception as e:
+            logger.exception('Error encolando resolución: %s', e)
+            return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
+
+    @app.route('/api/resoluciones/trabajos/<trabajo_id>', methods=['GET'])
+    @login_required
+    def estado_trabajo_resolucion(trabajo_id):
+        """Consultar el estado de un trabajo de resolución"""
+        trabajo = _buscar_trabajo(trabajo_id)
+        if not trabajo:
+            return jsonify({'error': 'Trabajo no encontrado o vencido'}), 404
+        return _respuesta_trabajo(trabajo, 200)
+
+    @app.route('/api/resoluciones/trabajos/<trabajo_id>/pdf', methods=['GET'])
+    @login_required
+    def descargar_trabajo_resolucion(trabajo_id):
+        """Descargar el PDF de un trabajo terminado"""
+        trabajo = _buscar_trabajo(trabajo_id)
+        if not trabajo:
+            return jsonify({'error': 'Trabajo no encontrado o vencido'}), 404
+        if trabajo.estado == 'error':
+            return jsonify({'error': f'Error generando PDF: {trabajo.error}'}), 500
+        if trabajo.estado != 'listo':
+            return _respuesta_trabajo(trabajo, 409)
+        # Generado en otro worker: el PDF sale de la caché compartida (pudo invalidarse)
+        if trabajo.pdf is None:
+            return jsonify({'error': 'Trabajo no encontrado o vencido'}), 404
+        return _respuesta_pdf(trabajo)
+
+    @app.route('/api/resoluciones/lote', methods=['POST'])
+    @login_required
+    def descargar_resoluciones_lote():
+        """
+        Descargar las resoluciones de varios expedientes en un ZIP.
+        Los datos se obtienen en una sola consulta, los PDF ya generados salen
+        de la caché y el resto se genera en paralelo en el pool de procesos.
+        El ZIP incluye manifiesto.json con los expedientes que no se pudieron
+        generar (p. ej. sin cálculo aprobado) y el motivo.
+        """
+        if not XHTML2PDF_AVAILABLE:
+            return jsonify({'error': 'xhtml2pdf no está disponible. Por favor, instale las dependencias correctas.'}), 500
+        
+        seleccion, error = _seleccion_lote(request.get_json(silent=True) or {})
+        if error:
+            return error
+        condiciones, params, ids = seleccion
+        
+        plantillas = get_registro_plantillas()
+        if not plantillas.existe('resolucion'):
+            return jsonify({'error': 'Template HTML de resolución no encontrado'}), 500
+        
+        conn = get_db_connection()
+        if not conn:
+            return jsonify({'error': 'Error de conexión a la base de datos'}), 500
+        
+        try:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            funcionario_jefatura, error = _funcionario_jefatura(cur, session.get('user_id'))
+            filas = [] if error else _datos_resolucion(cur, condiciones, params, MAX_RESOLUCIONES_LOTE + 1)
+            cur.close()
+            conn.close()
+        except Exception as e:
+            logger.exception('Error obteniendo datos de resoluciones en lote: %s', e)
+            conn.close()
+            return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
+        if error:
+            return error
+        
+        if len(filas) > MAX_RESOLUCIONES_LOTE:
+            return jsonify({'error': f'Los filtros incluyen más de {MAX_RESOLUCIONES_LOTE} expedientes; acote la búsqueda'}), 400
+        
+        errores = []
+        encontrados = {fila['expediente_id'] for fila in filas}
+        for expediente_id in ids or []:
+            if expediente_id not in encontrados:
+                errores.append({'expediente_id': expediente_id, 'error': 'Expediente no encontrado'})
+        
+        version = plantillas.version('resolucion')
+        fecha = datetime.now().strftime('%Y%m%d')
+        resoluciones = []
+        for fila in filas:
+            expediente_id = fila['expediente_id']
+            if fila['calculo_id'] is None:
+                errores.append({'expediente_id': expediente_id, 'error': 'No existe un cálculo aprobado para este expediente'})
+                continue
+            contexto = _armar_contexto(fila, funcionario_jefatura)
+            resoluciones.append({
+                'expediente_id': expediente_id,
+                'nombre_archivo': f"resolucion_{expediente_id}_{fecha}.pdf",
+                'contexto': contexto,
+                'clave': clave_pdf(version, contexto),
+            })
+        
+        if not resoluciones and not errores:
+            return jsonify({'error': 'No hay expedientes con cálculo aprobado para los filtros indicados'}), 404
+        
+        cache = get_pdf_cache()
+        servicio = get_pdf_service()
+        
+        def archivos():
+            generados = []
+            por_generar = {}
+            for item in resoluciones:
+                pdf = cache.obtener(grupo_expediente(item['expediente_id']), item['clave'])
+                if pdf is None:
+                    por_generar[item['expediente_id']] = item
+                    continue
+                generados.append({'expediente_id': item['expediente_id'], 'archivo': item['nombre_archivo'], 'origen': 'cache'})
+                yield item['nombre_archivo'], [pdf]
             
-            # Generar número de resolución (usar folio o generar uno)
-            numero_resolucion = datos_expediente['folio'] or f"RES-{expediente_id:03d}-{datetime.now().year}"
+            # El HTML se arma a medida que el pool tiene cupo
+            documentos = (
+                (expediente_id, plantillas.renderizar('resolucion', **item['contexto']))
+                for expediente_id, item in por_generar.items()
+            )
+            for expediente_id, pdf, error_render in servicio.renderizar_lote(documentos):
+                item = por_generar[expediente_id]
+                if error_render:
+                    errores.append({'expediente_id': expediente_id, 'error': f'Error generando PDF: {error_render}'})
+                    continue
+                try:
+                    cache.guardar(grupo_expediente(expediente_id), item['clave'], pdf)
+                except Exception as e:
+                    logger.warning('Error guardando el PDF %s en caché: %s', item["nombre_archivo"], e)
+                generados.append({'expediente_id': expediente_id, 'archivo': item['nombre_archivo'], 'origen': 'generado'})
+                yield item['nombre_archivo'], [pdf]
             
-            # Contexto para el template
-            context = {
-                'NUMERO_CORRELATIVO': numero_resolucion,
-                'FECHA_APROBACION': formatear_fecha(calculo['fecha_calculo']),
-                'NOMBRE_CAUSANTE': nombre_causante,
-                'RUT_CAUSANTE': formatear_rut(datos_expediente['fal_run']),
-                'FECHA_FALLECIMIENTO': formatear_fecha(datos_expediente['fal_fecha_defuncion']),
-                'NOMBRE_REPRESENTANTE': nombre_representante,
-                'RUT_REPRESENTANTE': formatear_rut(datos_expediente['rep_rut']) if datos_expediente['rep_rut'] else '',
-                'NOMBRE_FALLECIDA': nombre_causante,
-                'VALOR_SALDO_INSOLUTO': formatear_moneda(calculo['total_calculado']),
-                'FUNCIONARIO_JEFATURA': nombre_funcionario_jefatura,
-                'FIRMA_FUNCIONARIO': nombre_funcionario_jefatura  # Funcionario de jefatura que inició sesión
+            manifiesto = {
+                'generado_en': datetime.now().isoformat(),
+                'total': len(generados) + len(errores),
+                'generados': sorted(generados, key=lambda g: g['expediente_id']),
+                'errores': sorted(errores, key=lambda e: e['expediente_id']),
             }
-            
-            # 5. Cargar template HTML y generar PDF directamente
-            template_html_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates', 'resolucion_template.html')
-            
-            if not os.path.exists(template_html_path):
-                cur.close()
-                conn.close()
-                return jsonify({'error': 'Template HTML de resolución no encontrado'}), 500
-            
-            # Leer el template HTML
-            with open(template_html_path, 'r', encoding='utf-8') as f:
-                html_template = f.read()
-            
-            # Renderizar el HTML con los datos usando Jinja2
-            html_content = render_template_string(html_template, **context)
-            
-            # 6. Generar PDF directamente desde HTML usando xhtml2pdf
-            if not XHTML2PDF_AVAILABLE:
-                cur.close()
-                conn.close()
-                return jsonify({'error': 'xhtml2pdf no está disponible. Por favor, instale las dependencias correctas.'}), 500
-            
+            logger.info('Resoluciones en lote: %s generadas, %s con error', len(generados), len(errores))
+            yield 'manifiesto.json', [json.dumps(manifiesto, ensure_ascii=False, indent=2).encode('utf-8')]
+        
+        def generar():
             try:
-                pdf_output = io.BytesIO()
-                
-                # Generar PDF desde HTML
-                pisa_status = pisa.CreatePDF(
-                    src=html_content,
-                    dest=pdf_output,
-                    encoding='utf-8'
-                )
-                
-                if pisa_status.err:
-                    raise Exception(f'Error generando PDF: {pisa_status.err}')
-                
-                pdf_output.seek(0)
-                
-                # Verificar que el PDF se generó correctamente
-                pdf_data = pdf_output.read()
-                if not pdf_data.startswith(b'%PDF'):
-                    raise Exception('El archivo generado no es un PDF válido')
-                
-                pdf_output.seek(0)
-                print('✅ PDF generado correctamente con xhtml2pdf')
-                
-                cur.close()
-                conn.close()
-                
-                # Retornar el archivo PDF
-                nombre_archivo = f"resolucion_{expediente_id}_{datetime.now().strftime('%Y%m%d')}.pdf"
-                
-                return send_file(
-                    pdf_output,
-                    mimetype='application/pdf',
-                    as_attachment=True,
-                    download_name=nombre_archivo
-                )
-                
-            except Exception as pdf_error:
-                print(f'❌ Error generando PDF con xhtml2pdf: {pdf_error}')
-                import traceback
-                traceback.print_exc()
-                cur.close()
-                conn.close()
-                return jsonify({'error': f'Error generando PDF: {str(pdf_error)}'}), 500
-            
-        except Exception as e:
-            print(f'❌ Error generando resolución: {e}')
-            import traceback
-            traceback.print_exc()
-            if 'conn' in locals():
-                conn.close()
-            return jsonify({'error': f'Error interno del servidor: {str(e)}'}), 500
-
+                yield from generar_zip(archivos())
+            except Exception as e:
+                logger.exception('Error generando ZIP de resoluciones: %s', e)
+                raise
+        
+        return Response(
+            stream_with_context(generar()),
+            mimetype='application/zip',
+            headers={
+                'Content-Disposition': f'attachment; filename=resoluciones_{fecha}.zip'
+            }
+        )
@@ -7,9 +7,25 @@ import json
 import hmac
 import hashlib
 from psycopg2.extras import RealDictCursor
-from utils.database import get_db_connection
+from utils.database import get_db_connection, insertar_filas
 from middleware.auth import login_required
 
+def _siguiente_numero_solicitud(cur, año):
+    """
+    Tomar el siguiente número correlativo del año desde app.folios_solicitud.
+    Debe llamarse dentro de la transacción que inserta la solicitud, justo antes
+    del INSERT: la fila del año queda bloqueada hasta el COMMIT, así dos
+    creaciones simultáneas nunca obtienen el mismo número y un ROLLBACK no deja
+    huecos; tomarlo al final acorta el tiempo que las demás esperan.
+    """
+    cur.execute("""
+        INSERT INTO app.folios_solicitud (anio, ultimo)
+        VALUES (%s, 1)
+        ON CONFLICT (anio) DO UPDATE SET ultimo = app.folios_solicitud.ultimo + 1
+        RETURNING ultimo
+    """, (año,))
+    return cur.fetchone()[0]
+
 def register_routes(app):
     """Registrar rutas de solicitudes"""
     
@@ -66,16 +82,13 @@ def register_routes(app):
             ))
             causante_run = cur.fetchone()[0]
             
-            # Solicitud
+            # Folio desde el correlativo anual. Se toma recién aquí: la fila del año
+            # queda bloqueada hasta el COMMIT y las demás creaciones esperan por ella
             año_actual = datetime.now().year
-            cur.execute("""
-                SELECT COALESCE(MAX(CASE WHEN folio ~ ('^SI-\\d{3}-' || %s) 
-                THEN CAST(SUBSTRING(folio FROM 'SI-(\\d{3})-') AS INTEGER) ELSE 0 END), 0) + 1
-                FROM app.solicitudes WHERE folio LIKE ('SI-%%-' || %s)
-            """, (año_actual, año_actual))
-            numero_secuencial = cur.fetchone()[0]
+            numero_secuencial = _siguiente_numero_solicitud(cur, año_actual)
             folio = f"SI-{numero_secuencial:03d}-{año_actual}"
             
+            # Solicitud
             cur.execute("""
                 INSERT INTO app.solicitudes (expediente_id, folio, estado, sucursal, observacion, representante_rut, causante_rut, fecha_defuncion, comuna_fallecimiento)
                 VALUES (%s, %s, 'borrador', %s, %s, %s, %s, %s, %s)
@@ -87,18 +100,19 @@ def register_routes(app):
             ))
             solicitud_id = cur.fetchone()[0]
             
-            # Beneficiarios
+            # Beneficiarios (todos en un solo INSERT)
             beneficiarios = data.get('beneficiarios', [])
             if beneficiarios and isinstance(beneficiarios, list):
-                for beneficiario in beneficiarios:
-                    if beneficiario.get('nombre') and beneficiario.get('run'):
-                        cur.execute("""
-                            INSERT INTO app.beneficiarios (expediente_id, solicitud_id, ben_nombre, ben_run, ben_parentesco)
-                            VALUES (%s, %s, %s, %s, %s)
-                        """, (
-                            expediente_id, solicitud_id, beneficiario.get('nombre'),
-                            beneficiario.get('run'), beneficiario.get('parentesco') or None
-                        ))
+                insertar_filas(
+                    cur, 'app.beneficiarios',
+                    ('expediente_id', 'solicitud_id', 'ben_nombre', 'ben_run', 'ben_parentesco'),
+                    (
+                        (expediente_id, solicitud_id, beneficiario.get('nombre'),
+                         beneficiario.get('run'), beneficiario.get('parentesco') or None)
+                        for beneficiario in beneficiarios
+                        if beneficiario.get('nombre') and beneficiario.get('run')
+                    )
+                )
             
             # Validación
             cur.execute("""
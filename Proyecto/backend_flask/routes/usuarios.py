@@ -1,20 +1,22 @@
 """
 Rutas de gestión de usuarios
 """
+import logging
 from flask import request, jsonify, session
 from psycopg2.extras import RealDictCursor
 from utils.database import get_db_connection
-from utils.helpers import validar_rut_chileno, hash_password
+from utils.helpers import validar_rut_chileno, hash_password, rut_a_clave
 import re
 
+logger = logging.getLogger(__name__)
+
 def register_routes(app):
     """Registrar rutas de usuarios"""
     
     @app.route('/api/usuarios', methods=['POST'])
     def crear_usuario():
         """Crear un nuevo usuario funcionario"""
-        print("🔔 Petición recibida en /api/usuarios")
-        print(f"📥 Datos recibidos: {request.get_json()}")
+        logger.debug("Petición recibida en /api/usuarios")
         
         conn = get_db_connection()
         if not conn:
@@ -39,15 +41,17 @@ def register_routes(app):
                 return jsonify({'error': 'Las contraseñas no coinciden'}), 400
             
             # Validar RUT chileno
-            print(f"🔍 RUT recibido: '{data['rut']}'")
-            print(f"🔍 Tipo de RUT: {type(data['rut'])}")
-            print(f"🔍 Longitud RUT: {len(data['rut'])}")
+            logger.debug("RUT recibido: '%s'", data['rut'])
             
             if not validar_rut_chileno(data['rut']):
-                print(f"❌ RUT inválido: '{data['rut']}'")
+                logger.info("RUT inválido: '%s'", data['rut'])
                 return jsonify({'error': 'RUT inválido'}), 400
             else:
-                print(f"✅ RUT válido: '{data['rut']}'")
+                logger.debug("RUT válido: '%s'", data['rut'])
+            
+            # Se guarda sin puntos y con guion (12345678-9), no el texto recibido
+            rut_numero, rut_dv = rut_a_clave(data['rut'])
+            rut = f"{rut_numero}-{rut_dv}"
             
             # Validar email
             email_pattern = r'^[^\s@]+@[^\s@]+\.[^\s@]+$'
@@ -76,7 +80,7 @@ def register_routes(app):
             cur = conn.cursor()
             
             # Verificar si el RUT ya existe
-            cur.execute("SELECT id FROM app.funcionarios WHERE rut = %s", (data['rut'],))
+            cur.execute("SELECT id FROM app.funcionarios WHERE rut_num = %s", (rut_numero,))
             if cur.fetchone():
                 return jsonify({'error': 'Ya existe un funcionario con este RUT'}), 409
             
@@ -94,7 +98,7 @@ def register_routes(app):
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
                 RETURNING id, iniciales
             """, (
-                data['rut'],
+                rut,
                 data['nombres'].strip(),
                 data['apellido_p'].strip(),
                 data.get('apellido_m', '').strip() or None,
@@ -111,14 +115,14 @@ def register_routes(app):
             cur.close()
             conn.close()
             
-            print(f'👤 Usuario creado: {data["nombres"]} {data["apellido_p"]} - Iniciales: {iniciales}')
+            logger.info('Usuario creado: %s %s - Iniciales: %s', data["nombres"], data["apellido_p"], iniciales)
             
             return jsonify({
                 'success': True,
                 'message': 'Usuario creado exitosamente',
                 'data': {
                     'id': usuario_id,
-                    'rut': data['rut'],
+                    'rut': rut,
                     'nombres': data['nombres'],
                     'apellido_p': data['apellido_p'],
                     'apellido_m': data.get('apellido_m'),
@@ -130,7 +134,7 @@ def register_routes(app):
             }), 201
             
         except Exception as e:
-            print(f'❌ Error creando usuario: {e}')
+            logger.exception('Error creando usuario: %s', e)
             if 'conn' in locals():
                 conn.rollback()
                 conn.close()
@@ -1,6 +0,0 @@
--- Agregar 'completado' al ENUM app.estado_solicitud
-ALTER TYPE app.estado_solicitud ADD VALUE 'completado';
-
-
-
-
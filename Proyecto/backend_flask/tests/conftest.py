@@ -0,0 +1,74 @@
+"""
+Configuración común de las pruebas (python -m pytest tests, desde backend_flask)
+
+Las pruebas que usan PostgreSQL se saltan si no se indica TEST_DB_NAME: una
+base exclusiva para pruebas (se crean y borran datos en ella), en el mismo
+servidor de DB_HOST/DB_PORT/DB_USER. Si está vacía se crea el esquema con
+database/init_database.sql y luego se aplican las migraciones. Ejemplo:
+    TEST_DB_NAME=saldo_test python -m pytest tests
+"""
+import os
+import secrets
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(BACKEND_DIR)  # config.py lee config.env relativo al directorio actual
+
+# Debe fijarse antes de que se importe config.py
+TEST_DB_NAME = os.getenv('TEST_DB_NAME')
+if TEST_DB_NAME:
+    os.environ['DB_NAME'] = TEST_DB_NAME
+
+# Sesiones en cookie con una clave aleatoria: las pruebas sin base de datos
+# también pueden iniciar sesión
+os.environ.setdefault('SESSION_BACKEND', 'cookie')
+os.environ.setdefault('SECRET_KEY', secrets.token_hex(32))
+
+
+@pytest.fixture(scope='session')
+def app():
+    """Aplicación Flask con todas las rutas registradas"""
+    from app import app as aplicacion
+    aplicacion.config['TESTING'] = True
+    return aplicacion
+
+
+@pytest.fixture(scope='session')
+def base_de_datos():
+    """Base de pruebas con el esquema al día (salta la prueba si no hay TEST_DB_NAME)"""
+    if not TEST_DB_NAME:
+        pytest.skip('TEST_DB_NAME no está definido: se omiten las pruebas con PostgreSQL')
+
+    from utils.database import get_db_connection
+    from utils.migrations import run_migrations
+
+    conn = get_db_connection()
+    if not conn:
+        pytest.skip(f'No se pudo conectar a la base de pruebas {TEST_DB_NAME}')
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT to_regclass('app.expediente')")
+        if cur.fetchone()[0] is None:
+            with open(os.path.join(BACKEND_DIR, 'database', 'init_database.sql'), encoding='utf-8') as f:
+                cur.execute(f.read())
+        cur.close()
+        conn.commit()
+    finally:
+        conn.close()
+
+    assert run_migrations(), 'No se pudieron aplicar las migraciones en la base de pruebas'
+
+
+@pytest.fixture
+def conexion(base_de_datos):
+    """Conexión propia del pool; lo que no se confirme se descarta al terminar"""
+    from utils.database import get_pool
+    from utils.db_pool import PooledConnection
+
+    conn = PooledConnection(get_pool(), get_pool().checkout())
+    yield conn
+    conn.rollback()
+    conn.close()
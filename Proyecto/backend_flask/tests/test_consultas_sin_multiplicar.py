@@ -0,0 +1,201 @@
+"""
+Las consultas principales de búsqueda, revisión y cola de aprobación no deben
+multiplicar filas (beneficiarios × documentos × solicitudes): el plan debe
+estimar del orden de los expedientes devueltos y los conteos deben salir
+exactos aunque el expediente tenga varias solicitudes.
+
+Requiere PostgreSQL (TEST_DB_NAME); los datos sintéticos se crean dentro de
+una transacción que se descarta al terminar.
+"""
+import pytest
+from flask import g, session
+from psycopg2 import extensions
+
+from utils.db_pool import PooledConnection
+
+EXPEDIENTES = 300
+BENEFICIARIOS = 15     # por expediente
+DOCUMENTOS = 15        # por expediente
+SOLICITUDES = 3        # por expediente; solo la última queda pendiente
+FIRMADOS = 5           # beneficiarios con usuario de firma
+RUT_BASE = 30000000    # causante del expediente n: RUT_BASE + n
+
+NODOS_JOIN = {'Nested Loop', 'Hash Join', 'Merge Join'}
+
+
+def _poblar(conn):
+    """Datos sintéticos: EXPEDIENTES expedientes con sus causantes, representantes,
+    solicitudes, beneficiarios, documentos y firmas"""
+    cur = conn.cursor()
+    cur.execute("""
+        CREATE TEMP TABLE exp_prueba ON COMMIT DROP AS
+        WITH nuevos AS (
+            INSERT INTO app.expediente (expediente_numero)
+            SELECT 'PRUEBA-FANOUT-' || n FROM generate_series(1, %(e)s) n
+            RETURNING id, expediente_numero
+        )
+        SELECT id, split_part(expediente_numero, '-', 3)::int AS n FROM nuevos
+    """, {'e': EXPEDIENTES})
+    cur.execute("""
+        INSERT INTO app.causante (expediente_id, fal_nombre, fal_apellido_p, fal_run)
+        SELECT id, 'Causante', 'Prueba ' || n, (%(rut)s + n) || '-0' FROM exp_prueba
+    """, {'rut': RUT_BASE})
+    cur.execute("""
+        INSERT INTO app.representante (expediente_id, rep_nombre, rep_rut)
+        SELECT id, 'Representante', (%(rut)s + 10000 + n) || '-0' FROM exp_prueba
+    """, {'rut': RUT_BASE})
+    # Solicitudes anteriores rechazadas y una última pendiente, en fechas
+    # futuras para que encabecen la cola de pendientes
+    cur.execute("""
+        INSERT INTO app.solicitudes (expediente_id, folio, estado, fecha_creacion)
+        SELECT e.id, 'PRUEBA-FANOUT-' || e.n || '-' || k, 'rechazado',
+               TIMESTAMP '2099-01-01' + e.n * INTERVAL '1 minute' + k * INTERVAL '1 second'
+        FROM exp_prueba e, generate_series(1, %(s)s - 1) k
+        ORDER BY k, e.n
+    """, {'s': SOLICITUDES})
+    cur.execute("""
+        INSERT INTO app.solicitudes (expediente_id, folio, estado, fecha_creacion)
+        SELECT id, 'PRUEBA-FANOUT-' || n || '-' || %(s)s, 'pendiente',
+               TIMESTAMP '2099-01-01' + n * INTERVAL '1 minute' + %(s)s * INTERVAL '1 second'
+        FROM exp_prueba
+    """, {'s': SOLICITUDES})
+    cur.execute("""
+        INSERT INTO app.beneficiarios (expediente_id, ben_nombre, ben_run)
+        SELECT e.id, 'Beneficiario ' || j, (%(rut)s + 20000 + e.n * 100 + j) || '-0'
+        FROM exp_prueba e, generate_series(1, %(b)s) j
+    """, {'rut': RUT_BASE, 'b': BENEFICIARIOS})
+    cur.execute("""
+        INSERT INTO app.documentos_saldo_insoluto (expediente_id, doc_nombre_archivo)
+        SELECT e.id, 'documento-' || j || '.pdf'
+        FROM exp_prueba e, generate_series(1, %(d)s) j
+    """, {'d': DOCUMENTOS})
+    cur.execute("""
+        INSERT INTO app.usuarios_firma (rut, password_hash)
+        SELECT (%(rut)s + 20000 + e.n * 100 + j) || '-0', 'x'
+        FROM exp_prueba e, generate_series(1, %(f)s) j
+    """, {'rut': RUT_BASE, 'f': FIRMADOS})
+    for tabla in ('expediente', 'causante', 'representante', 'solicitudes', 'beneficiarios',
+                  'documentos_saldo_insoluto', 'usuarios_firma', 'progreso_expediente'):
+        cur.execute(f'ANALYZE app.{tabla}')
+    cur.close()
+
+
+def _capturar_sentencias(sentencias):
+    """envolver_cursor para PooledConnection que anota (query, vars) de cada execute"""
+    def envolver(cursor_factory=None):
+        base = cursor_factory or extensions.cursor
+
+        class CursorCapturador(base):
+            def execute(self, query, vars=None):
+                sentencias.append((query, vars))
+                return super().execute(query, vars)
+
+        return CursorCapturador
+    return envolver
+
+
+def _llamar(app, conexion, endpoint, **contexto):
+    """Ejecutar una vista con la conexión de prueba; retorna (json, sentencias)"""
+    sentencias = []
+    with app.test_request_context(**contexto):
+        session['user_id'] = 1
+        session['rol'] = 'jefatura'
+        g._db_conn = PooledConnection(
+            None, conexion.raw, ligada_a_request=True,
+            envolver_cursor=_capturar_sentencias(sentencias)
+        )
+        try:
+            respuesta, status = app.view_functions[endpoint]()
+        finally:
+            # La conexión es del fixture: que el teardown no la devuelva al pool
+            g.pop('_db_conn')
+    assert status == 200, respuesta.get_json()
+    return respuesta.get_json(), sentencias
+
+
+def _plan(conexion, query, vars):
+    cur = conexion.cursor()
+    cur.execute('EXPLAIN (FORMAT JSON) ' + query, vars)
+    plan = cur.fetchone()[0][0]['Plan']
+    cur.close()
+    return plan
+
+
+def _nodos(plan):
+    yield plan
+    for hijo in plan.get('Plans', []):
+        yield from _nodos(hijo)
+
+
+def _filas_max_join(plan):
+    return max((n['Plan Rows'] for n in _nodos(plan) if n['Node Type'] in NODOS_JOIN), default=0)
+
+
+def _tablas(plan):
+    return {n['Relation Name'] for n in _nodos(plan) if 'Relation Name' in n}
+
+
+@pytest.fixture
+def datos(conexion):
+    _poblar(conexion)
+    return conexion
+
+
+@pytest.mark.parametrize('endpoint', ['buscar_saldo_insoluto', 'revision_expediente'])
+def test_consulta_por_rut_no_multiplica_filas(app, datos, endpoint):
+    rut = f'{RUT_BASE + 7}-0'
+    cuerpo, sentencias = _llamar(app, datos, endpoint, method='POST', json={'rut': rut})
+
+    query, vars = sentencias[0]
+    plan = _plan(datos, query, vars)
+    # Un solo expediente para el RUT: ni el resultado ni ningún join debe
+    # acercarse a beneficiarios × documentos
+    assert plan['Plan Rows'] <= SOLICITUDES
+    assert _filas_max_join(plan) <= SOLICITUDES
+    assert not _tablas(plan) & {'beneficiarios', 'documentos_saldo_insoluto'}
+
+    datos_respuesta = cuerpo['data']
+    if endpoint == 'buscar_saldo_insoluto':
+        assert datos_respuesta['total'] == 1
+        expediente = datos_respuesta['expedientes'][0]
+        assert expediente['folio'] == f'PRUEBA-FANOUT-7-{SOLICITUDES}'
+        assert expediente['solicitud']['estado'] == 'pendiente'
+        assert expediente['firmas']['total_beneficiarios'] == BENEFICIARIOS
+        assert expediente['firmas']['beneficiarios_firmados'] == FIRMADOS
+    else:
+        assert datos_respuesta['folio'] == f'PRUEBA-FANOUT-7-{SOLICITUDES}'
+        assert datos_respuesta['solicitud']['estado'] == 'pendiente'
+        detalle = datos_respuesta['firmas']['detalle']['beneficiarios']
+        assert detalle['total'] == BENEFICIARIOS
+        assert detalle['firmados'] == FIRMADOS
+        assert datos_respuesta['documentos']['total'] == DOCUMENTOS
+        assert len(datos_respuesta['documentos']['lista']) == DOCUMENTOS
+        assert len(datos_respuesta['beneficiarios']) == BENEFICIARIOS
+        assert sum(1 for b in datos_respuesta['beneficiarios'] if b['firma']['firmado']) == FIRMADOS
+
+
+def test_cola_pendientes_no_multiplica_filas(app, datos):
+    limite = 50
+    cuerpo, sentencias = _llamar(
+        app, datos, 'solicitudes_pendientes', query_string={'limit': limite}
+    )
+
+    query, vars = sentencias[0]
+    plan = _plan(datos, query, vars)
+    assert plan['Plan Rows'] <= limite + 1
+    assert _filas_max_join(plan) <= EXPEDIENTES * SOLICITUDES
+    assert not _tablas(plan) & {'beneficiarios', 'documentos_saldo_insoluto'}
+
+    # Una fila por expediente (solo su última solicitud está pendiente) y
+    # conteos exactos pese a las solicitudes anteriores
+    filas = cuerpo['data']
+    assert len(filas) == limite
+    assert len({f['expediente_id'] for f in filas}) == limite
+    for fila in filas:
+        assert fila['folio'].startswith('PRUEBA-FANOUT-')
+        assert fila['folio'].endswith(f'-{SOLICITUDES}')
+        assert fila['firmas']['total_beneficiarios'] == BENEFICIARIOS
+        assert fila['firmas']['beneficiarios_firmados'] == FIRMADOS
+        assert fila['documentos']['total'] == DOCUMENTOS
+        assert len(fila['documentos']['lista']) == DOCUMENTOS
+        assert len(fila['beneficiarios']) == BENEFICIARIOS
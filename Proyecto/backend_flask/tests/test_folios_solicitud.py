@@ -0,0 +1,81 @@
+"""
+Folios de solicitud desde app.folios_solicitud bajo concurrencia: cada creación
+obtiene un número distinto y, aunque alguna haga ROLLBACK, los confirmados
+quedan correlativos
+"""
+import threading
+import time
+
+import pytest
+
+from routes.solicitudes import _siguiente_numero_solicitud
+
+# Año reservado para la prueba, para no tocar los contadores reales
+AÑO_PRUEBA = 2099
+
+
+@pytest.fixture
+def contador_limpio(conexion):
+    def limpiar():
+        cur = conexion.cursor()
+        cur.execute("DELETE FROM app.folios_solicitud WHERE anio = %s", (AÑO_PRUEBA,))
+        conexion.commit()
+
+    limpiar()
+    yield
+    limpiar()
+
+
+def _asignar_en_hilos(hilos, revertir=lambda i: False):
+    """Cada hilo toma un número con su propia conexión; retorna los confirmados"""
+    from utils.database import get_pool
+    from utils.db_pool import PooledConnection
+
+    confirmados = []
+    errores = []
+    lock = threading.Lock()
+    inicio = threading.Event()
+
+    def asignar(i):
+        inicio.wait()
+        conn = PooledConnection(get_pool(), get_pool().checkout())
+        try:
+            cur = conn.cursor()
+            numero = _siguiente_numero_solicitud(cur, AÑO_PRUEBA)
+            # Mantener la transacción abierta para que los demás hilos esperen la fila
+            time.sleep(0.02)
+            if revertir(i):
+                conn.rollback()
+                return
+            conn.commit()
+            with lock:
+                confirmados.append(numero)
+        except Exception as e:
+            conn.rollback()
+            with lock:
+                errores.append(e)
+        finally:
+            conn.close()
+
+    trabajadores = [threading.Thread(target=asignar, args=(i,)) for i in range(hilos)]
+    for trabajador in trabajadores:
+        trabajador.start()
+    inicio.set()
+    for trabajador in trabajadores:
+        trabajador.join(timeout=60)
+
+    assert not errores, errores
+    return confirmados
+
+
+@pytest.mark.parametrize('hilos', [2, 25])
+def test_folios_concurrentes_distintos_y_correlativos(contador_limpio, hilos):
+    numeros = _asignar_en_hilos(hilos)
+    assert len(numeros) == hilos
+    assert sorted(numeros) == list(range(1, hilos + 1))
+
+
+def test_rollback_no_deja_huecos(contador_limpio):
+    numeros = _asignar_en_hilos(20, revertir=lambda i: i % 4 == 0)
+    assert len(numeros) == 15
+    assert sorted(numeros) == list(range(1, 16))
@@ -0,0 +1,41 @@
+"""
+/api/health es público; las métricas detalladas de /api/health/* exigen
+sesión con rol de jefatura o administrador
+"""
+import pytest
+
+RUTAS_METRICAS = ['/api/health/db-pool', '/api/health/logs', '/api/health/sql', '/api/health/pdf']
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
+
+
+def _iniciar_sesion(cliente, rol):
+    with cliente.session_transaction() as sesion:
+        sesion['user_id'] = 1
+        sesion['rol'] = rol
+
+
+def test_health_publico(cliente):
+    assert cliente.get('/api/health').status_code == 200
+
+
+@pytest.mark.parametrize('ruta', RUTAS_METRICAS)
+def test_metricas_sin_sesion(cliente, ruta):
+    assert cliente.get(ruta).status_code == 401
+
+
+@pytest.mark.parametrize('ruta', RUTAS_METRICAS)
+def test_metricas_rol_sin_permiso(cliente, ruta):
+    _iniciar_sesion(cliente, 'ejecutivo_plataforma')
+    assert cliente.get(ruta).status_code == 403
+
+
+@pytest.mark.parametrize('rol', ['jefatura', 'administrador'])
+def test_metricas_con_rol_autorizado(cliente, rol):
+    _iniciar_sesion(cliente, rol)
+    respuesta = cliente.get('/api/health/sql')
+    assert respuesta.status_code == 200
+    assert 'sql' in respuesta.get_json()
@@ -0,0 +1,88 @@
+"""
+progreso_expediente.beneficiarios_firmados debe quedar correcto cuando una
+transacción crea la firma de un RUT mientras otra agrega un beneficiario con
+ese mismo RUT (ninguna ve la fila sin confirmar de la otra)
+"""
+import threading
+import time
+
+import pytest
+
+# RUT reservado para la prueba
+RUT_PRUEBA = '39999999-0'
+
+
+def _nueva_conexion():
+    from utils.database import get_pool
+    from utils.db_pool import PooledConnection
+    return PooledConnection(get_pool(), get_pool().checkout())
+
+
+@pytest.fixture
+def expediente(conexion):
+    def limpiar():
+        cur = conexion.cursor()
+        cur.execute("DELETE FROM app.usuarios_firma WHERE rut = %s", (RUT_PRUEBA,))
+        cur.execute("DELETE FROM app.expediente WHERE expediente_numero = 'PRUEBA-PROGRESO-FIRMA'")
+        conexion.commit()
+
+    limpiar()
+    cur = conexion.cursor()
+    cur.execute("""
+        INSERT INTO app.expediente (expediente_numero) VALUES ('PRUEBA-PROGRESO-FIRMA')
+        RETURNING id
+    """)
+    expediente_id = cur.fetchone()[0]
+    conexion.commit()
+    yield expediente_id
+    limpiar()
+
+
+def _agregar_beneficiario(cur, expediente_id):
+    cur.execute("""
+        INSERT INTO app.beneficiarios (expediente_id, ben_nombre, ben_run)
+        VALUES (%s, 'Beneficiario', %s)
+    """, (expediente_id, RUT_PRUEBA))
+
+
+def _crear_firma(cur, expediente_id):
+    cur.execute("INSERT INTO app.usuarios_firma (rut, password_hash) VALUES (%s, 'x')", (RUT_PRUEBA,))
+
+
+@pytest.mark.parametrize('primero, segundo', [
+    (_agregar_beneficiario, _crear_firma),
+    (_crear_firma, _agregar_beneficiario),
+])
+def test_firma_y_beneficiario_concurrentes(conexion, expediente, primero, segundo):
+    conn_primera = _nueva_conexion()
+    conn_segunda = _nueva_conexion()
+    errores = []
+
+    def escribir_segunda():
+        try:
+            segundo(conn_segunda.cursor(), expediente)
+            conn_segunda.commit()
+        except Exception as e:
+            conn_segunda.rollback()
+            errores.append(e)
+
+    try:
+        # La primera escribe y queda sin confirmar mientras la segunda escribe
+        primero(conn_primera.cursor(), expediente)
+        hilo = threading.Thread(target=escribir_segunda)
+        hilo.start()
+        time.sleep(0.2)
+        conn_primera.commit()
+        hilo.join(timeout=30)
+    finally:
+        conn_primera.rollback()
+        conn_primera.close()
+        conn_segunda.close()
+
+    assert not errores, errores
+    cur = conexion.cursor()
+    cur.execute("""
+        SELECT total_beneficiarios, beneficiarios_firmados
+        FROM app.progreso_expediente WHERE expediente_id = %s
+    """, (expediente,))
+    assert cur.fetchone() == (1, 1)
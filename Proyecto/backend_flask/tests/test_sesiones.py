@@ -0,0 +1,48 @@
+"""
+El backend 'cookie' guarda user_id y rol en la cookie firmada: no debe
+iniciar sin una SECRET_KEY propia ni aceptar sesiones firmadas con claves
+que estuvieron versionadas
+"""
+import pytest
+from flask import Flask
+from flask.sessions import SecureCookieSessionInterface
+
+from utils.sesiones import CLAVES_PUBLICAS, ClaveSesionInsegura, PostgresSessionInterface, init_app
+
+
+def _app(clave):
+    aplicacion = Flask(__name__)
+    aplicacion.config['SECRET_KEY'] = clave
+    return aplicacion
+
+
+@pytest.mark.parametrize('clave', [None, ''] + sorted(CLAVES_PUBLICAS))
+def test_cookie_sin_clave_propia_no_inicia(clave):
+    with pytest.raises(ClaveSesionInsegura):
+        init_app(_app(clave), backend='cookie')
+
+
+@pytest.mark.parametrize('clave', [None] + sorted(CLAVES_PUBLICAS))
+def test_postgres_sin_clave_propia_no_firma(clave):
+    aplicacion = _app(clave)
+    assert init_app(aplicacion, backend='postgres') == 'postgres'
+    assert aplicacion.secret_key is None
+    assert aplicacion.session_interface._firmador(aplicacion) is None
+
+
+def test_postgres_con_clave_propia_firma():
+    aplicacion = _app('clave-de-prueba-no-versionada')
+    init_app(aplicacion, backend='postgres')
+    assert isinstance(aplicacion.session_interface, PostgresSessionInterface)
+    assert aplicacion.session_interface._firmador(aplicacion) is not None
+
+
+@pytest.mark.parametrize('clave', sorted(CLAVES_PUBLICAS))
+def test_sesion_falsificada_con_clave_publica(app, clave):
+    falsa = _app(clave)
+    valor = SecureCookieSessionInterface().get_signing_serializer(falsa).dumps(
+        {'user_id': 1, 'rol': 'administrador'}
+    )
+    cliente = app.test_client()
+    cliente.set_cookie(app.config.get('SESSION_COOKIE_NAME', 'session'), valor)
+    assert cliente.get('/api/health/sql').status_code == 401
@@ -0,0 +1,100 @@
+"""
+/api/solicitudes-pendientes debe hacer el mismo número de consultas sin importar
+cuántas solicitudes trae la página (sin consultas por fila, patrón N+1)
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+from flask import g, session
+
+from utils.metricas_sql import cursor_medido
+
+
+def _solicitud(i):
+    return {
+        'expediente_id': i,
+        'expediente_numero': f'EXP-2025-{i:03d}',
+        'fecha_creacion': datetime(2025, 1, 1) + timedelta(minutes=i),
+        'solicitud_id': i,
+        'solicitud_fecha_creacion': datetime(2025, 1, 1) + timedelta(minutes=i),
+        'folio': f'SOL-2025-{i:05d}',
+        'estado_solicitud': 'pendiente',
+        'firmado_funcionario': False,
+        'sucursal': 'Santiago',
+        'causante_nombre_completo': f'Causante {i}',
+        'causante_rut': '11111111-1',
+        'causante_fecha_defuncion': date(2024, 12, 1),
+        'representante_nombre_completo': f'Representante {i}',
+        'representante_rut': '22222222-2',
+        'representante_calidad': 'Cónyuge',
+        'total_beneficiarios': 2,
+        'beneficiarios_firmados': 1,
+        'total_documentos': 1,
+        'representante_firmado': True,
+    }
+
+
+class _CursorFalso:
+    """Cursor que responde según la tabla consultada, con `total` solicitudes pendientes"""
+
+    def __init__(self, total):
+        self.total = total
+        self.filas = []
+
+    def execute(self, query, vars=None):
+        ids = range(1, self.total + 1)
+        if 'documentos_saldo_insoluto' in query:
+            self.filas = [{
+                'id': i, 'expediente_id': i, 'doc_nombre_archivo': 'a.pdf', 'doc_tipo_id': 1,
+                'doc_tamano_bytes': 1024, 'doc_mime_type': 'application/pdf',
+                'doc_fecha_subida': datetime(2025, 1, 2), 'doc_estado': 'subido',
+                'doc_ruta_storage': f'{i}/a.pdf',
+            } for i in ids]
+        elif 'app.beneficiarios' in query:
+            self.filas = [{
+                'id': i * 10 + j, 'expediente_id': i, 'ben_nombre': f'Beneficiario {j}',
+                'ben_run': '33333333-3', 'ben_parentesco': 'Hijo',
+                'firma_id': 1 if j == 0 else None, 'firma_rut': '33333333-3' if j == 0 else None,
+            } for i in ids for j in range(2)]
+        else:
+            # La consulta principal pide limit + 1 filas (último parámetro)
+            self.filas = [_solicitud(i) for i in ids][:vars[-1]]
+
+    def fetchall(self):
+        return self.filas
+
+    def fetchone(self):
+        return self.filas[0] if self.filas else None
+
+    def close(self):
+        pass
+
+
+class _ConexionFalsa:
+    def __init__(self, total):
+        self.total = total
+
+    def cursor(self, cursor_factory=None):
+        return cursor_medido(_CursorFalso)(self.total)
+
+    def close(self):
+        pass
+
+
+def _consultas_para(app, monkeypatch, total, limit):
+    monkeypatch.setattr('routes.aprobaciones.get_db_connection', lambda: _ConexionFalsa(total))
+    with app.test_request_context(f'/api/solicitudes-pendientes?limit={limit}'):
+        session['user_id'] = 1
+        respuesta, estado = app.view_functions['solicitudes_pendientes']()
+        assert estado == 200
+        datos = respuesta.get_json()
+        assert len(datos['data']) == min(total, limit)
+        assert all(len(s['beneficiarios']) == 2 and len(s['documentos']['lista']) == 1 for s in datos['data'])
+        return g._metricas_sql.consultas
+
+
+@pytest.mark.parametrize('limit', [50, 200])
+def test_numero_de_consultas_no_depende_de_las_filas(app, monkeypatch, limit):
+    una = _consultas_para(app, monkeypatch, 1, limit)
+    muchas = _consultas_para(app, monkeypatch, 300, limit)
+    assert una == muchas == 3
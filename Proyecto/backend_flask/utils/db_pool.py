@@ -0,0 +1,256 @@
+"""
+Pool de conexiones a PostgreSQL
+Reutiliza conexiones abiertas en lugar de hacer el handshake TCP + autenticación
+en cada petición. Configurable desde Config (tamaño, timeout, vida máxima y
+verificación de salud al entregar una conexión).
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """No se pudo obtener una conexión del pool dentro del tiempo configurado"""
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones thread-safe.
+    Las conexiones se entregan con checkout() y se devuelven con checkin().
+    """
+
+    def __init__(self, db_config, minconn=1, maxconn=10, timeout=10.0,
+                 max_lifetime=1800.0, health_check=True):
+        self._db_config = dict(db_config)
+        self.minconn = max(0, int(minconn))
+        self.maxconn = max(1, int(maxconn), self.minconn)
+        self.timeout = float(timeout)
+        self.max_lifetime = float(max_lifetime)
+        self.health_check = bool(health_check)
+
+        self._cond = threading.Condition()
+        self._idle = deque()        # (conn, creada_en)
+        self._creada_en = {}        # id(conn) -> timestamp de creación
+        self._en_uso = 0
+        self._esperando = 0
+        self._cerrado = False
+
+        # Estadísticas acumuladas
+        self._stats = {
+            'creadas': 0,
+            'descartadas': 0,
+            'checkouts': 0,
+            'timeouts': 0,
+            'fallas_health_check': 0,
+            'espera_total_ms': 0.0,
+        }
+
+        for _ in range(self.minconn):
+            try:
+                conn = self._crear_conexion()
+                self._idle.append((conn, self._creada_en[id(conn)]))
+            except Exception as e:
+                logger.warning('No se pudo precargar conexión del pool: %s', e)
+                break
+
+    def _crear_conexion(self):
+        """Abrir una conexión nueva a PostgreSQL"""
+        conn = psycopg2.connect(**self._db_config)
+        with self._cond:
+            self._creada_en[id(conn)] = time.monotonic()
+            self._stats['creadas'] += 1
+        return conn
+
+    def _descartar(self, conn):
+        """Cerrar una conexión y olvidarla (se llama con el lock tomado)"""
+        self._creada_en.pop(id(conn), None)
+        self._stats['descartadas'] += 1
+        try:
+            if not conn.closed:
+                conn.close()
+        except Exception:
+            pass
+
+    def _expirada(self, creada_en):
+        """Verificar si una conexión superó su vida máxima"""
+        return self.max_lifetime > 0 and (time.monotonic() - creada_en) > self.max_lifetime
+
+    def _esta_sana(self, conn):
+        """Verificar que la conexión sigue viva antes de entregarla"""
+        if conn.closed:
+            return False
+        if not self.health_check:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute('SELECT 1')
+            cur.fetchone()
+            cur.close()
+            conn.rollback()
+            return True
+        except Exception:
+            with self._cond:
+                self._stats['fallas_health_check'] += 1
+            return False
+
+    def checkout(self):
+        """Obtener una conexión del pool (bloquea hasta `timeout` segundos si está lleno)"""
+        inicio = time.monotonic()
+        limite = inicio + self.timeout
+
+        while True:
+            conn = None
+            creada_en = None
+
+            # Reservar un cupo con el lock tomado; conectar y verificar fuera de él
+            with self._cond:
+                while True:
+                    if self._cerrado:
+                        raise PoolTimeoutError('El pool de conexiones está cerrado')
+                    if self._idle:
+                        conn, creada_en = self._idle.pop()
+                        self._en_uso += 1
+                        break
+                    if self._en_uso < self.maxconn:
+                        self._en_uso += 1
+                        break
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f'Timeout de {self.timeout}s esperando conexión del pool '
+                            f'({self._en_uso}/{self.maxconn} en uso)'
+                        )
+                    self._esperando += 1
+                    try:
+                        self._cond.wait(restante)
+                    finally:
+                        self._esperando -= 1
+
+            if conn is None:
+                try:
+                    conn = self._crear_conexion()
+                except Exception:
+                    with self._cond:
+                        self._en_uso -= 1
+                        self._cond.notify()
+                    raise
+            elif self._expirada(creada_en) or not self._esta_sana(conn):
+                with self._cond:
+                    self._en_uso -= 1
+                    self._descartar(conn)
+                    self._cond.notify()
+                continue
+
+            with self._cond:
+                self._stats['checkouts'] += 1
+                self._stats['espera_total_ms'] += (time.monotonic() - inicio) * 1000
+            return conn
+
+    def checkin(self, conn):
+        """Devolver una conexión al pool, descartándola si quedó en mal estado"""
+        reutilizable = not conn.closed
+        if reutilizable:
+            try:
+                # No devolver conexiones con transacciones abiertas
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                reutilizable = False
+
+        with self._cond:
+            self._en_uso = max(0, self._en_uso - 1)
+            creada_en = self._creada_en.get(id(conn))
+            if (not reutilizable or self._cerrado or creada_en is None
+                    or self._expirada(creada_en)
+                    or len(self._idle) >= self.maxconn):
+                self._descartar(conn)
+            else:
+                self._idle.append((conn, creada_en))
+            self._cond.notify()
+
+    def close(self):
+        """Cerrar todas las conexiones ociosas y rechazar nuevos checkouts"""
+        with self._cond:
+            self._cerrado = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._descartar(conn)
+            self._cond.notify_all()
+
+    def stats(self):
+        """Estadísticas en vivo del pool"""
+        with self._cond:
+            checkouts = self._stats['checkouts']
+            return {
+                'min': self.minconn,
+                'max': self.maxconn,
+                'en_uso': self._en_uso,
+                'ociosas': len(self._idle),
+                'esperando': self._esperando,
+                'timeout_s': self.timeout,
+                'vida_maxima_s': self.max_lifetime,
+                'health_check': self.health_check,
+                'creadas': self._stats['creadas'],
+                'descartadas': self._stats['descartadas'],
+                'checkouts': checkouts,
+                'timeouts': self._stats['timeouts'],
+                'fallas_health_check': self._stats['fallas_health_check'],
+                'espera_promedio_ms': round(self._stats['espera_total_ms'] / checkouts, 3) if checkouts else 0.0,
+            }
+
+
+class PooledConnection:
+    """
+    Envoltura sobre una conexión del pool.
+    Se comporta como una conexión psycopg2, pero close() la devuelve al pool.
+    Si la conexión pertenece a una petición Flask, close() no hace nada y la
+    devolución ocurre en el teardown de la petición.
+    `envolver_cursor`, si se indica, recibe el cursor_factory pedido y retorna
+    la clase de cursor a usar (p. ej. una que mide las sentencias).
+    """
+
+    def __init__(self, pool, conn, ligada_a_request=False, envolver_cursor=None):
+        self._pool = pool
+        self._conn = conn
+        self._ligada_a_request = ligada_a_request
+        self._envolver_cursor = envolver_cursor
+        self._liberada = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        if self._envolver_cursor is not None:
+            kwargs['cursor_factory'] = self._envolver_cursor(kwargs.get('cursor_factory'))
+        return self._conn.cursor(*args, **kwargs)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._conn.__exit__(exc_type, exc, tb)
+
+    @property
+    def raw(self):
+        """Conexión psycopg2 subyacente"""
+        return self._conn
+
+    def close(self):
+        """Devolver la conexión al pool (diferido al teardown si es de una petición)"""
+        if self._ligada_a_request:
+            return
+        self.release()
+
+    def release(self):
+        """Devolver efectivamente la conexión al pool"""
+        if self._liberada:
+            return
+        self._liberada = True
+        self._pool.checkin(self._conn)
@@ -2,15 +2,81 @@
 Servicio para cargar y buscar datos en archivos Excel
 Implementado como clase singleton para mejor encapsulación y gestión de estado
 """
+import hashlib
+import json
+import logging
 import os
+import threading
+import time
+from datetime import datetime
 import pandas as pd
-from utils.helpers import formatear_rut
+from utils.helpers import formatear_rut, normalizar_rut as _normalizar_rut
+
+# pyarrow es opcional: permite snapshots Feather con memory-map; sin él se usa pickle
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Subir este número si cambia el procesamiento (_procesar_*) para invalidar snapshots
+_SNAPSHOT_VERSION = 2
+
+
+class _DatosExcel:
+    """
+    Conjunto inmutable de datos cargados desde los Excel.
+    Incluye los DataFrames procesados y los índices hash por RUT normalizado,
+    construidos una sola vez al cargar. Se reemplaza completo al recargar.
+    """
+    __slots__ = ('df_representantes', 'df_causantes', 'df_beneficiarios',
+                 'idx_representantes', 'idx_causantes',
+                 'idx_beneficiarios_por_causante', 'idx_beneficiarios')
+
+    def __init__(self, df_representantes, df_causantes, df_beneficiarios):
+        self.df_representantes = df_representantes
+        self.df_causantes = df_causantes
+        self.df_beneficiarios = df_beneficiarios
+
+        # RUT representante -> datos formateados
+        self.idx_representantes = {}
+        if 'rut_normalizado' in df_representantes.columns:
+            for row in df_representantes.to_dict('records'):
+                self.idx_representantes.setdefault(row['rut_normalizado'], ExcelService._datos_representante(row))
+
+        # RUT causante -> datos formateados
+        self.idx_causantes = {}
+        if 'rut_normalizado' in df_causantes.columns:
+            for row in df_causantes.to_dict('records'):
+                self.idx_causantes.setdefault(row['rut_normalizado'], ExcelService._datos_causante(row))
+
+        # RUT causante -> lista de beneficiarios; RUT beneficiario -> nombre
+        self.idx_beneficiarios_por_causante = {}
+        self.idx_beneficiarios = {}
+        tiene_causante = 'rut_causante_normalizado' in df_beneficiarios.columns
+        tiene_beneficiario = 'rut_beneficiario_normalizado' in df_beneficiarios.columns
+        if tiene_causante or tiene_beneficiario:
+            for row in df_beneficiarios.to_dict('records'):
+                if tiene_causante:
+                    self.idx_beneficiarios_por_causante.setdefault(
+                        row['rut_causante_normalizado'], []
+                    ).append(ExcelService._datos_beneficiario(row))
+                if tiene_beneficiario and row['rut_beneficiario_normalizado'] not in self.idx_beneficiarios:
+                    nombre = row.get('nombre_completo', '')
+                    self.idx_beneficiarios[row['rut_beneficiario_normalizado']] = (
+                        {'nombre': str(nombre).strip()} if pd.notna(nombre) and nombre != '' else None
+                    )
 
 
 class ExcelService:
     """
     Servicio singleton para gestionar la carga y búsqueda de datos en archivos Excel.
-    Mantiene los DataFrames en memoria para búsquedas rápidas.
+    Mantiene los DataFrames en memoria e índices hash por RUT para búsquedas O(1).
+    La carga puede hacerse en segundo plano; los datos nuevos se arman aparte y se
+    publican con una sola asignación, por lo que las búsquedas nunca se bloquean
+    ni ven datos a medio procesar.
     """
     _instance = None
     _initialized = False
@@ -24,28 +90,60 @@ class ExcelService:
     def __init__(self):
         """Inicializar el servicio (solo una vez)"""
         if not self._initialized:
-            self._df_representantes = None
-            self._df_causantes = None
-            self._df_beneficiarios = None
-            self._excel_loaded = False
+            self._datos = None
+            self._lock_carga = threading.Lock()     # serializa las cargas
+            self._lock_hilos = threading.Lock()     # protege el arranque de hilos
+            self._hilo_carga = None
+            self._hilo_vigilancia = None
+            self._estado = 'sin_cargar'
+            self._ultimo_error = None
+            self._cargado_en = None
+            self._duracion_ms = None
+            self._firma_archivos = None
             self._base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             self._datos_dir = os.path.join(self._base_dir, 'datos_prueba')
+            self._cache_dir = os.path.join(self._datos_dir, '.cache')
             ExcelService._initialized = True
     
     @staticmethod
     def normalizar_rut(rut):
-        """Normalizar RUT removiendo puntos y guiones, y convirtiendo a mayúsculas"""
-        if not rut:
-            return ''
-        return str(rut).replace('.', '').replace('-', '').upper().strip()
+        """Normalizar RUT a su forma canónica (la misma de utils.helpers y de la base de datos)"""
+        return _normalizar_rut(rut)
+    
+    def _rutas_excel(self):
+        """Rutas de los archivos Excel (representantes, causantes, beneficiarios)"""
+        return (os.path.join(self._datos_dir, 'representantes.xlsx'),
+                os.path.join(self._datos_dir, 'causantes.xlsx'),
+                os.path.join(self._datos_dir, 'beneficiarios.xlsx'))
+    
+    def _firma_actual(self):
+        """Tamaño y mtime de los Excel, para detectar cambios"""
+        firma = []
+        for path in self._rutas_excel():
+            try:
+                stat = os.stat(path)
+                firma.append((stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                firma.append(None)
+        return tuple(firma)
     
     def cargar_excel(self):
-        """Cargar los archivos Excel en memoria"""
+        """
+        Cargar los archivos Excel y construir los índices por RUT.
+        Los datos anteriores siguen disponibles hasta que los nuevos estén listos.
+        """
+        with self._lock_carga:
+            return self._cargar_excel()
+    
+    def _cargar_excel(self):
+        """Carga efectiva (se llama con _lock_carga tomado)"""
+        self._estado = 'cargando' if self._datos is None else 'recargando'
+        inicio = time.monotonic()
         try:
             # Rutas de los archivos Excel
-            rep_path = os.path.join(self._datos_dir, 'representantes.xlsx')
-            caus_path = os.path.join(self._datos_dir, 'causantes.xlsx')
-            ben_path = os.path.join(self._datos_dir, 'beneficiarios.xlsx')
+            rep_path, caus_path, ben_path = self._rutas_excel()
+            # Registrar la versión intentada para que el vigilante no reintente sin cambios
+            self._firma_archivos = self._firma_actual()
             
             # Verificar que los archivos existan
             archivos_faltantes = []
@@ -58,42 +156,142 @@ class ExcelService:
             
             if archivos_faltantes:
                 for archivo in archivos_faltantes:
-                    print(f'⚠️ Archivo no encontrado: {archivo}')
+                    logger.warning('Archivo no encontrado: %s', archivo)
+                self._ultimo_error = 'Archivos no encontrados: ' + ', '.join(os.path.basename(a) for a in archivos_faltantes)
+                self._estado = 'listo' if self._datos is not None else 'error'
                 return False
             
-            # Cargar Excel
-            self._df_representantes = pd.read_excel(rep_path, engine='openpyxl')
-            self._df_causantes = pd.read_excel(caus_path, engine='openpyxl')
-            self._df_beneficiarios = pd.read_excel(ben_path, engine='openpyxl')
-            
-            # Procesar representantes
-            self._procesar_representantes()
+            # Cargar y procesar Excel (desde el snapshot si el archivo no cambió)
+            df_representantes = self._cargar_con_snapshot(rep_path, self._procesar_representantes)
+            df_causantes = self._cargar_con_snapshot(caus_path, self._procesar_causantes)
+            df_beneficiarios = self._cargar_con_snapshot(ben_path, self._procesar_beneficiarios)
             
-            # Procesar causantes
-            self._procesar_causantes()
-            
-            # Procesar beneficiarios
-            self._procesar_beneficiarios()
-            
-            self._excel_loaded = True
-            print(f'✅ Excel cargados exitosamente')
-            print(f'   - Representantes: {len(self._df_representantes)} registros')
-            print(f'   - Causantes: {len(self._df_causantes)} registros')
-            print(f'   - Beneficiarios: {len(self._df_beneficiarios)} registros')
+            # Construir índices aparte y publicarlos con una sola asignación
+            datos = _DatosExcel(df_representantes, df_causantes, df_beneficiarios)
+            self._datos = datos
+            self._cargado_en = datetime.now()
+            self._duracion_ms = round((time.monotonic() - inicio) * 1000, 1)
+            self._ultimo_error = None
+            self._estado = 'listo'
+            logger.info(
+                'Excel cargados exitosamente: %s representantes, %s causantes, %s beneficiarios (%s ms)',
+                len(df_representantes), len(df_causantes), len(df_beneficiarios), self._duracion_ms
+            )
             return True
             
         except Exception as e:
-            print(f'❌ Error cargando Excel: {str(e)}')
-            self._excel_loaded = False
+            logger.exception('Error cargando Excel: %s', str(e))
+            self._ultimo_error = str(e)
+            # Si había datos anteriores se siguen usando
+            self._estado = 'listo' if self._datos is not None else 'error'
             return False
     
-    def _procesar_representantes(self):
+    @staticmethod
+    def _sha256_archivo(path):
+        """Calcular el hash SHA-256 de un archivo"""
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(bloque)
+        return h.hexdigest()
+    
+    def _rutas_snapshot(self, path):
+        """Rutas del manifiesto y del snapshot asociados a un Excel"""
+        nombre = os.path.splitext(os.path.basename(path))[0]
+        return (os.path.join(self._cache_dir, f'{nombre}.json'),
+                os.path.join(self._cache_dir, nombre))
+    
+    def _leer_snapshot(self, path):
+        """
+        Leer el snapshot de un Excel si sigue vigente, o None.
+        Primero compara tamaño y mtime; si solo cambió el mtime, confirma con el hash.
+        """
+        manifest_path, base_snapshot = self._rutas_snapshot(path)
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        
+        if manifest.get('version') != _SNAPSHOT_VERSION:
+            return None
+        
+        stat = os.stat(path)
+        if manifest.get('size') != stat.st_size:
+            return None
+        if manifest.get('mtime_ns') != stat.st_mtime_ns:
+            if manifest.get('sha256') != self._sha256_archivo(path):
+                return None
+            # Mismo contenido con otro mtime (p. ej. copiado): actualizar manifiesto
+            manifest['mtime_ns'] = stat.st_mtime_ns
+            self._escribir_json(manifest_path, manifest)
+        
+        formato = manifest.get('formato')
+        try:
+            if formato == 'feather' and PYARROW_AVAILABLE:
+                return pd.read_feather(base_snapshot + '.feather', memory_map=True)
+            if formato == 'pickle':
+                return pd.read_pickle(base_snapshot + '.pkl')
+        except Exception as e:
+            logger.warning('Snapshot inválido para %s: %s', os.path.basename(path), e)
+        return None
+    
+    @staticmethod
+    def _escribir_json(path, datos):
+        """Escribir un JSON de forma atómica"""
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(datos, f)
+        os.replace(tmp, path)
+    
+    def _guardar_snapshot(self, path, df):
+        """Guardar el DataFrame procesado junto a su manifiesto (tamaño, mtime y hash)"""
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            manifest_path, base_snapshot = self._rutas_snapshot(path)
+            stat = os.stat(path)
+            
+            formato = None
+            if PYARROW_AVAILABLE:
+                try:
+                    df.reset_index(drop=True).to_feather(base_snapshot + '.feather.tmp')
+                    os.replace(base_snapshot + '.feather.tmp', base_snapshot + '.feather')
+                    formato = 'feather'
+                except Exception:
+                    # Columnas con tipos mixtos no siempre se pueden serializar en Arrow
+                    formato = None
+            if formato is None:
+                df.to_pickle(base_snapshot + '.pkl.tmp')
+                os.replace(base_snapshot + '.pkl.tmp', base_snapshot + '.pkl')
+                formato = 'pickle'
+            
+            self._escribir_json(manifest_path, {
+                'version': _SNAPSHOT_VERSION,
+                'formato': formato,
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'sha256': self._sha256_archivo(path)
+            })
+        except Exception as e:
+            logger.warning('No se pudo guardar snapshot de %s: %s', os.path.basename(path), e)
+    
+    def _cargar_con_snapshot(self, path, procesar):
+        """Obtener el DataFrame procesado de un Excel, usando el snapshot si está vigente"""
+        df = self._leer_snapshot(path)
+        if df is not None:
+            return df
+        
+        df = procesar(pd.read_excel(path, engine='openpyxl'))
+        self._guardar_snapshot(path, df)
+        return df
+    
+    def _procesar_representantes(self, df):
         """Procesar y normalizar datos de representantes"""
-        col_rut_rep = 'RUT Representante' if 'RUT Representante' in self._df_representantes.columns else 'rut'
+        col_rut_rep = 'RUT Representante' if 'RUT Representante' in df.columns else 'rut'
         
-        if col_rut_rep in self._df_representantes.columns:
-            self._df_representantes['rut_normalizado'] = self._df_representantes[col_rut_rep].apply(self.normalizar_rut)
-            self._df_representantes = self._df_representantes.rename(columns={col_rut_rep: 'rut'})
+        if col_rut_rep in df.columns:
+            df['rut_normalizado'] = df[col_rut_rep].apply(self.normalizar_rut)
+            df = df.rename(columns={col_rut_rep: 'rut'})
         
         rename_rep = {
             'Nombres': 'nombre',
@@ -106,16 +304,17 @@ class ExcelService:
             'Email': 'email'
         }
         for old, new in rename_rep.items():
-            if old in self._df_representantes.columns:
-                self._df_representantes = self._df_representantes.rename(columns={old: new})
+            if old in df.columns:
+                df = df.rename(columns={old: new})
+        return df
     
-    def _procesar_causantes(self):
+    def _procesar_causantes(self, df):
         """Procesar y normalizar datos de causantes"""
-        col_rut_caus = 'RUT Causante' if 'RUT Causante' in self._df_causantes.columns else 'rut'
+        col_rut_caus = 'RUT Causante' if 'RUT Causante' in df.columns else 'rut'
         
-        if col_rut_caus in self._df_causantes.columns:
-            self._df_causantes['rut_normalizado'] = self._df_causantes[col_rut_caus].apply(self.normalizar_rut)
-            self._df_causantes = self._df_causantes.rename(columns={col_rut_caus: 'rut'})
+        if col_rut_caus in df.columns:
+            df['rut_normalizado'] = df[col_rut_caus].apply(self.normalizar_rut)
+            df = df.rename(columns={col_rut_caus: 'rut'})
         
         rename_caus = {
             'Nombres': 'nombre',
@@ -126,34 +325,35 @@ class ExcelService:
             'Fecha Defunción': 'fecha_defuncion'
         }
         for old, new in rename_caus.items():
-            if old in self._df_causantes.columns:
-                self._df_causantes = self._df_causantes.rename(columns={old: new})
+            if old in df.columns:
+                df = df.rename(columns={old: new})
+        return df
     
-    def _procesar_beneficiarios(self):
+    def _procesar_beneficiarios(self, df):
         """Procesar y normalizar datos de beneficiarios"""
         # Buscar columna de RUT causante
         col_rut_caus_ben = None
-        for col in self._df_beneficiarios.columns:
+        for col in df.columns:
             if 'causante' in col.lower() and 'rut' in col.lower():
                 col_rut_caus_ben = col
                 break
         
         if col_rut_caus_ben:
-            self._df_beneficiarios['rut_causante_normalizado'] = self._df_beneficiarios[col_rut_caus_ben].apply(self.normalizar_rut)
-            self._df_beneficiarios = self._df_beneficiarios.rename(columns={col_rut_caus_ben: 'rut_causante'})
+            df['rut_causante_normalizado'] = df[col_rut_caus_ben].apply(self.normalizar_rut)
+            df = df.rename(columns={col_rut_caus_ben: 'rut_causante'})
         
         # Buscar y normalizar columna de RUT beneficiario
         col_rut_ben = None
-        for col in self._df_beneficiarios.columns:
+        for col in df.columns:
             col_lower = col.lower()
             if ('beneficiario' in col_lower and 'rut' in col_lower) or col_lower in ['rut_beneficiario', 'run', 'rut beneficiario']:
                 col_rut_ben = col
                 break
         
         if col_rut_ben:
-            self._df_beneficiarios['rut_beneficiario_normalizado'] = self._df_beneficiarios[col_rut_ben].apply(self.normalizar_rut)
+            df['rut_beneficiario_normalizado'] = df[col_rut_ben].apply(self.normalizar_rut)
             if col_rut_ben != 'rut_beneficiario':
-                self._df_beneficiarios = self._df_beneficiarios.rename(columns={col_rut_ben: 'rut_beneficiario'})
+                df = df.rename(columns={col_rut_ben: 'rut_beneficiario'})
         
         rename_ben = {
             'Nombre completo': 'nombre_completo',
@@ -161,68 +361,35 @@ class ExcelService:
             'Parentesco': 'parentesco',
         }
         for old, new in rename_ben.items():
-            if old in self._df_beneficiarios.columns:
-                self._df_beneficiarios = self._df_beneficiarios.rename(columns={old: new})
+            if old in df.columns:
+                df = df.rename(columns={old: new})
+        return df
     
-    def recargar_excel(self):
-        """Recargar los archivos Excel (útil después de actualizarlos)"""
-        self._excel_loaded = False
-        return self.cargar_excel()
+    @staticmethod
+    def _texto(row, campo):
+        """Valor de texto limpio de una fila ('' si falta o es nulo)"""
+        valor = row.get(campo)
+        return str(valor).strip() if pd.notna(valor) else ''
     
-    def buscar_representante(self, rut):
-        """Buscar representante por RUT"""
-        if not self._excel_loaded:
-            if not self.cargar_excel():
-                return None
-        
-        if self._df_representantes is None or self._df_representantes.empty:
-            return None
-        
-        if 'rut_normalizado' not in self._df_representantes.columns:
-            return None
-        
-        rut_norm = self.normalizar_rut(rut)
-        resultado = self._df_representantes[self._df_representantes['rut_normalizado'] == rut_norm]
-        
-        if resultado.empty:
-            return None
-        
-        row = resultado.iloc[0]
-        datos = {
+    @staticmethod
+    def _datos_representante(row):
+        """Armar la respuesta de un representante a partir de una fila"""
+        return {
             'rut': formatear_rut(str(row.get('rut', ''))),
-            'calidad': str(row.get('calidad', '')).strip() if pd.notna(row.get('calidad')) else '',
-            'nombre': str(row.get('nombre', '')).strip() if pd.notna(row.get('nombre')) else '',
-            'apellido_paterno': str(row.get('apellido_paterno', '')).strip() if pd.notna(row.get('apellido_paterno')) else '',
-            'apellido_materno': str(row.get('apellido_materno', '')).strip() if pd.notna(row.get('apellido_materno')) else '',
-            'telefono': str(row.get('telefono', '')).strip() if pd.notna(row.get('telefono')) else '',
-            'direccion': str(row.get('direccion', '')).strip() if pd.notna(row.get('direccion')) else '',
-            'comuna': str(row.get('comuna', '')).strip() if pd.notna(row.get('comuna')) else '',
-            'region': str(row.get('region', '')).strip() if pd.notna(row.get('region')) else '',
-            'email': str(row.get('email', '')).strip() if pd.notna(row.get('email')) else ''
+            'calidad': ExcelService._texto(row, 'calidad'),
+            'nombre': ExcelService._texto(row, 'nombre'),
+            'apellido_paterno': ExcelService._texto(row, 'apellido_paterno'),
+            'apellido_materno': ExcelService._texto(row, 'apellido_materno'),
+            'telefono': ExcelService._texto(row, 'telefono'),
+            'direccion': ExcelService._texto(row, 'direccion'),
+            'comuna': ExcelService._texto(row, 'comuna'),
+            'region': ExcelService._texto(row, 'region'),
+            'email': ExcelService._texto(row, 'email')
         }
-        
-        return datos
     
-    def buscar_causante(self, rut):
-        """Buscar causante por RUT"""
-        if not self._excel_loaded:
-            if not self.cargar_excel():
-                return None
-        
-        if self._df_causantes is None or self._df_causantes.empty:
-            return None
-        
-        if 'rut_normalizado' not in self._df_causantes.columns:
-            return None
-        
-        rut_norm = self.normalizar_rut(rut)
-        resultado = self._df_causantes[self._df_causantes['rut_normalizado'] == rut_norm]
-        
-        if resultado.empty:
-            return None
-        
-        row = resultado.iloc[0]
-        
+    @staticmethod
+    def _datos_causante(row):
+        """Armar la respuesta de un causante a partir de una fila"""
         # Formatear fecha si existe
         fecha_def = row.get('fecha_defuncion', '')
         if pd.notna(fecha_def) and fecha_def != '':
@@ -233,75 +400,131 @@ class ExcelService:
         else:
             fecha_def = ''
         
-        datos = {
+        return {
             'rut': formatear_rut(str(row.get('rut', ''))),
-            'nacionalidad': str(row.get('nacionalidad', '')).strip() if pd.notna(row.get('nacionalidad')) else '',
-            'nombre': str(row.get('nombre', '')).strip() if pd.notna(row.get('nombre')) else '',
-            'apellido_paterno': str(row.get('apellido_paterno', '')).strip() if pd.notna(row.get('apellido_paterno')) else '',
-            'apellido_materno': str(row.get('apellido_materno', '')).strip() if pd.notna(row.get('apellido_materno')) else '',
+            'nacionalidad': ExcelService._texto(row, 'nacionalidad'),
+            'nombre': ExcelService._texto(row, 'nombre'),
+            'apellido_paterno': ExcelService._texto(row, 'apellido_paterno'),
+            'apellido_materno': ExcelService._texto(row, 'apellido_materno'),
             'fecha_defuncion': fecha_def,
-            'comuna_defuncion': str(row.get('comuna_defuncion', '')).strip() if pd.notna(row.get('comuna_defuncion')) else ''
+            'comuna_defuncion': ExcelService._texto(row, 'comuna_defuncion')
         }
-        
+    
+    @staticmethod
+    def _datos_beneficiario(row):
+        """Armar la respuesta de un beneficiario a partir de una fila"""
+        rut = row.get('rut_beneficiario')
+        return {
+            'rut_beneficiario': formatear_rut(str(rut)) if pd.notna(rut) else '',
+            'nombre_completo': ExcelService._texto(row, 'nombre_completo'),
+            'parentesco': ExcelService._texto(row, 'parentesco'),
+        }
+    
+    def recargar_excel(self):
+        """Recargar los archivos Excel (útil después de actualizarlos)"""
+        return self.cargar_excel()
+    
+    def iniciar_carga_en_segundo_plano(self):
+        """Cargar los Excel en un hilo aparte sin bloquear el arranque del servidor"""
+        with self._lock_hilos:
+            if self._hilo_carga is not None and self._hilo_carga.is_alive():
+                return self._hilo_carga
+            if self._datos is None:
+                self._estado = 'cargando'
+            self._hilo_carga = threading.Thread(
+                target=self.cargar_excel, name='excel-carga', daemon=True
+            )
+            self._hilo_carga.start()
+            return self._hilo_carga
+    
+    def _vigilar(self, intervalo):
+        """Revisar periódicamente si los Excel cambiaron y recargarlos"""
+        while True:
+            time.sleep(intervalo)
+            try:
+                if self._firma_archivos is not None and self._firma_actual() != self._firma_archivos:
+                    logger.info('Cambios detectados en los Excel, recargando...')
+                    self.cargar_excel()
+            except Exception as e:
+                logger.warning('Error vigilando los Excel: %s', e)
+    
+    def iniciar_vigilancia(self, intervalo=5):
+        """Iniciar el hilo que recarga los Excel cuando cambian en disco"""
+        if intervalo <= 0:
+            return None
+        with self._lock_hilos:
+            if self._hilo_vigilancia is None or not self._hilo_vigilancia.is_alive():
+                self._hilo_vigilancia = threading.Thread(
+                    target=self._vigilar, args=(intervalo,), name='excel-vigilancia', daemon=True
+                )
+                self._hilo_vigilancia.start()
+            return self._hilo_vigilancia
+    
+    def _obtener_datos(self):
+        """
+        Datos publicados actualmente, sin bloquear.
+        Si todavía no se han cargado, inicia la carga en segundo plano y retorna None.
+        """
+        datos = self._datos
+        if datos is None and self._estado == 'sin_cargar' and not self._lock_carga.locked():
+            self.iniciar_carga_en_segundo_plano()
         return datos
     
-    def buscar_beneficiarios(self, rut_causante):
-        """Buscar beneficiarios por RUT del causante"""
-        if not self._excel_loaded:
-            if not self.cargar_excel():
-                return []
-        
-        if self._df_beneficiarios is None or self._df_beneficiarios.empty:
-            return []
-        
-        if 'rut_causante_normalizado' not in self._df_beneficiarios.columns:
-            return []
+    def buscar_representante(self, rut):
+        """Buscar representante por RUT"""
+        datos = self._obtener_datos()
+        if datos is None:
+            return None
         
-        rut_norm = self.normalizar_rut(rut_causante)
-        resultado = self._df_beneficiarios[self._df_beneficiarios['rut_causante_normalizado'] == rut_norm]
+        resultado = datos.idx_representantes.get(self.normalizar_rut(rut))
+        return dict(resultado) if resultado else None
+    
+    def buscar_causante(self, rut):
+        """Buscar causante por RUT"""
+        datos = self._obtener_datos()
+        if datos is None:
+            return None
         
-        if resultado.empty:
+        resultado = datos.idx_causantes.get(self.normalizar_rut(rut))
+        return dict(resultado) if resultado else None
+    
+    def buscar_beneficiarios(self, rut_causante):
+        """Buscar beneficiarios por RUT del causante"""
+        datos = self._obtener_datos()
+        if datos is None:
             return []
         
-        beneficiarios = []
-        for _, row in resultado.iterrows():
-            ben = {
-                'rut_beneficiario': formatear_rut(str(row.get('rut_beneficiario', ''))) if pd.notna(row.get('rut_beneficiario')) else '',
-                'nombre_completo': str(row.get('nombre_completo', '')).strip() if pd.notna(row.get('nombre_completo')) else '',
-                'parentesco': str(row.get('parentesco', '')).strip() if pd.notna(row.get('parentesco')) else '',
-            }
-            beneficiarios.append(ben)
-        
-        return beneficiarios
+        resultado = datos.idx_beneficiarios_por_causante.get(self.normalizar_rut(rut_causante), [])
+        return [dict(ben) for ben in resultado]
     
     def buscar_beneficiario_por_rut(self, rut_beneficiario):
         """Buscar un beneficiario individual por su RUT y retornar solo el nombre"""
-        if not self._excel_loaded:
-            if not self.cargar_excel():
-                return None
-        
-        if self._df_beneficiarios is None or self._df_beneficiarios.empty:
-            return None
-        
-        if 'rut_beneficiario_normalizado' not in self._df_beneficiarios.columns:
-            return None
-        
-        rut_norm = self.normalizar_rut(rut_beneficiario)
-        resultado = self._df_beneficiarios[self._df_beneficiarios['rut_beneficiario_normalizado'] == rut_norm]
-        
-        if resultado.empty:
+        datos = self._obtener_datos()
+        if datos is None:
             return None
         
-        row = resultado.iloc[0]
-        nombre = row.get('nombre_completo', '')
-        if pd.notna(nombre) and nombre != '':
-            return {'nombre': str(nombre).strip()}
-        
-        return None
+        resultado = datos.idx_beneficiarios.get(self.normalizar_rut(rut_beneficiario))
+        return dict(resultado) if resultado else None
     
     def esta_cargado(self):
         """Verificar si los Excel están cargados"""
-        return self._excel_loaded
+        return self._datos is not None
+    
+    def estado_carga(self):
+        """Estado de la carga de los Excel para el endpoint de status"""
+        datos = self._datos
+        return {
+            'cargado': datos is not None,
+            'estado': self._estado,
+            'error': self._ultimo_error,
+            'cargado_en': self._cargado_en.isoformat() if self._cargado_en else None,
+            'duracion_ms': self._duracion_ms,
+            'registros': {
+                'representantes': len(datos.df_representantes),
+                'causantes': len(datos.df_causantes),
+                'beneficiarios': len(datos.df_beneficiarios)
+            } if datos is not None else None
+        }
 
 
 # Instancia singleton global para mantener compatibilidad con código existente
@@ -339,3 +562,15 @@ def buscar_beneficiario_por_rut(rut_beneficiario):
 def esta_cargado():
     """Verificar si está cargado - función de compatibilidad"""
     return _excel_service.esta_cargado()
+
+def estado_carga():
+    """Estado detallado de la carga de Excel"""
+    return _excel_service.estado_carga()
+
+def iniciar_carga_en_segundo_plano():
+    """Cargar Excel en segundo plano"""
+    return _excel_service.iniciar_carga_en_segundo_plano()
+
+def iniciar_vigilancia(intervalo=5):
+    """Recargar Excel automáticamente cuando cambian en disco"""
+    return _excel_service.iniciar_vigilancia(intervalo)
@@ -1,14 +1,24 @@
 """
 Funciones auxiliares y de ayuda
 """
+import logging
+import re
 import hashlib
 import bcrypt
 from werkzeug.utils import secure_filename
 
+logger = logging.getLogger(__name__)
+
 # Configuración para archivos
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'gif', 'doc', 'docx', 'xls', 'xlsx'}
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB máximo
 
+# Forma canónica de un RUT: cuerpo numérico + dígito verificador, sin puntos ni guion.
+# Solo se quitan puntos, guiones y espacios; cualquier otro carácter lo invalida.
+# Misma regla que app.rut_numero / app.rut_dv (migración 0014_rut_separadores.sql).
+_RUT_SEPARADORES = re.compile(r'[.\s-]')
+_RUT_CANONICO = re.compile(r'([0-9]{1,9})([0-9K])')
+
 def allowed_file(filename):
     """Verificar si el archivo tiene una extensión permitida"""
     return '.' in filename and \
@@ -34,27 +44,51 @@ def get_mime_type(filename):
     ext = filename.rsplit('.', 1)[1].lower()
     return mime_types.get(ext, 'application/octet-stream')
 
+def rut_a_clave(rut):
+    """
+    Separar un RUT en (número, dígito verificador) desde cualquier formato
+    ("12.345.678-k", "12345678K", " 12345678-K "). Retorna None si no tiene forma de RUT
+    (p. ej. letras o dígitos no ASCII). El número es el que guardan las columnas
+    *_num de la base de datos.
+    """
+    if rut is None:
+        return None
+    coincidencia = _RUT_CANONICO.fullmatch(_RUT_SEPARADORES.sub('', str(rut).upper()))
+    if not coincidencia:
+        return None
+    return int(coincidencia.group(1)), coincidencia.group(2)
+
+def normalizar_rut(rut):
+    """
+    Normalizar RUT a su forma canónica (ej: 12345678K).
+    Si no tiene forma de RUT, retorna el texto limpio (sin puntos, guiones ni espacios).
+    """
+    if not rut:
+        return ''
+    clave = rut_a_clave(rut)
+    if clave is None:
+        return _RUT_SEPARADORES.sub('', str(rut).upper())
+    return f"{clave[0]}{clave[1]}"
+
 def validar_rut_chileno(rut):
     """Validar RUT chileno con algoritmo de dígito verificador"""
     try:
-        print(f"🔍 Validando RUT: '{rut}'")
+        logger.debug("Validando RUT: '%s'", rut)
         
-        # Limpiar RUT
-        rut_limpio = rut.replace('.', '').replace('-', '').upper()
-        print(f"🔍 RUT limpio: '{rut_limpio}'")
+        # Separar número y dígito verificador (solo dígitos ASCII y K)
+        clave = rut_a_clave(rut)
+        if clave is None:
+            logger.debug("RUT con caracteres no válidos: '%s'", rut)
+            return False
         
+        rut_limpio = normalizar_rut(rut)
         if len(rut_limpio) < 8 or len(rut_limpio) > 9:
-            print(f"❌ RUT muy corto/largo: {len(rut_limpio)} caracteres")
+            logger.debug("RUT muy corto/largo: %s caracteres", len(rut_limpio))
             return False
         
-        # Separar número y dígito verificador
-        numero = rut_limpio[:-1]
-        dv = rut_limpio[-1]
-        print(f"🔍 Número: '{numero}', DV: '{dv}'")
-        
-        # Validar que el número sea solo dígitos
-        if not numero.isdigit():
-            return False
+        numero = str(clave[0])
+        dv = clave[1]
+        logger.debug("Número: '%s', DV: '%s'", numero, dv)
         
         # Calcular dígito verificador
         suma = 0
@@ -74,9 +108,9 @@ def validar_rut_chileno(rut):
         else:
             dv_calculado = str(dv_calculado)
         
-        print(f"🔍 DV ingresado: '{dv}', DV calculado: '{dv_calculado}'")
+        logger.debug("DV ingresado: '%s', DV calculado: '%s'", dv, dv_calculado)
         resultado = dv == dv_calculado
-        print(f"🔍 Resultado validación: {resultado}")
+        logger.debug("Resultado validación: %s", resultado)
         
         return resultado
         
@@ -94,7 +128,7 @@ def formatear_rut(rut):
         return ''
     
     # Limpiar RUT
-    rut_limpio = rut.replace('.', '').replace('-', '').upper()
+    rut_limpio = normalizar_rut(rut)
     
     if len(rut_limpio) < 8:
         return rut  # Retornar original si es muy corto
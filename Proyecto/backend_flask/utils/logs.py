@@ -0,0 +1,195 @@
+"""
+Registro (logging) de la aplicación
+Cada módulo usa logging.getLogger(__name__). configurar_logging() instala en el
+logger raíz un QueueHandler: quien registra solo encola el registro y un hilo
+(QueueListener) lo formatea y lo escribe, así una petición nunca espera por stdout.
+
+Variables (config.env):
+- LOG_LEVEL: nivel general (INFO por defecto)
+- LOG_LEVELS: niveles por módulo, p. ej. "routes.documentos=DEBUG,utils.db_pool=WARNING"
+- LOG_FORMAT: 'json' (una línea JSON por registro) o 'texto'
+- LOG_DEBUG_SAMPLE: fracción de los registros DEBUG que se escriben (1 = todos)
+- LOG_QUEUE_SIZE: registros en espera; con la cola llena se descartan y se cuentan
+
+Dentro de una petición cada registro lleva su request_id (cabecera X-Request-ID
+o uno generado), que también se devuelve en la respuesta.
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import re
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context, request
+
+from config import Config
+
+_config = Config()
+
+FORMATOS_LOG = ('json', 'texto')
+CABECERA_REQUEST_ID = 'X-Request-ID'
+_REQUEST_ID_VALIDO = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# Atributos propios de LogRecord; el resto (extra=...) va como campos del JSON
+_ATRIBUTOS_REGISTRO = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'request_id'}
+
+
+class _FiltroContexto(logging.Filter):
+    """Agrega el request_id y descarta una parte de los DEBUG (en el hilo que registra)"""
+
+    def __init__(self, muestra_debug):
+        super().__init__()
+        self.muestra_debug = muestra_debug
+
+    def filter(self, record):
+        if record.levelno <= logging.DEBUG and self.muestra_debug < 1 and random.random() >= self.muestra_debug:
+            return False
+        record.request_id = g.get('request_id') if has_request_context() else None
+        return True
+
+
+class _ColaNoBloqueante(QueueHandler):
+    """QueueHandler que nunca espera: si la cola está llena, el registro se descarta"""
+
+    def __init__(self, cola):
+        super().__init__(cola)
+        self.descartados = 0
+
+    def prepare(self, record):
+        # Resolver aquí el mensaje y la traza (los argumentos pueden cambiar
+        # después); el formato final lo hace el hilo del listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por registro"""
+
+    def format(self, record):
+        datos = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'modulo': record.name,
+            'mensaje': record.getMessage(),
+        }
+        if getattr(record, 'request_id', None):
+            datos['request_id'] = record.request_id
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_REGISTRO:
+                datos[clave] = valor
+        if record.exc_text:
+            datos['traza'] = record.exc_text
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class FormatoTexto(logging.Formatter):
+    """Formato legible para la consola y los comandos python -m utils.x"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s%(contexto)s: %(message)s')
+
+    def format(self, record):
+        record.contexto = f" [{record.request_id}]" if getattr(record, 'request_id', None) else ''
+        return super().format(record)
+
+
+def _leer_niveles(texto):
+    """Interpretar LOG_LEVELS ("modulo=NIVEL,otro=NIVEL") como {modulo: nivel}"""
+    niveles = {}
+    for parte in (texto or '').split(','):
+        if not parte.strip():
+            continue
+        modulo, _, nivel = parte.partition('=')
+        valor = logging.getLevelName(nivel.strip().upper())
+        if not modulo.strip() or not isinstance(valor, int):
+            raise ValueError(f"LOG_LEVELS inválido: '{parte.strip()}' (formato: modulo=NIVEL)")
+        niveles[modulo.strip()] = valor
+    return niveles
+
+
+_handler = None
+_listener = None
+_lock = threading.Lock()
+
+
+def configurar_logging(formato=None, nivel=None):
+    """
+    Instalar el logging en cola (idempotente). `formato` y `nivel` reemplazan a
+    LOG_FORMAT y LOG_LEVEL, p. ej. formato='texto' en los comandos de consola.
+    """
+    global _handler, _listener
+    with _lock:
+        if _handler is not None:
+            return _handler
+
+        formato = (formato or _config.LOG_FORMAT).lower()
+        if formato not in FORMATOS_LOG:
+            raise ValueError(f"LOG_FORMAT inválido: '{formato}' (opciones: {', '.join(FORMATOS_LOG)})")
+
+        raiz = logging.getLogger()
+        raiz.setLevel((nivel or _config.LOG_LEVEL).upper())
+        for modulo, valor in _leer_niveles(_config.LOG_LEVELS).items():
+            logging.getLogger(modulo).setLevel(valor)
+
+        salida = logging.StreamHandler(sys.stdout)
+        salida.setFormatter(FormatoJSON() if formato == 'json' else FormatoTexto())
+
+        _handler = _ColaNoBloqueante(queue.Queue(_config.LOG_QUEUE_SIZE))
+        _handler.addFilter(_FiltroContexto(_config.LOG_DEBUG_SAMPLE))
+        raiz.handlers = [_handler]
+
+        _listener = QueueListener(_handler.queue, salida, respect_handler_level=True)
+        _listener.start()
+        # Escribir lo que quede en la cola al terminar el proceso
+        atexit.register(_listener.stop)
+        return _handler
+
+
+def _asignar_request_id():
+    entrante = request.headers.get(CABECERA_REQUEST_ID, '')
+    g.request_id = entrante if _REQUEST_ID_VALIDO.match(entrante) else uuid.uuid4().hex
+
+
+def _devolver_request_id(response):
+    if g.get('request_id'):
+        response.headers[CABECERA_REQUEST_ID] = g.request_id
+    return response
+
+
+def init_app(app):
+    """Configurar el logging y la correlación por request_id de la aplicación"""
+    configurar_logging()
+    app.before_request(_asignar_request_id)
+    app.after_request(_devolver_request_id)
+
+
+def estadisticas_logging():
+    """Registros en espera y descartados por cola llena"""
+    if _handler is None:
+        return {'activo': False}
+    return {
+        'activo': True,
+        'en_cola': _handler.queue.qsize(),
+        'capacidad': _handler.queue.maxsize,
+        'descartados': _handler.descartados,
+        'nivel': logging.getLevelName(logging.getLogger().level),
+        'muestra_debug': _config.LOG_DEBUG_SAMPLE,
+    }
@@ -0,0 +1,329 @@
+"""
+Métricas de SQL por petición
+Los cursores de la conexión de la petición (get_db_connection() dentro de Flask)
+miden cada execute/executemany. Por petición se acumula cuántas sentencias hubo,
+el tiempo total en la base de datos y la sentencia más lenta; cada sentencia se
+identifica por su huella: el SQL sin literales ni espacios repetidos, resumido
+en un hash corto, de modo que la misma consulta con otros parámetros tiene la
+misma huella.
+
+Al responder:
+- se agrega la cabecera Server-Timing (db, db-max y total), visible en las
+  herramientas de desarrollo del navegador;
+- se registra una advertencia, con las huellas de la petición, si se superan
+  los umbrales o si una misma huella se repite dentro de la petición (consulta
+  por fila en un ciclo, el patrón N+1 que tuvo solicitudes_pendientes);
+- se suman los totales por endpoint y por huella, que expone /api/health/sql
+  (solo para sesiones con rol de jefatura o administrador).
+
+Los totales son por proceso: con varios workers, cada uno lleva los suyos.
+Los cursores con nombre solo miden el DECLARE, no las lecturas posteriores.
+
+Variables (config.env):
+- SQL_METRICS: activar la medición (true por defecto)
+- SQL_SERVER_TIMING: agregar la cabecera Server-Timing
+- SQL_SLOW_REQUEST_MS / SQL_SLOW_DB_MS: petición lenta (total / en la base de datos)
+- SQL_MAX_QUERIES: sentencias por petición antes de advertir
+- SQL_REPEAT_THRESHOLD: repeticiones de una huella en la petición antes de advertir
+- SQL_MAX_FINGERPRINTS: huellas distintas que se guardan en los totales
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+
+from flask import g, has_request_context, request
+from psycopg2.extensions import cursor as CursorBase
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_config = Config()
+
+# Normalización de sentencias para calcular la huella
+_COMENTARIOS = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_TEXTOS = re.compile(r"(?:E|e)?'(?:[^']|'')*'")
+_PARAMETROS = re.compile(r'%(?:\([^)]+\))?s')
+_NUMEROS = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_LISTAS = re.compile(r'\(\s*(?:\?|NULL)(?:\s*,\s*(?:\?|NULL))*\s*\)', re.I)
+_FILAS = re.compile(r'\(\?\.\.\.\)(?:\s*,\s*\(\?\.\.\.\))+')
+_ESPACIOS = re.compile(r'\s+')
+
+LARGO_TEXTO_HUELLA = 300
+
+
+@lru_cache(maxsize=2048)
+def _normalizar(texto):
+    texto = _COMENTARIOS.sub(' ', texto)
+    texto = _TEXTOS.sub('?', texto)
+    texto = _PARAMETROS.sub('?', texto)
+    texto = _NUMEROS.sub('?', texto)
+    texto = _LISTAS.sub('(?...)', texto)
+    texto = _FILAS.sub('(?...)', texto)
+    texto = _ESPACIOS.sub(' ', texto).strip()
+    return hashlib.sha1(texto.encode('utf-8')).hexdigest()[:12], texto[:LARGO_TEXTO_HUELLA]
+
+
+def huella_sql(sentencia):
+    """
+    Huella de una sentencia: (hash corto, SQL normalizado y recortado).
+    Acepta str o bytes (lo que arma execute_values).
+    """
+    if isinstance(sentencia, bytes):
+        sentencia = sentencia.decode('utf-8', 'replace')
+    return _normalizar(str(sentencia))
+
+
+class MetricasPeticion:
+    """Sentencias de una petición: cantidad, tiempo, la más lenta y sus huellas"""
+
+    __slots__ = ('inicio', 'consultas', 'segundos', 'mas_lenta', 'huellas')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.segundos = 0.0
+        self.mas_lenta = None  # (segundos, huella, sql)
+        self.huellas = {}  # huella -> [veces, segundos, sql]
+
+    def registrar(self, sentencia, segundos):
+        huella, texto = huella_sql(sentencia)
+        self.consultas += 1
+        self.segundos += segundos
+        entrada = self.huellas.get(huella)
+        if entrada is None:
+            self.huellas[huella] = [1, segundos, texto]
+        else:
+            entrada[0] += 1
+            entrada[1] += segundos
+        if self.mas_lenta is None or segundos > self.mas_lenta[0]:
+            self.mas_lenta = (segundos, huella, texto)
+
+    def repetidas(self, umbral):
+        """Huellas ejecutadas `umbral` veces o más en la petición"""
+        return {huella: entrada for huella, entrada in self.huellas.items() if entrada[0] >= umbral}
+
+
+def _metricas_actuales():
+    """Métricas de la petición en curso (se crean con la primera sentencia)"""
+    metricas = g.get('_metricas_sql')
+    if metricas is None:
+        metricas = g._metricas_sql = MetricasPeticion()
+    return metricas
+
+
+def _registrar_sentencia(sentencia, segundos):
+    if has_request_context():
+        _metricas_actuales().registrar(sentencia, segundos)
+
+
+class _Medicion:
+    """Mixin de cursor que mide cada sentencia y la suma a la petición"""
+
+    def execute(self, query, vars=None):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _registrar_sentencia(query, time.perf_counter() - inicio)
+
+    def executemany(self, query, vars_list):
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _registrar_sentencia(query, time.perf_counter() - inicio)
+
+
+_clases_medidas = {}
+_lock_clases = threading.Lock()
+
+
+def cursor_medido(cursor_factory=None):
+    """
+    Clase de cursor que mide sus sentencias, derivada de `cursor_factory`
+    (p. ej. RealDictCursor); se pasa como cursor_factory a connection.cursor().
+    """
+    base = cursor_factory or CursorBase
+    clase = _clases_medidas.get(base)
+    if clase is None:
+        with _lock_clases:
+            clase = _clases_medidas.get(base)
+            if clase is None:
+                clase = type(f'{base.__name__}Medido', (_Medicion, base), {})
+                _clases_medidas[base] = clase
+    return clase
+
+
+# Totales del proceso, por endpoint y por huella
+_por_ruta = {}
+_por_huella = {}
+_huellas_descartadas = 0
+_lock_totales = threading.Lock()
+
+
+def _acumular(ruta, metricas, total, lenta, repetidas):
+    global _huellas_descartadas
+    with _lock_totales:
+        datos = _por_ruta.get(ruta)
+        if datos is None:
+            datos = _por_ruta[ruta] = {
+                'peticiones': 0, 'consultas': 0, 'db_s': 0.0, 'total_s': 0.0,
+                'max_total_s': 0.0, 'max_consultas': 0, 'lentas': 0, 'con_repetidas': 0,
+            }
+        datos['peticiones'] += 1
+        datos['consultas'] += metricas.consultas
+        datos['db_s'] += metricas.segundos
+        datos['total_s'] += total
+        datos['max_total_s'] = max(datos['max_total_s'], total)
+        datos['max_consultas'] = max(datos['max_consultas'], metricas.consultas)
+        datos['lentas'] += int(lenta)
+        datos['con_repetidas'] += int(bool(repetidas))
+
+        for huella, (veces, segundos, texto) in metricas.huellas.items():
+            entrada = _por_huella.get(huella)
+            if entrada is None:
+                if len(_por_huella) >= _config.SQL_MAX_FINGERPRINTS:
+                    _huellas_descartadas += 1
+                    continue
+                entrada = _por_huella[huella] = {
+                    'sql': texto, 'ejecuciones': 0, 'total_s': 0.0, 'max_por_peticion': 0,
+                    'repetida_en': 0, 'rutas': set(),
+                }
+            entrada['ejecuciones'] += veces
+            entrada['total_s'] += segundos
+            entrada['max_por_peticion'] = max(entrada['max_por_peticion'], veces)
+            entrada['repetida_en'] += int(huella in repetidas)
+            entrada['rutas'].add(ruta)
+
+
+def _ms(segundos):
+    return round(segundos * 1000, 1)
+
+
+def _resumen_huellas(huellas, limite=10):
+    ordenadas = sorted(huellas.items(), key=lambda item: item[1][1], reverse=True)[:limite]
+    return [
+        {'huella': huella, 'veces': veces, 'ms': _ms(segundos), 'sql': texto}
+        for huella, (veces, segundos, texto) in ordenadas
+    ]
+
+
+def _iniciar_peticion():
+    _metricas_actuales()
+
+
+def _cerrar_peticion(response):
+    metricas = g.get('_metricas_sql')
+    if metricas is None:
+        return response
+
+    total = time.perf_counter() - metricas.inicio
+    ruta = request.endpoint or request.path
+
+    if _config.SQL_SERVER_TIMING:
+        partes = [f'db;dur={_ms(metricas.segundos)};desc="{metricas.consultas} consultas"']
+        if metricas.mas_lenta is not None:
+            partes.append(f'db-max;dur={_ms(metricas.mas_lenta[0])};desc="{metricas.mas_lenta[1]}"')
+        partes.append(f'total;dur={_ms(total)}')
+        response.headers.add('Server-Timing', ', '.join(partes))
+
+    repetidas = metricas.repetidas(_config.SQL_REPEAT_THRESHOLD)
+    motivos = []
+    if total * 1000 >= _config.SQL_SLOW_REQUEST_MS:
+        motivos.append('lenta')
+    if metricas.segundos * 1000 >= _config.SQL_SLOW_DB_MS:
+        motivos.append('db_lenta')
+    if metricas.consultas >= _config.SQL_MAX_QUERIES:
+        motivos.append('muchas_consultas')
+    if repetidas:
+        motivos.append('consultas_repetidas')
+
+    _acumular(ruta, metricas, total, 'lenta' in motivos or 'db_lenta' in motivos, repetidas)
+
+    if motivos:
+        logger.warning(
+            '%s %s (%s): %s ms, %s consultas, %s ms en la base de datos%s',
+            request.method, request.path, ', '.join(motivos), _ms(total), metricas.consultas,
+            _ms(metricas.segundos),
+            ''.join(f'; {huella} x{entrada[0]}' for huella, entrada in repetidas.items()),
+            extra={
+                'ruta': ruta,
+                'motivos': motivos,
+                'duracion_ms': _ms(total),
+                'consultas': metricas.consultas,
+                'db_ms': _ms(metricas.segundos),
+                'mas_lenta': {
+                    'huella': metricas.mas_lenta[1], 'ms': _ms(metricas.mas_lenta[0]), 'sql': metricas.mas_lenta[2]
+                } if metricas.mas_lenta else None,
+                'repetidas': _resumen_huellas(repetidas),
+                'huellas': _resumen_huellas(metricas.huellas),
+            }
+        )
+    return response
+
+
+def init_app(app):
+    """Medir las sentencias SQL de cada petición (si SQL_METRICS está activo)"""
+    if not _config.SQL_METRICS:
+        logger.info('Métricas de SQL desactivadas')
+        return False
+    app.before_request(_iniciar_peticion)
+    app.after_request(_cerrar_peticion)
+    return True
+
+
+def medicion_activa():
+    """Indica si la conexión de cada petición debe entregar cursores medidos"""
+    return _config.SQL_METRICS
+
+
+def estadisticas_sql(limite=20):
+    """Totales por endpoint y las huellas con más tiempo acumulado y más repetidas"""
+    with _lock_totales:
+        rutas = {
+            ruta: {
+                'peticiones': datos['peticiones'],
+                'consultas_promedio': round(datos['consultas'] / datos['peticiones'], 1),
+                'max_consultas': datos['max_consultas'],
+                'db_ms_promedio': _ms(datos['db_s'] / datos['peticiones']),
+                'total_ms_promedio': _ms(datos['total_s'] / datos['peticiones']),
+                'max_total_ms': _ms(datos['max_total_s']),
+                'lentas': datos['lentas'],
+                'con_repetidas': datos['con_repetidas'],
+            }
+            for ruta, datos in sorted(_por_ruta.items(), key=lambda item: item[1]['db_s'], reverse=True)
+        }
+        huellas = [
+            {
+                'huella': huella,
+                'sql': entrada['sql'],
+                'ejecuciones': entrada['ejecuciones'],
+                'total_ms': _ms(entrada['total_s']),
+                'promedio_ms': _ms(entrada['total_s'] / entrada['ejecuciones']),
+                'max_por_peticion': entrada['max_por_peticion'],
+                'repetida_en': entrada['repetida_en'],
+                'rutas': sorted(entrada['rutas']),
+            }
+            for huella, entrada in _por_huella.items()
+        ]
+        descartadas = _huellas_descartadas
+
+    return {
+        'activo': _config.SQL_METRICS,
+        'umbrales': {
+            'peticion_lenta_ms': _config.SQL_SLOW_REQUEST_MS,
+            'db_lenta_ms': _config.SQL_SLOW_DB_MS,
+            'max_consultas': _config.SQL_MAX_QUERIES,
+            'repeticiones': _config.SQL_REPEAT_THRESHOLD,
+        },
+        'rutas': rutas,
+        'huellas_mas_costosas': sorted(huellas, key=lambda h: h['total_ms'], reverse=True)[:limite],
+        'huellas_repetidas': sorted(
+            (h for h in huellas if h['repetida_en']), key=lambda h: h['repetida_en'], reverse=True
+        )[:limite],
+        'huellas_descartadas': descartadas,
+    }
@@ -0,0 +1,149 @@
+"""
+Migración de documentos desde la columna doc_archivo_blob al almacenamiento
+Recorre los documentos que aún tienen BLOB en lotes pequeños. Por cada uno
+guarda el contenido bajo su SHA-256, verifica que quedó completo y recién
+entonces deja el BLOB en NULL. Se puede interrumpir y volver a ejecutar: solo
+procesa lo pendiente.
+
+Uso manual:
+    python -m utils.migrar_blobs                 # migrar todo en lotes de 20
+    python -m utils.migrar_blobs --lote 50       # tamaño de lote
+    python -m utils.migrar_blobs --limite 200    # detenerse tras 200 documentos
+    python -m utils.migrar_blobs --dry-run       # solo contar pendientes
+"""
+import argparse
+import hashlib
+import logging
+import os
+import sys
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import actualizar_filas, get_db_connection
+from utils.helpers import get_file_hash
+from utils.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+LOTE_POR_DEFECTO = 20
+
+
+def contar_pendientes(cur):
+    """Cantidad de documentos que todavía tienen el contenido en la base de datos"""
+    cur.execute("SELECT COUNT(*) FROM app.documentos_saldo_insoluto WHERE doc_archivo_blob IS NOT NULL")
+    return cur.fetchone()[0]
+
+
+def _verificar(storage, sha256):
+    """Releer el archivo guardado y confirmar su hash"""
+    h = hashlib.sha256()
+    for bloque in storage.iterar(sha256):
+        h.update(bloque)
+    return h.hexdigest() == sha256
+
+
+def migrar_lote(conn, storage, lote, desde_id=0):
+    """
+    Migrar hasta `lote` documentos con id mayor a `desde_id`.
+    Retorna (procesados, migrados, errores, ultimo_id).
+    """
+    cur = conn.cursor()
+    migrados_lote = []
+    errores = 0
+    ultimo_id = desde_id
+    try:
+        # SKIP LOCKED permite correr varias instancias en paralelo sin pisarse
+        cur.execute("""
+            SELECT id, doc_sha256, doc_archivo_blob
+            FROM app.documentos_saldo_insoluto
+            WHERE doc_archivo_blob IS NOT NULL AND id > %s
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (desde_id, lote))
+        filas = cur.fetchall()
+
+        for documento_id, sha256_registrado, archivo_blob in filas:
+            ultimo_id = documento_id
+            data = bytes(archivo_blob)
+            sha256 = get_file_hash(data)
+            if sha256_registrado and sha256_registrado != sha256:
+                logger.warning('Documento %s: doc_sha256 no coincide con el contenido, se corrige', documento_id)
+
+            try:
+                storage.guardar(sha256, data)
+                if not _verificar(storage, sha256):
+                    raise ValueError('el archivo guardado no coincide con el hash')
+            except Exception as e:
+                logger.error('Documento %s: %s', documento_id, e)
+                errores += 1
+                continue
+
+            migrados_lote.append((documento_id, sha256, len(data)))
+
+        # Un solo UPDATE para todos los documentos del lote que quedaron en el almacenamiento
+        actualizar_filas(
+            cur, 'app.documentos_saldo_insoluto', 'id',
+            ('doc_archivo_blob', 'doc_sha256', 'doc_tamano_bytes'),
+            migrados_lote,
+            template='(%s, NULL::bytea, %s, %s)'
+        )
+        migrados = len(migrados_lote)
+        conn.commit()
+        return len(filas), migrados, errores, ultimo_id
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def migrar_blobs(lote=LOTE_POR_DEFECTO, limite=None, dry_run=False):
+    """Migrar todos los BLOB pendientes al almacenamiento configurado"""
+    conn = get_db_connection()
+    if not conn:
+        logger.error("No se pudo conectar a la base de datos")
+        return False
+
+    try:
+        cur = conn.cursor()
+        pendientes = contar_pendientes(cur)
+        conn.rollback()
+        cur.close()
+        logger.info('Documentos con BLOB pendientes de migrar: %s', pendientes)
+        if dry_run or not pendientes:
+            return True
+
+        storage = get_storage()
+        total = 0
+        total_errores = 0
+        ultimo_id = 0
+        while limite is None or total + total_errores < limite:
+            tamano = lote if limite is None else min(lote, limite - total - total_errores)
+            procesados, migrados, errores, ultimo_id = migrar_lote(conn, storage, tamano, ultimo_id)
+            if procesados == 0:
+                break
+            total += migrados
+            total_errores += errores
+            logger.info('%s documentos migrados', total)
+
+        logger.info('Migración terminada: %s migrados, %s con error', total, total_errores)
+        return total_errores == 0
+    except Exception as e:
+        logger.exception('Error migrando documentos: %s', e)
+        return False
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    from utils.logs import configurar_logging
+    configurar_logging(formato='texto')
+    
+    parser = argparse.ArgumentParser(description='Mover doc_archivo_blob al almacenamiento de documentos')
+    parser.add_argument('--lote', type=int, default=LOTE_POR_DEFECTO, help='documentos por transacción')
+    parser.add_argument('--limite', type=int, default=None, help='máximo de documentos a migrar')
+    parser.add_argument('--dry-run', action='store_true', help='solo contar documentos pendientes')
+    args = parser.parse_args()
+    sys.exit(0 if migrar_blobs(args.lote, args.limite, args.dry_run) else 1)
@@ -0,0 +1,187 @@
+"""
+Migraciones versionadas del esquema
+Cada archivo database/migrations/NNNN_nombre.sql se aplica una sola vez y queda
+registrado en app.schema_migrations. Si la base ya está en la última versión,
+el arranque solo hace una consulta de lectura y no toma locks sobre las tablas.
+
+Uso manual:
+    python -m utils.migrations            # aplicar migraciones pendientes
+    python -m utils.migrations status     # ver versión actual y pendientes
+"""
+import hashlib
+import logging
+import os
+import re
+import sys
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'migrations')
+
+# Clave del advisory lock para que dos workers no migren al mismo tiempo
+_ADVISORY_LOCK_KEY = 7_283_901
+
+# Tiempo máximo esperando un lock de tabla antes de abortar la migración
+LOCK_TIMEOUT = '10s'
+
+_ARCHIVO_RE = re.compile(r'^(\d{4})_([\w-]+)\.sql$')
+
+
+def listar_migraciones():
+    """Listar las migraciones disponibles ordenadas por versión: [(version, nombre, ruta)]"""
+    migraciones = []
+    for archivo in os.listdir(MIGRATIONS_DIR):
+        match = _ARCHIVO_RE.match(archivo)
+        if match:
+            migraciones.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, archivo)))
+    migraciones.sort()
+    return migraciones
+
+
+def _leer_sql(ruta):
+    """Leer el SQL de una migración y su checksum"""
+    with open(ruta, 'r', encoding='utf-8') as f:
+        sql = f.read()
+    return sql, hashlib.sha256(sql.encode('utf-8')).hexdigest()
+
+
+def _versiones_aplicadas(cur):
+    """Versiones ya registradas en app.schema_migrations ({} si la tabla no existe)"""
+    cur.execute("SELECT to_regclass('app.schema_migrations') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        return {}
+    cur.execute("SELECT version, checksum FROM app.schema_migrations")
+    return {row[0]: row[1] for row in cur.fetchall()}
+
+
+def _crear_tabla_migraciones(cur):
+    """Crear la tabla de control de migraciones"""
+    cur.execute("""
+        CREATE SCHEMA IF NOT EXISTS app;
+        CREATE TABLE IF NOT EXISTS app.schema_migrations (
+            version INTEGER PRIMARY KEY,
+            nombre VARCHAR(255) NOT NULL,
+            checksum VARCHAR(64) NOT NULL,
+            aplicada_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def estado_migraciones(conn=None):
+    """Obtener versión actual, versión objetivo y migraciones pendientes"""
+    propia = conn is None
+    conn = conn or get_db_connection()
+    if not conn:
+        return None
+    try:
+        cur = conn.cursor()
+        aplicadas = _versiones_aplicadas(cur)
+        conn.rollback()
+        cur.close()
+        disponibles = listar_migraciones()
+        return {
+            'version_actual': max(aplicadas) if aplicadas else 0,
+            'version_objetivo': disponibles[-1][0] if disponibles else 0,
+            'pendientes': [f'{v:04d}_{n}' for v, n, _ in disponibles if v not in aplicadas]
+        }
+    finally:
+        if propia:
+            conn.close()
+
+
+def run_migrations():
+    """Aplicar las migraciones pendientes usando una sola conexión"""
+    disponibles = listar_migraciones()
+
+    conn = get_db_connection()
+    if not conn:
+        logger.error("No se pudo conectar a la base de datos")
+        return False
+
+    cur = None
+    bloqueado = False
+    try:
+        cur = conn.cursor()
+
+        # Camino rápido: ya estamos en la última versión
+        aplicadas = _versiones_aplicadas(cur)
+        conn.rollback()
+        pendientes = [m for m in disponibles if m[0] not in aplicadas]
+        if not pendientes:
+            logger.info('Esquema al día (versión %s)', max(aplicadas) if aplicadas else 0)
+            return True
+
+        # Evitar que otro worker aplique las mismas migraciones en paralelo
+        cur.execute("SELECT pg_advisory_lock(%s)", (_ADVISORY_LOCK_KEY,))
+        bloqueado = True
+
+        _crear_tabla_migraciones(cur)
+        conn.commit()
+
+        # Releer dentro del lock: otro worker pudo haber avanzado
+        aplicadas = _versiones_aplicadas(cur)
+        conn.commit()
+
+        for version, nombre, ruta in disponibles:
+            sql, checksum = _leer_sql(ruta)
+
+            if version in aplicadas:
+                if aplicadas[version] != checksum:
+                    logger.warning('La migración %04d_%s fue modificada después de aplicarse', version, nombre)
+                continue
+
+            logger.info('Aplicando migración %04d_%s...', version, nombre)
+            try:
+                cur.execute("SET LOCAL lock_timeout = %s", (LOCK_TIMEOUT,))
+                cur.execute(sql)
+                cur.execute("""
+                    INSERT INTO app.schema_migrations (version, nombre, checksum)
+                    VALUES (%s, %s, %s)
+                """, (version, nombre, checksum))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error('Error aplicando migración %04d_%s: %s', version, nombre, e)
+                return False
+
+            logger.info('Migración %04d_%s aplicada', version, nombre)
+
+        return True
+
+    except Exception as e:
+        logger.exception('Error ejecutando migraciones: %s', e)
+        conn.rollback()
+        return False
+
+    finally:
+        if cur is not None:
+            if bloqueado:
+                try:
+                    cur.execute("SELECT pg_advisory_unlock(%s)", (_ADVISORY_LOCK_KEY,))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+            cur.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    from utils.logs import configurar_logging
+    configurar_logging(formato='texto')
+    
+    if len(sys.argv) > 1 and sys.argv[1] == 'status':
+        estado = estado_migraciones()
+        if estado is None:
+            logger.error("No se pudo conectar a la base de datos")
+            sys.exit(1)
+        logger.info("Versión actual: %s", estado['version_actual'])
+        logger.info("Versión objetivo: %s", estado['version_objetivo'])
+        for pendiente in estado['pendientes']:
+            logger.info("Pendiente: %s", pendiente)
+    else:
+        sys.exit(0 if run_migrations() else 1)
@@ -0,0 +1,119 @@
+"""
+Paginación por cursor (keyset) y filtros comunes para las colas de trabajo
+El cursor codifica (fecha_creacion, id) del último registro entregado, de modo
+que cada página se obtiene con un rango sobre el índice y cuesta lo mismo sin
+importar cuántas páginas se hayan recorrido.
+"""
+import base64
+from datetime import datetime, timedelta
+from utils.helpers import normalizar_rut
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 200
+
+
+def codificar_cursor(fecha_creacion, registro_id):
+    """Generar el cursor opaco a partir del último registro de la página"""
+    valor = f'{fecha_creacion.isoformat()}|{registro_id}'
+    return base64.urlsafe_b64encode(valor.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Obtener (fecha_creacion, id) desde un cursor; ValueError si es inválido"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valor = base64.urlsafe_b64decode(cursor + relleno).decode('utf-8')
+        fecha, registro_id = valor.split('|')
+        return datetime.fromisoformat(fecha), int(registro_id)
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+
+def _leer_fecha(valor, nombre):
+    """Parsear una fecha YYYY-MM-DD de los parámetros"""
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError(f'{nombre} debe tener formato YYYY-MM-DD')
+
+
+def leer_paginacion(args):
+    """
+    Leer limit, cursor y filtros opcionales desde request.args.
+    Retorna un dict con: limit, cursor (tupla o None), sucursal, fecha_desde,
+    fecha_hasta (exclusiva, día siguiente) y rut_prefijo. ValueError si algo es inválido.
+    """
+    limite = args.get('limit', '')
+    if limite:
+        if not limite.isdigit() or int(limite) < 1:
+            raise ValueError('limit debe ser un entero positivo')
+        limite = min(int(limite), LIMITE_MAXIMO)
+    else:
+        limite = LIMITE_POR_DEFECTO
+
+    cursor = args.get('cursor', '')
+    fecha_desde = args.get('fecha_desde', '')
+    fecha_hasta = args.get('fecha_hasta', '')
+
+    return {
+        'limit': limite,
+        'cursor': decodificar_cursor(cursor) if cursor else None,
+        'sucursal': args.get('sucursal', '').strip(),
+        'fecha_desde': _leer_fecha(fecha_desde, 'fecha_desde') if fecha_desde else None,
+        'fecha_hasta': _leer_fecha(fecha_hasta, 'fecha_hasta') + timedelta(days=1) if fecha_hasta else None,
+        'rut_prefijo': normalizar_rut(args.get('rut_causante', '').strip()),
+    }
+
+
+def filtros_keyset(paginacion, alias='s'):
+    """
+    Condiciones SQL y parámetros para los filtros y el cursor sobre la tabla `alias`
+    (que debe tener fecha_creacion, id, sucursal y expediente_id).
+    """
+    condiciones = []
+    params = []
+
+    if paginacion['sucursal']:
+        condiciones.append(f'{alias}.sucursal = %s')
+        params.append(paginacion['sucursal'])
+
+    if paginacion['fecha_desde']:
+        condiciones.append(f'{alias}.fecha_creacion >= %s')
+        params.append(paginacion['fecha_desde'])
+
+    if paginacion['fecha_hasta']:
+        condiciones.append(f'{alias}.fecha_creacion < %s')
+        params.append(paginacion['fecha_hasta'])
+
+    if paginacion['rut_prefijo']:
+        # Escapar comodines de LIKE para que el prefijo sea literal
+        prefijo = paginacion['rut_prefijo'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        condiciones.append(f"""EXISTS (
+            SELECT 1 FROM app.causante cf
+            WHERE cf.expediente_id = {alias}.expediente_id AND (cf.fal_run_num::TEXT || cf.fal_run_dv) LIKE %s
+        )""")
+        params.append(prefijo + '%')
+
+    if paginacion['cursor']:
+        condiciones.append(f'({alias}.fecha_creacion, {alias}.id) < (%s, %s)')
+        params.extend(paginacion['cursor'])
+
+    return condiciones, params
+
+
+def armar_pagina(filas, limite, campo_fecha='fecha_creacion', campo_id='solicitud_id'):
+    """
+    Recortar las filas (se piden limit + 1) y calcular el cursor siguiente.
+    Retorna (filas_de_la_pagina, info_paginacion).
+    """
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    siguiente = None
+    if hay_mas and filas:
+        ultima = filas[-1]
+        siguiente = codificar_cursor(ultima[campo_fecha], ultima[campo_id])
+    return filas, {
+        'limit': limite,
+        'hay_mas': hay_mas,
+        'siguiente_cursor': siguiente
+    }
@@ -0,0 +1,181 @@
+"""
+Caché de PDF generados, direccionada por contenido
+La clave es el hash de la versión del template más el contexto completo del
+render, así que un PDF solo se reutiliza si se generaría exactamente igual.
+Hay dos niveles: un LRU pequeño en memoria (por worker) y archivos en disco
+compartidos entre workers. Los archivos llevan el expediente como prefijo para
+poder invalidar todas las versiones de un expediente de una vez.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def clave_pdf(version_template, contexto):
+    """Hash estable de la versión del template y el contexto del render"""
+    material = json.dumps(
+        {'template': version_template, 'contexto': contexto},
+        sort_keys=True, default=str, ensure_ascii=False
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def grupo_expediente(expediente_id):
+    """Prefijo de los PDF de un expediente dentro de la caché"""
+    return f'exp{expediente_id}'
+
+
+class CachePDF:
+    """LRU en memoria acotado por bytes sobre un directorio de archivos PDF"""
+
+    def __init__(self, directorio, max_bytes_memoria=32 * 1024 * 1024, max_archivos=5000):
+        self.directorio = os.path.abspath(directorio)
+        self.max_bytes_memoria = max_bytes_memoria
+        self.max_archivos = max_archivos
+        self._memoria = OrderedDict()
+        self._bytes_memoria = 0
+        self._lock = threading.Lock()
+        self._stats = {'aciertos_memoria': 0, 'aciertos_disco': 0, 'fallos': 0, 'guardados': 0, 'invalidados': 0}
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def _ruta(self, grupo, clave):
+        return os.path.join(self.directorio, f'{grupo}-{clave}.pdf')
+
+    def _recordar(self, nombre, pdf):
+        """Agregar al LRU en memoria y expulsar lo menos usado (con el lock tomado)"""
+        if len(pdf) > self.max_bytes_memoria:
+            return
+        anterior = self._memoria.pop(nombre, None)
+        if anterior is not None:
+            self._bytes_memoria -= len(anterior)
+        self._memoria[nombre] = pdf
+        self._bytes_memoria += len(pdf)
+        while self._bytes_memoria > self.max_bytes_memoria:
+            _, expulsado = self._memoria.popitem(last=False)
+            self._bytes_memoria -= len(expulsado)
+
+    def obtener(self, grupo, clave):
+        """PDF guardado para (grupo, clave) o None"""
+        nombre = f'{grupo}-{clave}'
+        with self._lock:
+            pdf = self._memoria.get(nombre)
+            if pdf is not None:
+                self._memoria.move_to_end(nombre)
+                self._stats['aciertos_memoria'] += 1
+                return pdf
+
+        ruta = self._ruta(grupo, clave)
+        try:
+            with open(ruta, 'rb') as f:
+                pdf = f.read()
+            # La fecha de modificación sirve de "último uso" para podar el disco
+            os.utime(ruta)
+        except FileNotFoundError:
+            with self._lock:
+                self._stats['fallos'] += 1
+            return None
+
+        with self._lock:
+            self._recordar(nombre, pdf)
+            self._stats['aciertos_disco'] += 1
+        return pdf
+
+    def guardar(self, grupo, clave, pdf):
+        """Guardar un PDF en memoria y en disco (escritura atómica)"""
+        with self._lock:
+            self._recordar(f'{grupo}-{clave}', pdf)
+            self._stats['guardados'] += 1
+
+        fd, tmp = tempfile.mkstemp(dir=self.directorio, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(pdf)
+            os.replace(tmp, self._ruta(grupo, clave))
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self._podar()
+
+    def invalidar(self, grupo):
+        """Eliminar todas las versiones guardadas de un grupo (p. ej. un expediente)"""
+        prefijo = f'{grupo}-'
+        with self._lock:
+            for nombre in [n for n in self._memoria if n.startswith(prefijo)]:
+                self._bytes_memoria -= len(self._memoria.pop(nombre))
+
+        eliminados = 0
+        for nombre in os.listdir(self.directorio):
+            if nombre.startswith(prefijo):
+                try:
+                    os.remove(os.path.join(self.directorio, nombre))
+                    eliminados += 1
+                except FileNotFoundError:
+                    pass
+        with self._lock:
+            self._stats['invalidados'] += eliminados
+        return eliminados
+
+    def _podar(self):
+        """Mantener a lo más `max_archivos` en disco, borrando los menos usados"""
+        archivos = [n for n in os.listdir(self.directorio) if n.endswith('.pdf')]
+        if len(archivos) <= self.max_archivos:
+            return
+        rutas = []
+        for nombre in archivos:
+            ruta = os.path.join(self.directorio, nombre)
+            try:
+                rutas.append((os.path.getmtime(ruta), ruta))
+            except FileNotFoundError:
+                pass
+        rutas.sort()
+        for _, ruta in rutas[:len(rutas) - self.max_archivos]:
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entradas_memoria': len(self._memoria),
+                'bytes_memoria': self._bytes_memoria,
+                **self._stats,
+            }
+
+
+# Caché compartida (se crea en el primer uso)
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_pdf_cache():
+    """Obtener la caché de PDF configurada"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                from config import Config
+                config = Config()
+                _cache = CachePDF(
+                    config.PDF_CACHE_DIR,
+                    max_bytes_memoria=int(config.PDF_CACHE_MEMORY_MB * 1024 * 1024),
+                    max_archivos=config.PDF_CACHE_MAX_FILES
+                )
+    return _cache
+
+
+def invalidar_pdfs_expediente(expediente_id):
+    """Descartar las resoluciones guardadas de un expediente (su cálculo cambió)"""
+    try:
+        eliminados = get_pdf_cache().invalidar(grupo_expediente(expediente_id))
+        if eliminados:
+            logger.info('Resoluciones en caché descartadas para el expediente %s: %s', expediente_id, eliminados)
+    except Exception as e:
+        logger.warning('No se pudo invalidar la caché de PDF del expediente %s: %s', expediente_id, e)
@@ -0,0 +1,342 @@
+"""
+Servicio de generación de PDF fuera del hilo de la petición
+xhtml2pdf es CPU-bound y retiene el GIL, por lo que generar varias resoluciones
+a la vez dentro de los hilos de Flask detiene al resto de los endpoints. Aquí
+el HTML se envía a un pool acotado de procesos; cada envío es un trabajo con
+id que se puede consultar y descargar cuando está listo.
+Los trabajos viven en la memoria de este worker; al_cambiar_estado permite
+registrarlos en un almacenamiento compartido (ver utils/trabajos_pdf.py).
+"""
+import hashlib
+import io
+import logging
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# xhtml2pdf es opcional: sin él no se pueden generar resoluciones
+try:
+    from xhtml2pdf import pisa  # noqa: F401
+    XHTML2PDF_AVAILABLE = True
+except ImportError as e:
+    logger.warning('xhtml2pdf no disponible: %s', e)
+    XHTML2PDF_AVAILABLE = False
+
+
+class ColaLlena(Exception):
+    """Hay demasiados trabajos esperando; el cliente debe reintentar más tarde"""
+
+
+def _renderizar_pdf(html_content):
+    """
+    Generar el PDF a partir del HTML (se ejecuta en un proceso del pool).
+    Retorna (bytes del PDF, milisegundos de render).
+    """
+    from xhtml2pdf import pisa
+
+    inicio = time.perf_counter()
+    salida = io.BytesIO()
+    pisa_status = pisa.CreatePDF(src=html_content, dest=salida, encoding='utf-8')
+    if pisa_status.err:
+        raise RuntimeError(f'Error generando PDF: {pisa_status.err}')
+
+    pdf_data = salida.getvalue()
+    if not pdf_data.startswith(b'%PDF'):
+        raise RuntimeError('El archivo generado no es un PDF válido')
+    return pdf_data, (time.perf_counter() - inicio) * 1000
+
+
+class TrabajoPDF:
+    """Un PDF pedido al servicio: estado, resultado y tiempos"""
+
+    def __init__(self, html_content, clave, nombre_archivo, propietario=None, al_terminar=None,
+                 al_cambiar_estado=None):
+        self.id = str(uuid.uuid4())
+        self.clave = clave
+        self.nombre_archivo = nombre_archivo
+        self.propietario = propietario
+        self.estado = 'en_cola'
+        self.error = None
+        self.pdf = None
+        self.render_ms = None
+        self.creado_en = time.time()
+        self.terminado_en = None
+        self._html = html_content
+        self._al_terminar = al_terminar
+        self._al_cambiar_estado = al_cambiar_estado
+        self._terminado = threading.Event()
+
+    @classmethod
+    def desde_cache(cls, pdf, nombre_archivo, propietario=None):
+        """Trabajo ya terminado con un PDF obtenido de la caché (no pasa por el pool)"""
+        trabajo = cls(None, None, nombre_archivo, propietario)
+        trabajo.estado = 'listo'
+        trabajo.pdf = pdf
+        trabajo.terminado_en = time.time()
+        trabajo._terminado.set()
+        return trabajo
+
+    @property
+    def terminado(self):
+        return self._terminado.is_set()
+
+    def esperar(self, timeout=None):
+        """Esperar a que el trabajo termine; retorna True si terminó"""
+        return self._terminado.wait(timeout)
+
+    def notificar_estado(self):
+        """Avisar el estado actual a al_cambiar_estado (sus errores no afectan al trabajo)"""
+        if self._al_cambiar_estado:
+            try:
+                self._al_cambiar_estado(self)
+            except Exception as e:
+                logger.warning('Error registrando el estado del PDF %s: %s', self.nombre_archivo, e)
+
+    def a_dict(self):
+        return {
+            'trabajo_id': self.id,
+            'estado': self.estado,
+            'nombre_archivo': self.nombre_archivo,
+            'error': self.error,
+            'render_ms': round(self.render_ms, 1) if self.render_ms is not None else None,
+            'tamano_bytes': len(self.pdf) if self.pdf is not None else None,
+        }
+
+
+class PDFService:
+    """
+    Pool de procesos para xhtml2pdf con una cola de trabajos en memoria.
+    Como máximo `max_concurrentes` renders de este worker están en el pool a la
+    vez (incluidos los lotes de renderizar_lote); el resto espera en la cola
+    (hasta `max_cola`, luego ColaLlena). Los
+    resultados se conservan `ttl` segundos y un HTML idéntico reutiliza el
+    trabajo existente en vez de generarse de nuevo.
+    """
+
+    def __init__(self, procesos=2, max_concurrentes=2, max_cola=50, ttl=600):
+        self.procesos = max(1, procesos)
+        self.max_concurrentes = max(1, max_concurrentes)
+        self.max_cola = max_cola
+        self.ttl = ttl
+        self._pool = None
+        self._lock_pool = threading.Lock()
+        # Cupos de render en el pool, compartidos entre trabajos y lotes
+        self._cupos = threading.BoundedSemaphore(self.max_concurrentes)
+        self._despachador = ThreadPoolExecutor(
+            max_workers=self.max_concurrentes, thread_name_prefix='pdf-render'
+        )
+        self._lock = threading.Lock()
+        self._trabajos = {}
+        self._por_clave = {}
+        self._tiempos_ms = deque(maxlen=200)
+        self._stats = {
+            'enviados': 0,
+            'completados': 0,
+            'errores': 0,
+            'rechazados': 0,
+            'reutilizados': 0,
+        }
+
+    def _obtener_pool(self):
+        """Crear el pool de procesos en el primer uso (spawn: seguro con hilos y en Windows)"""
+        with self._lock_pool:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.procesos,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._pool
+
+    def _descartar_pool(self, pool):
+        """Reemplazar un pool roto (p. ej. si un proceso murió) en el próximo uso"""
+        with self._lock_pool:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False)
+
+    def _purgar(self):
+        """Quitar los trabajos terminados hace más de `ttl` segundos (con el lock tomado)"""
+        limite = time.time() - self.ttl
+        for trabajo_id, trabajo in list(self._trabajos.items()):
+            if trabajo.terminado_en is not None and trabajo.terminado_en < limite:
+                del self._trabajos[trabajo_id]
+                if self._por_clave.get(trabajo.clave) == trabajo_id:
+                    del self._por_clave[trabajo.clave]
+
+    def _en_cola(self):
+        return sum(1 for t in self._trabajos.values() if t.estado == 'en_cola')
+
+    def enviar(self, html_content, nombre_archivo, propietario=None, al_terminar=None,
+               al_cambiar_estado=None):
+        """
+        Encolar la generación de un PDF y retornar el TrabajoPDF.
+        Si ya hay un trabajo vigente con el mismo HTML (en curso o listo) se
+        retorna ese. `al_terminar(pdf)` se llama al generarse correctamente y
+        `al_cambiar_estado(trabajo)` al pasar a procesando y al terminar.
+        Lanza ColaLlena si la cola está al máximo.
+        """
+        clave = hashlib.sha256(html_content.encode('utf-8')).hexdigest()
+        with self._lock:
+            self._purgar()
+            existente = self._trabajos.get(self._por_clave.get(clave))
+            if existente and existente.estado != 'error' and existente.propietario == propietario:
+                self._stats['reutilizados'] += 1
+                return existente
+
+            if self._en_cola() >= self.max_cola:
+                self._stats['rechazados'] += 1
+                raise ColaLlena('Hay demasiados documentos en cola, intente nuevamente en unos segundos')
+
+            trabajo = TrabajoPDF(
+                html_content, clave, nombre_archivo, propietario, al_terminar, al_cambiar_estado
+            )
+            self._trabajos[trabajo.id] = trabajo
+            self._por_clave[clave] = trabajo.id
+            self._stats['enviados'] += 1
+
+        self._despachador.submit(self._ejecutar, trabajo)
+        return trabajo
+
+    def _ejecutar(self, trabajo):
+        """Ejecutar un trabajo en el pool de procesos (corre en un hilo del despachador)"""
+        trabajo.estado = 'procesando'
+        trabajo.notificar_estado()
+        pool = None
+        try:
+            pool = self._obtener_pool()
+            with self._cupos:
+                trabajo.pdf, trabajo.render_ms = pool.submit(_renderizar_pdf, trabajo._html).result()
+            trabajo.estado = 'listo'
+            self._registrar_resultado(trabajo.render_ms)
+            logger.info('PDF generado: %s (%.0f ms)', trabajo.nombre_archivo, trabajo.render_ms)
+            if trabajo._al_terminar:
+                try:
+                    trabajo._al_terminar(trabajo.pdf)
+                except Exception as e:
+                    logger.warning('Error guardando el PDF %s en caché: %s', trabajo.nombre_archivo, e)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool) and pool is not None:
+                self._descartar_pool(pool)
+            trabajo.estado = 'error'
+            trabajo.error = str(e) or e.__class__.__name__
+            self._registrar_resultado(error=True)
+            logger.error('Error generando PDF %s: %s', trabajo.nombre_archivo, trabajo.error)
+        finally:
+            trabajo._html = None
+            trabajo._al_terminar = None
+            trabajo.terminado_en = time.time()
+            trabajo._terminado.set()
+            trabajo.notificar_estado()
+            trabajo._al_cambiar_estado = None
+
+    def _registrar_resultado(self, render_ms=None, error=False):
+        with self._lock:
+            if error:
+                self._stats['errores'] += 1
+            else:
+                self._stats['completados'] += 1
+                self._tiempos_ms.append(render_ms)
+
+    def renderizar_lote(self, documentos):
+        """
+        Generar varios PDF en paralelo en el pool, sin pasar por la cola de trabajos.
+        `documentos` es un iterable de (clave, html) que se consume de a poco:
+        solo hay `max_concurrentes` HTML enviados a la vez. Genera
+        (clave, pdf, error) en el orden en que terminan; pdf es None si hubo error.
+        """
+        pendientes = iter(documentos)
+        en_vuelo = {}
+        agotado = False
+        try:
+            while en_vuelo or not agotado:
+                while not agotado and len(en_vuelo) < self.max_concurrentes:
+                    siguiente = next(pendientes, None)
+                    if siguiente is None:
+                        agotado = True
+                        break
+                    clave, html_content = siguiente
+                    pool = self._obtener_pool()
+                    self._cupos.acquire()
+                    try:
+                        futuro = pool.submit(_renderizar_pdf, html_content)
+                    except Exception:
+                        self._cupos.release()
+                        raise
+                    # El cupo se libera al terminar el render, aunque nadie lea el resultado
+                    futuro.add_done_callback(lambda _futuro: self._cupos.release())
+                    en_vuelo[futuro] = (clave, pool)
+
+                if not en_vuelo:
+                    break
+                listos, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    clave, pool = en_vuelo.pop(futuro)
+                    try:
+                        pdf, render_ms = futuro.result()
+                    except Exception as e:
+                        if isinstance(e, BrokenProcessPool):
+                            self._descartar_pool(pool)
+                        self._registrar_resultado(error=True)
+                        yield clave, None, str(e) or e.__class__.__name__
+                        continue
+                    self._registrar_resultado(render_ms)
+                    yield clave, pdf, None
+        finally:
+            # Si el cliente abandona la descarga, no seguir enviando renders
+            for futuro in en_vuelo:
+                futuro.cancel()
+
+    def obtener(self, trabajo_id, propietario=None):
+        """Trabajo por id (None si no existe, venció o es de otro usuario)"""
+        with self._lock:
+            self._purgar()
+            trabajo = self._trabajos.get(trabajo_id)
+        if trabajo is None or trabajo.propietario != propietario:
+            return None
+        return trabajo
+
+    def stats(self):
+        """Profundidad de la cola, renders en curso y tiempos de render"""
+        with self._lock:
+            tiempos = sorted(self._tiempos_ms)
+            estados = [t.estado for t in self._trabajos.values()]
+            return {
+                'procesos': self.procesos,
+                'max_concurrentes': self.max_concurrentes,
+                'max_cola': self.max_cola,
+                'en_cola': estados.count('en_cola'),
+                'procesando': estados.count('procesando'),
+                'resultados_guardados': estados.count('listo'),
+                **self._stats,
+                'render_ms_promedio': round(sum(tiempos) / len(tiempos), 1) if tiempos else 0.0,
+                'render_ms_p95': round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 1) if tiempos else 0.0,
+                'render_ms_max': round(tiempos[-1], 1) if tiempos else 0.0,
+            }
+
+
+# Instancia compartida (el pool de procesos se crea en el primer trabajo)
+_pdf_service = None
+_pdf_service_lock = threading.Lock()
+
+
+def get_pdf_service():
+    """Obtener el servicio de PDF configurado"""
+    global _pdf_service
+    if _pdf_service is None:
+        with _pdf_service_lock:
+            if _pdf_service is None:
+                from config import Config
+                config = Config()
+                _pdf_service = PDFService(
+                    procesos=config.PDF_WORKERS,
+                    max_concurrentes=config.PDF_MAX_CONCURRENT,
+                    max_cola=config.PDF_MAX_QUEUE,
+                    ttl=config.PDF_JOB_TTL
+                )
+    return _pdf_service
@@ -0,0 +1,117 @@
+"""
+Registro de plantillas HTML de documentos (resoluciones y otros)
+Las plantillas se compilan una vez con un Environment de Jinja compartido, con
+caché de bytecode en disco para que otros procesos y reinicios no vuelvan a
+compilarlas. Solo se recargan si cambia la fecha de modificación del archivo.
+Cada plantilla tiene un nombre; para agregar un documento nuevo basta con
+sumarlo a PLANTILLAS.
+"""
+import hashlib
+import logging
+import os
+import threading
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, TemplateNotFound
+
+logger = logging.getLogger(__name__)
+
+# Nombre lógico -> archivo dentro de templates/
+PLANTILLAS = {
+    'resolucion': 'resolucion_template.html',
+}
+
+DIRECTORIO_PLANTILLAS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+
+
+class PlantillaNoEncontrada(Exception):
+    """El nombre no está registrado o el archivo no existe"""
+
+
+class RegistroPlantillas:
+    """Plantillas compiladas por nombre, con su versión (hash del archivo)"""
+
+    def __init__(self, directorio, plantillas, directorio_bytecode=None):
+        self.directorio = directorio
+        self.plantillas = dict(plantillas)
+        bytecode_cache = None
+        if directorio_bytecode:
+            os.makedirs(directorio_bytecode, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(directorio_bytecode)
+        # Igual que render_template_string de Flask: escapar HTML en las variables.
+        # auto_reload compara el mtime antes de usar la versión compilada.
+        self._env = Environment(
+            loader=FileSystemLoader(directorio),
+            bytecode_cache=bytecode_cache,
+            autoescape=True,
+            auto_reload=True,
+            cache_size=max(50, len(self.plantillas))
+        )
+        self._versiones = {}
+        self._lock = threading.Lock()
+
+    def _archivo(self, nombre):
+        archivo = self.plantillas.get(nombre)
+        if archivo is None:
+            raise PlantillaNoEncontrada(f'Plantilla no registrada: {nombre}')
+        return archivo
+
+    def existe(self, nombre):
+        return nombre in self.plantillas and os.path.exists(os.path.join(self.directorio, self.plantillas[nombre]))
+
+    def version(self, nombre):
+        """SHA-256 del archivo de la plantilla; se recalcula solo si cambia su mtime o tamaño"""
+        ruta = os.path.join(self.directorio, self._archivo(nombre))
+        try:
+            st = os.stat(ruta)
+        except FileNotFoundError:
+            raise PlantillaNoEncontrada(f'No existe el archivo de la plantilla {nombre}: {ruta}')
+        firma = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            actual = self._versiones.get(nombre)
+            if actual and actual[0] == firma:
+                return actual[1]
+        with open(ruta, 'rb') as f:
+            version = hashlib.sha256(f.read()).hexdigest()
+        with self._lock:
+            self._versiones[nombre] = (firma, version)
+        return version
+
+    def obtener(self, nombre):
+        """Plantilla compilada"""
+        archivo = self._archivo(nombre)
+        try:
+            return self._env.get_template(archivo)
+        except TemplateNotFound:
+            raise PlantillaNoEncontrada(f'No existe el archivo de la plantilla {nombre}: {archivo}')
+
+    def renderizar(self, nombre, **contexto):
+        return self.obtener(nombre).render(**contexto)
+
+    def precargar(self):
+        """Compilar todas las plantillas registradas que existan. Retorna cuántas se cargaron"""
+        cargadas = 0
+        for nombre in self.plantillas:
+            if not self.existe(nombre):
+                logger.warning('Plantilla %s no encontrada (%s)', nombre, self.plantillas[nombre])
+                continue
+            self.obtener(nombre)
+            self.version(nombre)
+            cargadas += 1
+        return cargadas
+
+
+# Registro compartido (se crea en el primer uso)
+_registro = None
+_registro_lock = threading.Lock()
+
+
+def get_registro_plantillas():
+    """Obtener el registro de plantillas de documentos"""
+    global _registro
+    if _registro is None:
+        with _registro_lock:
+            if _registro is None:
+                from config import Config
+                _registro = RegistroPlantillas(
+                    DIRECTORIO_PLANTILLAS, PLANTILLAS, Config().TEMPLATE_BYTECODE_DIR
+                )
+    return _registro
@@ -0,0 +1,291 @@
+"""
+Backends de sesión de Flask
+SESSION_BACKEND elige dónde vive la sesión:
+- 'postgres' (por defecto): la cookie lleva solo un identificador firmado y
+  los datos viven en app.sesiones (migración 0012). Permite invalidar sesiones
+  en el servidor; solo se escribe al cambiar la sesión o al renovar su
+  vencimiento, y las vencidas se borran por lotes.
+- 'cookie': cookie firmada con SECRET_KEY y sin estado en el servidor. Lo que
+  guarda el login (user_id, rut, nombres, rol) es pequeño, así que no hay
+  lectura de disco por petición y cualquier host con la misma SECRET_KEY
+  atiende cualquier petición. Quien conozca la clave puede fabricar una sesión
+  con cualquier rol, por eso no inicia sin una SECRET_KEY propia.
+- 'filesystem': Flask-Session en disco (comportamiento anterior, un solo host).
+
+Limpieza manual de sesiones vencidas (backend postgres):
+    python -m utils.sesiones
+"""
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+from config import Config
+from utils.database import get_db_connection, get_pool
+from utils.db_pool import PooledConnection
+
+logger = logging.getLogger(__name__)
+
+_config = Config()
+
+BACKENDS_SESION = ('cookie', 'postgres', 'filesystem')
+
+# Claves que estuvieron versionadas en el repositorio: son públicas
+CLAVES_PUBLICAS = frozenset({
+    'tu-clave-secreta-flask-super-segura-2024',
+    'tu-clave-secreta-aqui',
+    'tu_clave_secreta_muy_segura_aqui',
+})
+
+
+class ClaveSesionInsegura(RuntimeError):
+    """SESSION_BACKEND=cookie sin una SECRET_KEY propia"""
+
+
+def clave_propia(app):
+    """La aplicación tiene una SECRET_KEY definida y que no está versionada"""
+    clave = app.config.get('SECRET_KEY')
+    return bool(clave) and clave not in CLAVES_PUBLICAS
+
+
+class SesionPostgres(CallbackDict, SessionMixin):
+    """Sesión cuyo contenido se guarda en app.sesiones"""
+
+    def __init__(self, datos=None, sid=None, expira_en=None, nueva=False):
+        def al_modificar(sesion):
+            sesion.modified = True
+
+        CallbackDict.__init__(self, datos, al_modificar)
+        self.sid = sid
+        self.expira_en = expira_en
+        self.new = nueva
+        self.modified = False
+
+
+class PostgresSessionInterface(SessionInterface):
+    """
+    Sesiones en PostgreSQL. La lectura usa la conexión de la petición (que la
+    ruta luego reutiliza); las escrituras, poco frecuentes, usan una aparte para
+    no mezclarse con la transacción de la ruta.
+    """
+
+    session_class = SesionPostgres
+
+    def _firmador(self, app):
+        """Sin SECRET_KEY propia la cookie lleva el identificador sin firmar"""
+        if not clave_propia(app):
+            return None
+        return Signer(app.secret_key, salt='saldo-insoluto-sesion')
+
+    def open_session(self, app, request):
+        valor = request.cookies.get(self.get_cookie_name(app))
+        firmador = self._firmador(app)
+        if valor:
+            try:
+                sid = firmador.unsign(valor).decode('utf-8') if firmador else valor
+            except BadSignature:
+                sid = None
+            if sid:
+                fila = self._leer(sid)
+                if fila is not None:
+                    return self.session_class(fila[0], sid=sid, expira_en=fila[1])
+        return self.session_class(sid=secrets.token_urlsafe(32), nueva=True)
+
+    def _leer(self, sid):
+        conn = get_db_connection()
+        if not conn:
+            return None
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT datos, expira_en FROM app.sesiones
+                WHERE id = %s AND expira_en > NOW()
+            """, (sid,))
+            fila = cur.fetchone()
+            cur.close()
+            conn.commit()
+            return fila
+        except Exception as e:
+            conn.rollback()
+            logger.warning('Error leyendo sesión: %s', e)
+            return None
+        finally:
+            conn.close()
+
+    def _escribir(self, sql, params):
+        conn = PooledConnection(get_pool(), get_pool().checkout())
+        try:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            cur.close()
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.warning('Error guardando sesión: %s', e)
+        finally:
+            conn.close()
+
+    def _debe_renovar(self, app, session):
+        """Renovar el vencimiento solo cuando ya pasó la mitad de la vigencia"""
+        if session.expira_en is None:
+            return True
+        restante = session.expira_en - datetime.now()
+        return restante < app.permanent_session_lifetime / 2
+
+    def save_session(self, app, session, response):
+        nombre = self.get_cookie_name(app)
+        dominio = self.get_cookie_domain(app)
+        ruta = self.get_cookie_path(app)
+
+        # Sesión vacía: si antes existía (logout), borrarla junto con la cookie
+        if not session:
+            if session.modified and not session.new:
+                self._escribir("DELETE FROM app.sesiones WHERE id = %s", (session.sid,))
+                response.delete_cookie(nombre, domain=dominio, path=ruta)
+            return
+
+        renovar = self._debe_renovar(app, session)
+        if session.modified or session.new or renovar:
+            session.expira_en = datetime.now() + app.permanent_session_lifetime
+            self._escribir("""
+                INSERT INTO app.sesiones (id, datos, expira_en)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (id) DO UPDATE
+                SET datos = EXCLUDED.datos, expira_en = EXCLUDED.expira_en, actualizado_en = CURRENT_TIMESTAMP
+            """, (session.sid, json.dumps(dict(session), default=str), session.expira_en))
+
+        if not (session.modified or session.new or renovar or self.should_set_cookie(app, session)):
+            return
+
+        firmador = self._firmador(app)
+        response.set_cookie(
+            nombre,
+            firmador.sign(session.sid.encode('utf-8')).decode('utf-8') if firmador else session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=dominio,
+            path=ruta,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+
+def init_app(app, backend=None):
+    """Configurar el backend de sesión de la aplicación según SESSION_BACKEND"""
+    backend = (backend or _config.SESSION_BACKEND).lower()
+    if backend not in BACKENDS_SESION:
+        raise ValueError(f"SESSION_BACKEND inválido: '{backend}' (opciones: {', '.join(BACKENDS_SESION)})")
+
+    if not clave_propia(app):
+        if backend == 'cookie':
+            raise ClaveSesionInsegura(
+                'SESSION_BACKEND=cookie requiere una SECRET_KEY propia: sin ella o con una '
+                'clave versionada cualquiera puede firmar una sesión con cualquier rol'
+            )
+        # postgres y filesystem guardan los datos en el servidor y la cookie solo lleva
+        # un identificador aleatorio; sin clave propia ese identificador va sin firmar
+        # (firmarlo con una clave pública no agrega nada)
+        logger.warning('SECRET_KEY no definida o versionada: el identificador de sesión va sin firmar')
+        app.config['SECRET_KEY'] = None
+        app.config['SESSION_USE_SIGNER'] = False
+
+    app.permanent_session_lifetime = timedelta(hours=_config.SESSION_LIFETIME)
+
+    if backend == 'postgres':
+        app.session_interface = PostgresSessionInterface()
+    elif backend == 'filesystem':
+        from flask_session import Session
+        app.config['SESSION_TYPE'] = 'filesystem'
+        Session(app)
+    # 'cookie': la sesión firmada de Flask (SecureCookieSessionInterface) ya es la predeterminada
+
+    logger.info('Sesiones: %s', backend)
+    return backend
+
+
+def limpiar_sesiones_vencidas(lote=None):
+    """
+    Borrar las sesiones vencidas en lotes de SESSION_GC_BATCH filas, cada uno
+    en su propia transacción para no retener bloqueos. Retorna cuántas se borraron.
+    """
+    lote = lote or _config.SESSION_GC_BATCH
+    conn = get_db_connection()
+    if not conn:
+        logger.error('No se pudo conectar a la base de datos para limpiar sesiones')
+        return 0
+
+    total = 0
+    try:
+        cur = conn.cursor()
+        while True:
+            cur.execute("""
+                DELETE FROM app.sesiones
+                WHERE id IN (
+                    SELECT id FROM app.sesiones
+                    WHERE expira_en < NOW()
+                    ORDER BY expira_en
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+            """, (lote,))
+            borradas = cur.rowcount
+            conn.commit()
+            total += borradas
+            if borradas < lote:
+                break
+        cur.close()
+    except Exception as e:
+        conn.rollback()
+        logger.error('Error limpiando sesiones vencidas: %s', e)
+    finally:
+        conn.close()
+
+    if total:
+        logger.info('Sesiones vencidas eliminadas: %s', total)
+    return total
+
+
+def _limpiar_periodicamente(intervalo):
+    while True:
+        time.sleep(intervalo)
+        try:
+            limpiar_sesiones_vencidas()
+        except Exception as e:
+            logger.warning('Error en la limpieza de sesiones: %s', e)
+
+
+_hilo_limpieza = None
+_lock_hilo = threading.Lock()
+
+
+def iniciar_limpieza_periodica(intervalo=900):
+    """Iniciar el hilo que borra las sesiones vencidas (solo backend postgres)"""
+    global _hilo_limpieza
+    if intervalo <= 0:
+        return None
+    with _lock_hilo:
+        if _hilo_limpieza is None or not _hilo_limpieza.is_alive():
+            _hilo_limpieza = threading.Thread(
+                target=_limpiar_periodicamente, args=(intervalo,), name='sesiones-limpieza', daemon=True
+            )
+            _hilo_limpieza.start()
+        return _hilo_limpieza
+
+
+if __name__ == '__main__':
+    from utils.logs import configurar_logging
+    configurar_logging(formato='texto')
+    
+    eliminadas = limpiar_sesiones_vencidas()
+    logger.info('Limpieza terminada: %s sesiones eliminadas', eliminadas)
@@ -0,0 +1,283 @@
+"""
+Almacenamiento de archivos direccionado por contenido
+Cada archivo se guarda una sola vez bajo su hash SHA-256, de modo que subidas
+idénticas (aunque sean de expedientes distintos) comparten el mismo objeto.
+El backend se elige con STORAGE_BACKEND: 'local' (sistema de archivos) o 's3'
+(cualquier servicio compatible con S3, p. ej. MinIO en desarrollo).
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from werkzeug.exceptions import RequestEntityTooLarge
+from config import Config
+
+# boto3 es opcional: solo se necesita con STORAGE_BACKEND=s3
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+    BOTO3_AVAILABLE = True
+except ImportError:
+    BOTO3_AVAILABLE = False
+
+TAMANO_BLOQUE = 1024 * 1024
+
+
+class StorageError(Exception):
+    """Error del backend de almacenamiento"""
+
+
+def _validar_sha256(sha256):
+    """Evitar claves arbitrarias (y rutas fuera del directorio base)"""
+    if not sha256 or len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256):
+        raise StorageError(f'Hash SHA-256 inválido: {sha256!r}')
+    return sha256
+
+
+class StorageBackend:
+    """Interfaz común de los backends de almacenamiento"""
+
+    def existe(self, sha256):
+        raise NotImplementedError
+
+    def guardar(self, sha256, data):
+        """Guardar bytes bajo su hash (no hace nada si ya existe). Retorna True si se escribió"""
+        raise NotImplementedError
+
+    def guardar_archivo(self, sha256, ruta_origen):
+        """Mover un archivo temporal ya escrito al almacenamiento. Retorna True si se escribió"""
+        raise NotImplementedError
+
+    def directorio_temporal(self):
+        """Directorio donde escribir las subidas en curso antes de guardarlas"""
+        return tempfile.gettempdir()
+
+    def iterar(self, sha256, tamano_bloque=TAMANO_BLOQUE, inicio=0, fin=None):
+        """Leer el contenido por bloques, opcionalmente solo el rango [inicio, fin)"""
+        raise NotImplementedError
+
+    def ruta_local(self, sha256):
+        """Ruta en disco si el backend la tiene (permite sendfile), o None"""
+        return None
+
+    def eliminar(self, sha256):
+        raise NotImplementedError
+
+
+class LocalStorage(StorageBackend):
+    """Archivos en disco: <base>/ab/cd/abcd...ef"""
+
+    def __init__(self, base_dir):
+        self.base_dir = os.path.abspath(base_dir)
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    def _ruta(self, sha256):
+        _validar_sha256(sha256)
+        return os.path.join(self.base_dir, sha256[:2], sha256[2:4], sha256)
+
+    def existe(self, sha256):
+        return os.path.exists(self._ruta(sha256))
+
+    def _temporal(self, ruta):
+        """Crear un archivo temporal en el mismo directorio destino (rename atómico)"""
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        return tempfile.mkstemp(dir=os.path.dirname(ruta), prefix='.tmp-')
+
+    def guardar(self, sha256, data):
+        ruta = self._ruta(sha256)
+        if os.path.exists(ruta):
+            return False
+        fd, tmp = self._temporal(ruta)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, ruta)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return True
+
+    def guardar_archivo(self, sha256, ruta_origen):
+        ruta = self._ruta(sha256)
+        if os.path.exists(ruta):
+            os.remove(ruta_origen)
+            return False
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        # El temporal está en el mismo sistema de archivos: el rename es atómico
+        os.replace(ruta_origen, ruta)
+        return True
+
+    def directorio_temporal(self):
+        directorio = os.path.join(self.base_dir, '.tmp')
+        os.makedirs(directorio, exist_ok=True)
+        return directorio
+
+    def iterar(self, sha256, tamano_bloque=TAMANO_BLOQUE, inicio=0, fin=None):
+        ruta = self._ruta(sha256)
+        try:
+            f = open(ruta, 'rb')
+        except FileNotFoundError:
+            raise StorageError(f'Archivo no encontrado en el almacenamiento: {sha256}')
+        with f:
+            if inicio:
+                f.seek(inicio)
+            restante = None if fin is None else fin - inicio
+            while restante is None or restante > 0:
+                bloque = f.read(tamano_bloque if restante is None else min(tamano_bloque, restante))
+                if not bloque:
+                    break
+                if restante is not None:
+                    restante -= len(bloque)
+                yield bloque
+
+    def ruta_local(self, sha256):
+        ruta = self._ruta(sha256)
+        return ruta if os.path.exists(ruta) else None
+
+    def eliminar(self, sha256):
+        try:
+            os.remove(self._ruta(sha256))
+        except FileNotFoundError:
+            pass
+
+
+class S3Storage(StorageBackend):
+    """Objetos en un bucket compatible con S3 bajo la clave <prefijo>ab/cd/abcd...ef"""
+
+    def __init__(self, bucket, endpoint_url=None, access_key=None, secret_key=None,
+                 region=None, prefijo=''):
+        if not BOTO3_AVAILABLE:
+            raise StorageError('STORAGE_BACKEND=s3 requiere boto3 (pip install boto3)')
+        if not bucket:
+            raise StorageError('STORAGE_BACKEND=s3 requiere S3_BUCKET')
+        self.bucket = bucket
+        self.prefijo = prefijo
+        self._client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url or None,
+            aws_access_key_id=access_key or None,
+            aws_secret_access_key=secret_key or None,
+            region_name=region or None
+        )
+
+    def _clave(self, sha256):
+        _validar_sha256(sha256)
+        return f'{self.prefijo}{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+    def existe(self, sha256):
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=self._clave(sha256))
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def guardar(self, sha256, data):
+        if self.existe(sha256):
+            return False
+        self._client.put_object(Bucket=self.bucket, Key=self._clave(sha256), Body=data)
+        return True
+
+    def guardar_archivo(self, sha256, ruta_origen):
+        try:
+            if self.existe(sha256):
+                return False
+            # upload_file usa subida multipart para archivos grandes
+            self._client.upload_file(ruta_origen, self.bucket, self._clave(sha256))
+            return True
+        finally:
+            os.remove(ruta_origen)
+
+    def iterar(self, sha256, tamano_bloque=TAMANO_BLOQUE, inicio=0, fin=None):
+        parametros = {'Bucket': self.bucket, 'Key': self._clave(sha256)}
+        if inicio or fin is not None:
+            # Rango HTTP inclusivo: S3 entrega solo ese tramo del objeto
+            parametros['Range'] = f'bytes={inicio}-{"" if fin is None else fin - 1}'
+        try:
+            respuesta = self._client.get_object(**parametros)
+        except ClientError as e:
+            raise StorageError(f'No se pudo leer {sha256} desde S3: {e}')
+        cuerpo = respuesta['Body']
+        try:
+            for bloque in cuerpo.iter_chunks(tamano_bloque):
+                yield bloque
+        finally:
+            cuerpo.close()
+
+    def eliminar(self, sha256):
+        self._client.delete_object(Bucket=self.bucket, Key=self._clave(sha256))
+
+
+class ArchivoEntrante:
+    """
+    Destino de un archivo recibido por streaming.
+    Escribe cada bloque a un temporal a medida que llega, actualiza el SHA-256
+    y corta la subida apenas se supera el tamaño máximo.
+    """
+
+    def __init__(self, directorio, tamano_maximo=None):
+        fd, self.ruta = tempfile.mkstemp(dir=directorio, prefix='.subida-')
+        self._archivo = os.fdopen(fd, 'w+b')
+        self._hash = hashlib.sha256()
+        self.tamano = 0
+        self.tamano_maximo = tamano_maximo
+
+    def write(self, data):
+        self.tamano += len(data)
+        if self.tamano_maximo is not None and self.tamano > self.tamano_maximo:
+            raise RequestEntityTooLarge()
+        self._hash.update(data)
+        return self._archivo.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._archivo, name)
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def cerrar(self):
+        """Cerrar el temporal (queda en disco para guardarlo en el almacenamiento)"""
+        if not self._archivo.closed:
+            self._archivo.close()
+
+    def descartar(self):
+        """Cerrar y borrar el temporal si todavía existe"""
+        self.cerrar()
+        try:
+            os.remove(self.ruta)
+        except FileNotFoundError:
+            pass
+
+
+# Backend compartido (se crea en el primer uso)
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Obtener el backend de almacenamiento configurado"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                config = Config()
+                if config.STORAGE_BACKEND == 's3':
+                    _storage = S3Storage(
+                        config.S3_BUCKET,
+                        endpoint_url=config.S3_ENDPOINT_URL,
+                        access_key=config.S3_ACCESS_KEY,
+                        secret_key=config.S3_SECRET_KEY,
+                        region=config.S3_REGION,
+                        prefijo=config.S3_PREFIX
+                    )
+                elif config.STORAGE_BACKEND == 'local':
+                    _storage = LocalStorage(config.STORAGE_LOCAL_DIR)
+                else:
+                    raise StorageError(f'STORAGE_BACKEND desconocido: {config.STORAGE_BACKEND}')
+    return _storage
+
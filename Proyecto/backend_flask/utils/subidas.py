@@ -0,0 +1,188 @@
+"""
+Subidas reanudables de documentos por partes (chunks)
+Cada parte se guarda en <UPLOAD_SESSIONS_DIR>/<subida_id>/<numero> después de
+verificar su tamaño y su SHA-256; el estado de la sesión vive en
+app.subidas_documento. Al finalizar, las partes se concatenan en un temporal
+del almacenamiento mientras se calcula el hash del archivo completo.
+
+Las sesiones sin actividad se descartan después de UPLOAD_SESSION_TTL horas.
+Limpieza manual:
+    python -m utils.subidas
+"""
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from utils.database import get_db_connection
+from utils.storage import ArchivoEntrante
+
+logger = logging.getLogger(__name__)
+
+_config = Config()
+
+# Bloque de lectura del cuerpo de cada parte
+TAMANO_LECTURA = 64 * 1024
+
+
+class ChunkInvalido(ValueError):
+    """La parte recibida no coincide con el tamaño o el hash declarados"""
+
+
+def directorio_subida(subida_id):
+    """Carpeta con las partes recibidas de una sesión"""
+    return os.path.join(_config.UPLOAD_SESSIONS_DIR, str(subida_id))
+
+
+def _ruta_chunk(subida_id, numero):
+    return os.path.join(directorio_subida(subida_id), f'{numero:06d}')
+
+
+def tamano_esperado(numero, tamano_total, tamano_chunk):
+    """Tamaño que debe tener la parte `numero` (la última puede ser menor)"""
+    return min(tamano_chunk, tamano_total - numero * tamano_chunk)
+
+
+def recibir_chunk(stream, tamano_maximo):
+    """
+    Leer el cuerpo de una parte por bloques a un temporal de UPLOAD_SESSIONS_DIR.
+    Se recibe antes de consultar la base de datos para no retener una conexión
+    del pool mientras llegan los bytes por un enlace lento.
+    Lanza RequestEntityTooLarge si supera `tamano_maximo`.
+    """
+    os.makedirs(_config.UPLOAD_SESSIONS_DIR, exist_ok=True)
+    destino = ArchivoEntrante(_config.UPLOAD_SESSIONS_DIR, tamano_maximo)
+    try:
+        for bloque in iter(lambda: stream.read(TAMANO_LECTURA), b''):
+            destino.write(bloque)
+        destino.cerrar()
+        return destino
+    except Exception:
+        destino.descartar()
+        raise
+
+
+def aceptar_chunk(subida_id, numero, entrante, tamano, sha256):
+    """
+    Dejar la parte recibida en la carpeta de la sesión solo si coincide con el
+    tamaño y el SHA-256 esperados. Reenviar una parte la reemplaza.
+    """
+    if entrante.tamano != tamano:
+        raise ChunkInvalido(f'La parte {numero} debe tener {tamano} bytes (llegaron {entrante.tamano})')
+    if entrante.sha256 != sha256:
+        raise ChunkInvalido(f'El SHA-256 de la parte {numero} no coincide con el contenido recibido')
+    os.makedirs(directorio_subida(subida_id), exist_ok=True)
+    os.replace(entrante.ruta, _ruta_chunk(subida_id, numero))
+
+
+def ensamblar(subida_id, total_chunks, directorio_temporal, tamano_maximo=None):
+    """
+    Concatenar las partes en un temporal de `directorio_temporal`.
+    Retorna el ArchivoEntrante ya cerrado, con tamaño y SHA-256 del archivo completo.
+    """
+    destino = ArchivoEntrante(directorio_temporal, tamano_maximo)
+    try:
+        for numero in range(total_chunks):
+            with open(_ruta_chunk(subida_id, numero), 'rb') as parte:
+                for bloque in iter(lambda: parte.read(TAMANO_LECTURA), b''):
+                    destino.write(bloque)
+        destino.cerrar()
+        return destino
+    except Exception:
+        destino.descartar()
+        raise
+
+
+def eliminar_archivos(subida_id):
+    """Borrar las partes de una sesión"""
+    shutil.rmtree(directorio_subida(subida_id), ignore_errors=True)
+
+
+def limpiar_subidas_vencidas():
+    """
+    Eliminar las sesiones vencidas (con sus partes) y las partes a medio
+    recibir que quedaron abandonadas. Retorna la cantidad de sesiones eliminadas.
+    """
+    conn = get_db_connection()
+    if not conn:
+        logger.error('No se pudo conectar a la base de datos para limpiar subidas')
+        return 0
+
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            DELETE FROM app.subidas_documento
+            WHERE expira_en < NOW()
+            RETURNING id
+        """)
+        vencidas = [str(fila[0]) for fila in cur.fetchall()]
+        conn.commit()
+        cur.close()
+    except Exception as e:
+        conn.rollback()
+        logger.error('Error limpiando subidas vencidas: %s', e)
+        return 0
+    finally:
+        conn.close()
+
+    for subida_id in vencidas:
+        eliminar_archivos(subida_id)
+
+    # Carpetas que quedaron sin sesión (p. ej. si se borró la fila a mano)
+    limite = time.time() - _config.UPLOAD_SESSION_TTL * 3600
+    if os.path.isdir(_config.UPLOAD_SESSIONS_DIR):
+        for nombre in os.listdir(_config.UPLOAD_SESSIONS_DIR):
+            ruta = os.path.join(_config.UPLOAD_SESSIONS_DIR, nombre)
+            try:
+                if os.path.getmtime(ruta) < limite:
+                    if os.path.isdir(ruta):
+                        shutil.rmtree(ruta, ignore_errors=True)
+                    else:
+                        os.remove(ruta)
+            except FileNotFoundError:
+                pass
+
+    if vencidas:
+        logger.info('Subidas vencidas eliminadas: %s', len(vencidas))
+    return len(vencidas)
+
+
+def _limpiar_periodicamente(intervalo):
+    while True:
+        time.sleep(intervalo)
+        try:
+            limpiar_subidas_vencidas()
+        except Exception as e:
+            logger.warning('Error en la limpieza de subidas: %s', e)
+
+
+_hilo_limpieza = None
+_lock_hilo = threading.Lock()
+
+
+def iniciar_limpieza_periodica(intervalo=900):
+    """Iniciar el hilo que descarta las sesiones de subida vencidas"""
+    global _hilo_limpieza
+    if intervalo <= 0:
+        return None
+    with _lock_hilo:
+        if _hilo_limpieza is None or not _hilo_limpieza.is_alive():
+            _hilo_limpieza = threading.Thread(
+                target=_limpiar_periodicamente, args=(intervalo,), name='subidas-limpieza', daemon=True
+            )
+            _hilo_limpieza.start()
+        return _hilo_limpieza
+
+
+if __name__ == '__main__':
+    from utils.logs import configurar_logging
+    configurar_logging(formato='texto')
+    
+    eliminadas = limpiar_subidas_vencidas()
+    logger.info('Limpieza terminada: %s sesiones eliminadas', eliminadas)
@@ -0,0 +1,127 @@
+"""
+Registro compartido de los trabajos de PDF (tabla app.trabajos_pdf)
+PDFService guarda sus trabajos en memoria del worker que los recibió. Con
+varios workers o hosts, la consulta de un trabajo puede llegar a otro: por eso
+cada cambio de estado se registra en la base de datos y el PDF terminado se
+lee desde la caché en disco (PDF_CACHE_DIR, compartida entre workers; con
+varios hosts debe ser un volumen común).
+"""
+import logging
+import uuid
+
+from config import Config
+from utils.database import get_db_connection
+from utils.pdf_cache import get_pdf_cache
+
+logger = logging.getLogger(__name__)
+
+_config = Config()
+
+
+class TrabajoRegistrado:
+    """Trabajo leído de app.trabajos_pdf (lo atiende otro worker o host)"""
+
+    def __init__(self, fila):
+        (self.id, self.propietario, self.estado, self.nombre_archivo, self.cache_grupo,
+         self.cache_clave, self.error, self.render_ms, self.tamano_bytes) = fila
+        self.id = str(self.id)
+        self._pdf = None
+
+    @property
+    def pdf(self):
+        """PDF desde la caché compartida (None si no está listo o se invalidó)"""
+        if self._pdf is None and self.estado == 'listo':
+            self._pdf = get_pdf_cache().obtener(self.cache_grupo, self.cache_clave)
+        return self._pdf
+
+    def a_dict(self):
+        return {
+            'trabajo_id': self.id,
+            'estado': self.estado,
+            'nombre_archivo': self.nombre_archivo,
+            'error': self.error,
+            'render_ms': round(self.render_ms, 1) if self.render_ms is not None else None,
+            'tamano_bytes': self.tamano_bytes,
+        }
+
+
+_INSERTAR = """
+    INSERT INTO app.trabajos_pdf (
+        id, propietario, estado, nombre_archivo, cache_grupo, cache_clave,
+        error, render_ms, tamano_bytes
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def registrar_trabajo(trabajo, cache_grupo, cache_clave, nuevo=False):
+    """
+    Guardar el estado de un TrabajoPDF. Con `nuevo` (al encolarlo) no se pisa
+    una fila existente, porque el hilo que genera el PDF pudo registrar ya un
+    estado posterior, y de paso se borran los trabajos vencidos.
+    Un error aquí solo se registra: el trabajo sigue disponible en su worker.
+    """
+    conn = get_db_connection()
+    if not conn:
+        logger.warning('No se pudo registrar el trabajo de PDF %s: sin conexión', trabajo.id)
+        return
+    try:
+        cur = conn.cursor()
+        if nuevo:
+            cur.execute("""
+                DELETE FROM app.trabajos_pdf
+                WHERE actualizado_en < NOW() - make_interval(secs => %s)
+            """, (_config.PDF_JOB_TTL,))
+            conflicto = "ON CONFLICT (id) DO NOTHING"
+        else:
+            conflicto = """
+                ON CONFLICT (id) DO UPDATE
+                SET estado = EXCLUDED.estado, error = EXCLUDED.error, render_ms = EXCLUDED.render_ms,
+                    tamano_bytes = EXCLUDED.tamano_bytes, actualizado_en = CURRENT_TIMESTAMP
+            """
+        cur.execute(_INSERTAR + conflicto, (
+            trabajo.id, trabajo.propietario, trabajo.estado, trabajo.nombre_archivo,
+            cache_grupo, cache_clave, trabajo.error, trabajo.render_ms,
+            len(trabajo.pdf) if trabajo.pdf is not None else None
+        ))
+        cur.close()
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.warning('No se pudo registrar el trabajo de PDF %s: %s', trabajo.id, e)
+    finally:
+        conn.close()
+
+
+def obtener_trabajo(trabajo_id, propietario=None):
+    """Trabajo registrado por id (None si no existe, venció o es de otro usuario)"""
+    try:
+        trabajo_id = str(uuid.UUID(trabajo_id))
+    except (TypeError, ValueError):
+        return None
+
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT id, propietario, estado, nombre_archivo, cache_grupo, cache_clave,
+                   error, render_ms, tamano_bytes
+            FROM app.trabajos_pdf
+            WHERE id = %s AND actualizado_en > NOW() - make_interval(secs => %s)
+        """, (trabajo_id, _config.PDF_JOB_TTL))
+        fila = cur.fetchone()
+        cur.close()
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logger.warning('Error leyendo el trabajo de PDF %s: %s', trabajo_id, e)
+        return None
+    finally:
+        conn.close()
+
+    if fila is None or fila[1] != propietario:
+        return None
+    return TrabajoRegistrado(fila)
+
@@ -0,0 +1,84 @@
+"""
+Generación de archivos ZIP en streaming
+Las entradas se escriben a medida que llegan y los bytes se entregan por partes,
+sin armar el archivo completo en memoria.
+"""
+import os
+import time
+import zipfile
+
+# Formatos que ya vienen comprimidos: se guardan sin volver a comprimir
+EXTENSIONES_COMPRIMIDAS = {'pdf', 'jpg', 'jpeg', 'png', 'gif', 'docx', 'xlsx', 'zip'}
+
+# Tamaño aproximado de cada bloque entregado al cliente
+TAMANO_BLOQUE = 64 * 1024
+
+
+class _SalidaStreaming:
+    """Destino de escritura no buscable que acumula bytes hasta entregarlos"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def write(self, data):
+        self._buffer.extend(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def tomar(self, minimo=0):
+        """Retirar los bytes acumulados si superan `minimo`"""
+        if not self._buffer or len(self._buffer) < minimo:
+            return b''
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def nombre_unico(nombre, usados):
+    """Evitar nombres repetidos dentro del ZIP: informe.pdf, informe (2).pdf, ..."""
+    base, ext = os.path.splitext(nombre)
+    candidato = nombre
+    n = 2
+    while candidato.lower() in usados:
+        candidato = f'{base} ({n}){ext}'
+        n += 1
+    usados.add(candidato.lower())
+    return candidato
+
+
+def metodo_compresion(nombre):
+    """ZIP_STORED para formatos ya comprimidos, ZIP_DEFLATED para el resto"""
+    ext = nombre.rsplit('.', 1)[-1].lower() if '.' in nombre else ''
+    return zipfile.ZIP_STORED if ext in EXTENSIONES_COMPRIMIDAS else zipfile.ZIP_DEFLATED
+
+
+def generar_zip(entradas):
+    """
+    Generador de bytes de un ZIP.
+    `entradas` es un iterable de (nombre, partes), donde partes es un iterable
+    de bytes con el contenido del archivo. Los nombres repetidos se renombran.
+    """
+    salida = _SalidaStreaming()
+    usados = set()
+
+    with zipfile.ZipFile(salida, 'w', allowZip64=True) as zip_file:
+        for nombre, partes in entradas:
+            nombre = nombre_unico(nombre, usados)
+            info = zipfile.ZipInfo(nombre, date_time=time.localtime()[:6])
+            info.compress_type = metodo_compresion(nombre)
+            with zip_file.open(info, 'w') as destino:
+                for parte in partes:
+                    destino.write(parte)
+                    bloque = salida.tomar(TAMANO_BLOQUE)
+                    if bloque:
+                        yield bloque
+            bloque = salida.tomar()
+            if bloque:
+                yield bloque
+
+    # Directorio central
+    bloque = salida.tomar()
+    if bloque:
+        yield bloque